@@ -0,0 +1,23 @@
+"""Профиль ASGI: ``gunicorn config.asgi:application -c config/gunicorn.py``.
+
+gunicorn управляет процессами, каждый процесс — цикл событий uvicorn, в котором
+асинхронные ``list``/``retrieve`` обслуживают много соединений сразу.
+"""
+
+import os
+
+from prometheus_client import multiprocess
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def child_exit(server, worker):
+    # Гистограммы умершего процесса остаются в сумме, живые значения удаляются.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
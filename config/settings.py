@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "network.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -69,6 +70,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL", "redis://127.0.0.1:6379/2"),
+    }
+}
+API_CACHE_ALIAS = "default"
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "300"))
+
+# Асинхронное чтение под ASGI: сколько запросов одного процесса одновременно
+# держат соединение с БД (WEB_CONCURRENCY * значение < max_connections).
+ASYNC_DB_CONCURRENCY = int(os.getenv("ASYNC_DB_CONCURRENCY", "20"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,7 +110,11 @@ MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "/media")
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "network.api.authentication.TimedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "network.api.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAdminUser",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -127,6 +145,12 @@ SPECTACULAR_SETTINGS = {
         }
     },
     "SECURITY": [{"BearerAuth": []}],
+    # Поле kind есть у звена и у проводки — без явных имён enum получает хэш.
+    "ENUM_NAME_OVERRIDES": {
+        "UnitKindEnum": "network.models.Unit.Kind",
+        "DebtEntryKindEnum": "network.models.DebtEntry.Kind",
+        "PostableDebtEntryKindEnum": "network.api.ledger.POSTABLE_KIND_CHOICES",
+    },
 }
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -138,10 +162,45 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://127.0.0.1:63
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+CELERY_TASK_ROUTES = {
+    "network.tasks.send_debt_notifications_chunk": {"queue": "notifications"},
+}
+CELERY_TASK_ANNOTATIONS = {
+    "network.tasks.send_debt_notifications_chunk": {
+        "rate_limit": os.getenv("DEBT_NOTIFICATION_RATE_LIMIT", "30/m"),
+    },
+}
+
+DEBT_NOTIFICATION_CHUNK_SIZE = int(os.getenv("DEBT_NOTIFICATION_CHUNK_SIZE", "200"))
+
+# Метрики: заголовок Server-Timing (раскрывает время БД и число запросов — по
+# умолчанию выключен), пороги медленных запросов и задач (мс), токен для
+# /metrics (пусто — метрики отдаются только при DEBUG), порт экспорта метрик воркера.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False").lower() == "true"
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_TASK_MS = int(os.getenv("SLOW_TASK_MS", "5000"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+TASK_METRICS_PORT = int(os.getenv("TASK_METRICS_PORT", "0"))
+
+# Журнал задолженности: как часто и какими пачками проводки попадают в баланс.
+DEBT_LEDGER_INTERVAL = int(os.getenv("DEBT_LEDGER_INTERVAL", "30"))
+DEBT_LEDGER_BATCH_SIZE = int(os.getenv("DEBT_LEDGER_BATCH_SIZE", "5000"))
+
+# Фоновые действия админки: звеньев в одной транзакции.
+ADMIN_JOB_CHUNK_SIZE = int(os.getenv("ADMIN_JOB_CHUNK_SIZE", "1000"))
+
+# Список звеньев в админке: до скольких строк считать точный COUNT(*)
+# (больше — оценка планировщика PostgreSQL) и TTL значений фильтра по городу (с).
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", "10000"))
+ADMIN_FACET_TTL = int(os.getenv("ADMIN_FACET_TTL", "600"))
 
 CELERY_BEAT_SCHEDULE = {
     "task-name": {
         "task": "network.tasks.send_notification_debt",
         "schedule": timedelta(days=7),
     },
+    "apply-debt-ledger": {
+        "task": "network.tasks.apply_debt_ledger",
+        "schedule": timedelta(seconds=DEBT_LEDGER_INTERVAL),
+    },
 }
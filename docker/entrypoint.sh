@@ -34,7 +34,8 @@ fi
 if [ "${SEED_DEMO:-0}" = "1" ]; then
   echo "Seeding demo data..."
   if [ "${SEED_RESET:-0}" = "1" ]; then
-    python manage.py seed_demo --reset || true
+    # Демо-данные пишут журнал задолженности, поэтому очищается всё приложение.
+    python manage.py seed_demo --reset-all || true
   else
     python manage.py seed_demo || true
   fi
@@ -42,5 +43,11 @@ else
   echo "Skip seed_demo (flag SEED_DEMO=0)."
 fi
 
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+  # Файлы метрик прошлого запуска искажают счётчики — начинаем с пустого каталога.
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "Start: $@"
 exec "$@"
@@ -1,22 +1,157 @@
-from decimal import Decimal
+import abc
+import json
 
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections, transaction
+from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
-from .models import Product, Unit
+from . import cache, jobs
+from .models import AdminJob, DebtEntry, DebtRollup, Product, Unit
+from .tasks import run_admin_job
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("name", "model", "released_at")
+    list_display = ("name", "model", "released_at", "units_count")
     search_fields = ("name", "model")
     list_filter = ("released_at",)
 
 
 @admin.action(description="Очистить задолженность у выбранных звеньев")
 def clear_debt(modeladmin, request, queryset):
-    updated = queryset.update(debt_to_supplier=Decimal("0.00"))
-    modeladmin.message_user(request, f"Обнулено: {updated}")
+    # Выборка может быть всей сетью — обнуление идёт в фоне пачками.
+    job = jobs.create(AdminJob.Action.CLEAR_DEBT, queryset, request.user)
+    transaction.on_commit(lambda: run_admin_job.delay(job.pk))
+    url = reverse("admin:network_adminjob_change", args=[job.pk])
+    modeladmin.message_user(
+        request, format_html('Запущено в фоне: <a href="{}">{}</a>', url, job)
+    )
+
+
+def _job_message(job: AdminJob):
+    if job.status == AdminJob.Status.DONE:
+        return messages.SUCCESS, f"{job}: готово, изменено звеньев: {job.affected}"
+    if job.status == AdminJob.Status.FAILED:
+        return messages.ERROR, f"{job}: ошибка — {job.error}"
+    total = "?" if job.total is None else job.total
+    return messages.INFO, f"{job}: {job.progress}% ({job.processed} из {total})"
+
+
+class EstimatedCountPaginator(Paginator):
+    """Точный ``COUNT(*)`` только для небольших выборок.
+
+    На PostgreSQL число строк сначала берётся из плана запроса (``EXPLAIN``
+    не читает таблицу); если оценка больше ``ADMIN_EXACT_COUNT_LIMIT``, она
+    и показывается. Оценка ошибается в обе стороны, поэтому страница читается
+    с одной лишней строкой и ``count`` уточняется: за полной страницей есть
+    следующая, неполная — последняя, а номер за концом выборки отдаёт
+    последнюю страницу по точному ``COUNT(*)``.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor != "postgresql":
+            return super().count
+        plan = json.loads(queryset.explain(format="json"))
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate <= settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        if not self.estimated:
+            return super().validate_number(number)
+        # Страницы за оценкой допустимы: конец выборки находит page().
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            self.estimated = False
+            self._set_count(self.object_list.count())
+            return super().page(self.num_pages)
+        if len(rows) > self.per_page:
+            self._set_count(max(self.count, bottom + len(rows)))
+        else:
+            self._set_count(bottom + len(rows))
+        return self._get_page(rows[: self.per_page], number, self)
+
+    def _set_count(self, count):
+        self.__dict__["count"] = count
+        self.__dict__.pop("num_pages", None)
+
+
+class UnitChangeList(ChangeList):
+    """Номер страницы и число строк — по уточнённому ``EstimatedCountPaginator``."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        if self.multi_page and not (self.show_all and self.can_show_all):
+            self.result_count = self.paginator.count
+            self.multi_page = self.result_count > self.list_per_page
+            self.page_num = min(self.page_num, self.paginator.num_pages)
+
+
+class FacetFilter(admin.SimpleListFilter, abc.ABC):
+    """Фильтр по значению поля без ``DISTINCT`` по таблице на каждый показ."""
+
+    @abc.abstractmethod
+    def values(self) -> list:
+        """Значения фильтра из дешёвого источника (сводки, кэш)."""
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in self.values()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class CountryFilter(FacetFilter):
+    title = "Страна"
+    parameter_name = "country"
+
+    def values(self):
+        # Строки сводки по сети уже сгруппированы по странам.
+        return list(
+            DebtRollup.objects.filter(unit__isnull=True)
+            .order_by("country")
+            .values_list("country", flat=True)
+            .distinct()
+        )
+
+
+class CityFilter(FacetFilter):
+    title = "Город"
+    parameter_name = "city"
+
+    def values(self):
+        return cache.facet_values(
+            "city",
+            lambda: list(
+                Unit.objects.order_by("city").values_list("city", flat=True).distinct()
+            ),
+        )
 
 
 @admin.register(Unit)
@@ -31,14 +166,103 @@ class UnitAdmin(admin.ModelAdmin):
         "level",
         "created_at",
     )
-    list_filter = ("city", "kind", "country")
+    list_filter = (CityFilter, "kind", CountryFilter)
     search_fields = ("name", "city", "country", "email")
     filter_horizontal = ("products",)
+    autocomplete_fields = ("supplier",)
+    # Список рассчитан на миллионы строк: поставщик — в том же запросе,
+    # сортировка по индексу pk, без точного подсчёта и счётчиков фильтров.
+    list_select_related = ("supplier",)
+    ordering = ("-pk",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # Баланс меняется только проводками журнала (и действием ниже).
+    readonly_fields = ("debt_to_supplier",)
     actions = [clear_debt]
 
+    def changelist_view(self, request, extra_context=None):
+        # Ход и итог фоновых действий пользователя — сообщениями над списком.
+        for job in jobs.unreported(request.user):
+            level, message = _job_message(job)
+            self.message_user(request, message, level)
+        return super().changelist_view(request, extra_context)
+
+    def get_changelist(self, request, **kwargs):
+        return UnitChangeList
+
     @admin.display(description="Поставщик", ordering="supplier__name")
     def supplier_link(self, obj: Unit):
         if not obj.supplier:
             return "—"
         url = f"/admin/network/unit/{obj.supplier_id}/change/"
         return format_html('<a href="{}">{}</a>', url, obj.supplier.name)
+
+
+@admin.register(DebtEntry)
+class DebtEntryAdmin(admin.ModelAdmin):
+    """Журнал только пополняется: записи можно добавить и просмотреть."""
+
+    list_display = (
+        "id",
+        "unit",
+        "kind",
+        "amount",
+        "reference",
+        "created_at",
+        "applied_at",
+    )
+    list_filter = ("kind", ("applied_at", admin.EmptyFieldListFilter))
+    search_fields = ("reference", "unit__name", "unit__email")
+    list_select_related = ("unit",)
+    autocomplete_fields = ("unit",)
+    fields = ("unit", "kind", "amount", "reference", "note", "created_at", "applied_at")
+    readonly_fields = ("created_at", "applied_at")
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "status",
+        "progress_display",
+        "affected",
+        "user",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("action", "status")
+    list_select_related = ("user",)
+    fields = (
+        "action",
+        "status",
+        "progress_display",
+        "total",
+        "processed",
+        "affected",
+        "cursor",
+        "error",
+        "user",
+        "created_at",
+        "finished_at",
+    )
+    readonly_fields = fields
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("selection")
+
+    @admin.display(description="Выполнено")
+    def progress_display(self, obj: AdminJob):
+        return f"{obj.progress}%"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
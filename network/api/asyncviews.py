@@ -0,0 +1,119 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+from .streaming import CHUNK_SIZE
+
+# Действия чтения и их асинхронные обработчики.
+ASYNC_ACTIONS = {"list": "alist", "retrieve": "aretrieve"}
+
+_slots = weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def db_slot(request):
+    """Ограничивает число запросов процесса, одновременно работающих с БД.
+
+    Под ASGI у каждого запроса свой поток для синхронного кода и, значит,
+    своё соединение с БД, которое иначе живёт до ``request_finished`` — пока
+    клиент не дочитает ответ. Поэтому соединения закрываются сразу после
+    обработки, а их число ограничено ``ASYNC_DB_CONCURRENCY``.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(settings.ASYNC_DB_CONCURRENCY)
+    async with slots:
+        try:
+            yield
+        finally:
+            if isinstance(request, ASGIRequest):
+                await sync_to_async(connections.close_all)()
+
+
+class AsyncReadMixin:
+    """Асинхронные ``list``/``retrieve`` для ``ModelViewSet``.
+
+    Маршрут чтения получает ``async``-view: GET/HEAD идут через ``adispatch``
+    (строки — ``aiterator()``/``aget()``, сериализация — в цикле событий, без
+    запросов к БД), остальные методы — в обычный синхронный ``dispatch`` через
+    ``sync_to_async``. Аутентификация и права проверяются синхронным
+    ``initial()``, поэтому поведение и ошибки совпадают с синхронным путём.
+    Под ASGI один процесс держит много медленных читающих клиентов, не занимая
+    поток на каждого; под WSGI view выполняется через ``async_to_sync``.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        read = actions.get("get")
+        if read not in ASYNC_ACTIONS:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            async with db_slot(request):
+                if request.method not in ("GET", "HEAD"):
+                    return await sync_view(request, *args, **kwargs)
+                self = cls(**initkwargs)
+                self.action_map = {"get": read, "head": read}
+                self.request = request
+                self.args = args
+                self.kwargs = kwargs
+                handler = getattr(self, ASYNC_ACTIONS[read])
+                return await self.adispatch(handler, request, *args, **kwargs)
+
+        # cls/initkwargs/actions/csrf_exempt нужны роутеру, схеме и CSRF.
+        return update_wrapper(async_view, view)
+
+    async def adispatch(self, handler, request, *args, **kwargs):
+        """``APIView.dispatch`` с асинхронным обработчиком."""
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is None:
+            rows = [obj async for obj in queryset.aiterator(chunk_size=CHUNK_SIZE)]
+            return Response(self.get_serializer(rows, many=True).data)
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            DjangoValidationError,
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -0,0 +1,19 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from network import metrics
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация с замером в фазу ``auth`` (разбор и проверка токена, пользователь)."""
+
+    def authenticate(self, request):
+        with metrics.timed("auth"):
+            return super().authenticate(request)
+
+
+class TimedJWTScheme(SimpleJWTScheme):
+    """Схема OpenAPI для ``TimedJWTAuthentication`` — та же, что у SimpleJWT."""
+
+    target_class = "network.api.authentication.TimedJWTAuthentication"
+    name = "BearerAuth"
@@ -0,0 +1,348 @@
+"""Пакетное создание и обновление звеньев (``POST /api/units/bulk/``).
+
+Пакет проверяется целиком несколькими запросами на множество (email,
+существующие звенья, поставщики, продукты), а иерархия — в памяти по
+итоговой карте поставщиков. Ошибки возвращаются списком по позициям пакета.
+"""
+
+from itertools import groupby
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from network import availability, hierarchy, rollups
+from network.models import DEPTH_EXCEEDED, EMAIL_TAKEN, Product, Unit
+
+from .serializers import is_email_conflict
+
+MAX_ITEMS = 5000
+BATCH_SIZE = 1000
+UNIT_FIELDS = ("name", "kind", "email", "country", "city", "street", "house_number")
+
+
+class UnitBulkItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False, min_value=1)
+    ref = serializers.CharField(required=False, max_length=100)
+    supplier = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    supplier_ref = serializers.CharField(required=False, max_length=100)
+    product_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False
+    )
+
+    class Meta:
+        model = Unit
+        fields = (
+            "id",
+            "ref",
+            "name",
+            "kind",
+            "email",
+            "country",
+            "city",
+            "street",
+            "house_number",
+            "supplier",
+            "supplier_ref",
+            "product_ids",
+        )
+
+    def validate(self, attrs):
+        if "id" in attrs and ("ref" in attrs or "supplier_ref" in attrs):
+            raise serializers.ValidationError(
+                "ref и supplier_ref допустимы только для новых звеньев."
+            )
+        if "supplier" in attrs and "supplier_ref" in attrs:
+            raise serializers.ValidationError(
+                "Укажите либо supplier, либо supplier_ref."
+            )
+        email = attrs.get("email")
+        if email is not None:
+            attrs["email"] = email.strip().lower()
+        return attrs
+
+
+class UnitBulkWriter:
+    def __init__(self, data: list):
+        self.data = data
+        self.items = [None] * len(data)
+        self.errors = [{} for _ in data]
+        self.refs = {}
+        self.instances = {}
+        self.parents = {}
+        self.levels = {}
+
+    def _error(self, i, field, message):
+        self.errors[i].setdefault(field, []).append(message)
+
+    def _valid(self):
+        return [(i, a) for i, a in enumerate(self.items) if a and not self.errors[i]]
+
+    @staticmethod
+    def _key(i, attrs):
+        return attrs["id"] if "id" in attrs else ("new", i)
+
+    def is_valid(self) -> bool:
+        self._validate_items()
+        self._load_instances()
+        self._validate_emails()
+        self._validate_products()
+        self._resolve_hierarchy()
+        return not any(self.errors)
+
+    def _validate_items(self):
+        for i, raw in enumerate(self.data):
+            partial = isinstance(raw, dict) and "id" in raw
+            s = UnitBulkItemSerializer(data=raw, partial=partial)
+            if not s.is_valid():
+                self.errors[i] = s.errors
+                continue
+            attrs = s.validated_data
+            ref = attrs.get("ref")
+            if ref is not None:
+                if ref in self.refs:
+                    self._error(i, "ref", "Повторяющийся ref в пакете.")
+                    continue
+                self.refs[ref] = i
+            self.items[i] = attrs
+
+    def _load_instances(self):
+        seen = set()
+        for i, attrs in self._valid():
+            pk = attrs.get("id")
+            if pk is None:
+                continue
+            if pk in seen:
+                self._error(i, "id", "Звено встречается в пакете несколько раз.")
+            seen.add(pk)
+        self.instances = Unit.objects.in_bulk(seen)
+        for i, attrs in self._valid():
+            if "id" in attrs and attrs["id"] not in self.instances:
+                self._error(i, "id", "Звено не найдено.")
+
+    def _validate_emails(self):
+        seen = {}
+        for i, attrs in self._valid():
+            email = attrs.get("email")
+            if email is None:
+                continue
+            if email in seen:
+                self._error(i, "email", "Email повторяется в пакете.")
+                continue
+            seen[email] = i
+        taken = dict(
+            Unit.objects.annotate(email_l=Lower("email"))
+            .filter(email_l__in=seen)
+            .values_list("email_l", "pk")
+        )
+        for email, i in seen.items():
+            pk = taken.get(email)
+            if pk is not None and pk != self.items[i].get("id"):
+                self._error(i, "email", EMAIL_TAKEN)
+
+    def _validate_products(self):
+        wanted = {pid for _, a in self._valid() for pid in a.get("product_ids", ())}
+        found = set(Product.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        for i, attrs in self._valid():
+            missing = sorted(set(attrs.get("product_ids", ())) - found)
+            if missing:
+                self._error(
+                    i,
+                    "product_ids",
+                    f"Продукты не найдены: {', '.join(map(str, missing))}.",
+                )
+
+    def _resolve_hierarchy(self):
+        override = {}
+        for i, attrs in self._valid():
+            key = self._key(i, attrs)
+            if "supplier_ref" in attrs:
+                j = self.refs.get(attrs["supplier_ref"])
+                if j is None or self.items[j] is None:
+                    self._error(
+                        i, "supplier_ref", "Звено с таким ref не найдено в пакете."
+                    )
+                    continue
+                override[key] = self._key(j, self.items[j])
+            elif "supplier" in attrs:
+                override[key] = attrs["supplier"]
+            elif "id" not in attrs:
+                override[key] = None
+
+        wanted = {p for p in override.values() if isinstance(p, int)}
+        suppliers = dict(
+            Unit._base_manager.filter(pk__in=wanted - set(self.instances)).values_list(
+                "pk", "path"
+            )
+        )
+        db_parent = {}
+        known = {**suppliers, **{pk: u.path for pk, u in self.instances.items()}}
+        for pk, path in known.items():
+            chain = [None, *hierarchy.ancestor_ids(path), pk]
+            for parent, child in zip(chain, chain[1:]):
+                db_parent[child] = parent
+
+        for i, attrs in self._valid():
+            key = self._key(i, attrs)
+            parent = override.get(key, db_parent.get(key))
+            if isinstance(parent, int) and parent not in db_parent:
+                self._error(i, "supplier", "Поставщик не найден.")
+                continue
+            inst = self.instances.get(key)
+            kind = attrs.get("kind", inst.kind if inst else None)
+            if kind == Unit.Kind.FACTORY and parent is not None:
+                self._error(i, "supplier", "У завода не может быть поставщика.")
+                continue
+
+            level, node, seen = 0, key, {key}
+            while True:
+                node = override[node] if node in override else db_parent.get(node)
+                if node is None:
+                    break
+                if node in seen:
+                    self._error(i, "supplier", "Цепочка поставок станет циклической.")
+                    break
+                seen.add(node)
+                level += 1
+            if level > hierarchy.MAX_DEPTH:
+                self._error(i, "supplier", DEPTH_EXCEEDED)
+                continue
+            self.parents[key] = parent
+            self.levels[key] = level
+
+    def save(self) -> list[int]:
+        """Записывает пакет; возвращает id звеньев в порядке элементов пакета.
+
+        Email, занятый параллельной записью после проверки, отсекает
+        функциональный индекс — ошибка приводится к ``ValidationError``.
+        Так же приводятся ошибки ``full_clean()`` перемещаемых звеньев
+        (например, слишком глубокое поддерево).
+        """
+        try:
+            with transaction.atomic():
+                return self._save()
+        except IntegrityError as exc:
+            if is_email_conflict(exc):
+                raise serializers.ValidationError({"email": [EMAIL_TAKEN]})
+            raise
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(serializers.as_serializer_error(exc))
+
+    def _save(self) -> list[int]:
+        items = self._valid()
+        updates = [(i, a) for i, a in items if "id" in a]
+        creates = [(i, a) for i, a in items if "id" not in a]
+
+        # Перемещения по возрастанию итогового уровня: к моменту переноса
+        # звена вся его новая цепочка поставщиков уже на месте.
+        moved = [
+            (i, a)
+            for i, a in updates
+            if "supplier" in a and a["supplier"] != self.instances[a["id"]].supplier_id
+        ]
+        for i, attrs in sorted(moved, key=lambda x: self.levels[x[1]["id"]]):
+            unit = self.instances[attrs["id"]]
+            for field in UNIT_FIELDS:
+                if field in attrs:
+                    setattr(unit, field, attrs[field])
+            unit.supplier_id = attrs["supplier"]
+            unit.save()
+
+        moved_ids = {a["id"] for _, a in moved}
+        plain = [a for _, a in updates if a["id"] not in moved_ids]
+        if moved:
+            # Перемещения могли переписать path/level потомков из пакета.
+            fresh = Unit._base_manager.filter(pk__in=[a["id"] for a in plain])
+            for pk, path, level in fresh.values_list("pk", "path", "level"):
+                self.instances[pk].path, self.instances[pk].level = path, level
+        fields = sorted({f for a in plain for f in a} & set(UNIT_FIELDS))
+        units, before, after = [], [], []
+        for attrs in plain:
+            unit = self.instances[attrs["id"]]
+            old_country = unit.country
+            for field in UNIT_FIELDS:
+                if field in attrs:
+                    setattr(unit, field, attrs[field])
+            if unit.country != old_country:
+                row = (
+                    unit.pk,
+                    unit.path,
+                    old_country,
+                    unit.level,
+                    unit.debt_to_supplier,
+                )
+                before.append(row)
+                after.append((*row[:2], unit.country, *row[3:]))
+            units.append(unit)
+        if fields:
+            Unit.objects.bulk_update(units, fields, batch_size=BATCH_SIZE)
+        if set(fields) & set(availability.FIELDS):
+            availability.units_updated(u.pk for u in units)
+        rollups.units_changed(before, after)
+
+        created = self._create(creates)
+
+        self._set_products(items, created)
+        return [a["id"] if "id" in a else created[("new", i)].pk for i, a in items]
+
+    def _create(self, creates) -> dict:
+        existing = {p for p in self.parents.values() if isinstance(p, int)}
+        paths = dict(
+            Unit._base_manager.filter(pk__in=existing).values_list("pk", "path")
+        )
+        created = {}
+        by_level = sorted(creates, key=lambda x: self.levels[("new", x[0])])
+        for _, group in groupby(by_level, key=lambda x: self.levels[("new", x[0])]):
+            objs = []
+            for i, attrs in group:
+                parent = self.parents[("new", i)]
+                if parent is None:
+                    supplier_id, path = None, ""
+                elif isinstance(parent, int):
+                    supplier_id = parent
+                    path = f"{paths[parent]}{parent}{hierarchy.SEPARATOR}"
+                else:
+                    supplier_id = created[parent].pk
+                    path = hierarchy.child_path(created[parent])
+                unit = Unit(
+                    **{f: attrs[f] for f in UNIT_FIELDS if f in attrs},
+                    supplier_id=supplier_id,
+                    path=path,
+                    level=path.count(hierarchy.SEPARATOR),
+                )
+                created[("new", i)] = unit
+                objs.append(unit)
+            Unit.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+
+        rollups.units_changed(
+            after=[
+                (u.pk, u.path, u.country, u.level, u.debt_to_supplier)
+                for u in created.values()
+            ]
+        )
+        return created
+
+    def _set_products(self, items, created):
+        through = Unit.products.through
+        replace = {}
+        for i, attrs in items:
+            if "product_ids" in attrs:
+                pk = attrs["id"] if "id" in attrs else created[("new", i)].pk
+                replace[pk] = dict.fromkeys(attrs["product_ids"])
+        if not replace:
+            return
+        # Прямые вставки в M2M-таблицу не шлют m2m_changed; touch() отмечает
+        # звенья изменёнными и повышает версию.
+        existing = [pk for pk in replace if pk in self.instances]
+        Unit.objects.filter(pk__in=existing).touch()
+        through.objects.filter(unit_id__in=existing).delete()
+        through.objects.bulk_create(
+            [
+                through(unit_id=pk, product_id=pid)
+                for pk, pids in replace.items()
+                for pid in pids
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        availability.sync(replace)
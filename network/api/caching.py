@@ -0,0 +1,69 @@
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
+
+from network import cache
+
+
+class CachedReadMixin:
+    """Кэширует ответы ``list``/``retrieve`` по нормализованным параметрам запроса.
+
+    ``cache_depends_on`` — версии, от которых зависит ответ. Права проверяются
+    до обращения к кэшу; объектные проверки на попадании вызываются с
+    ``obj=None``, поэтому подходят только разрешения, не смотрящие на объект.
+    ``alist``/``aretrieve`` — то же для асинхронного пути ``AsyncReadMixin``.
+    """
+
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        key, response = self._cache_lookup(request, kwargs)
+        if response is not None:
+            return response
+        return self._cache_store(key, handler(request, *args, **kwargs))
+
+    async def _acached_response(self, handler, request, *args, **kwargs):
+        key, response = await sync_to_async(self._cache_lookup)(request, kwargs)
+        if response is not None:
+            return response
+        response = await handler(request, *args, **kwargs)
+        return await sync_to_async(self._cache_store)(key, response)
+
+    def _cache_lookup(self, request, kwargs):
+        """``(ключ, ответ)``; ключ ``None`` — кэш недоступен, ответ — при попадании."""
+        scope = f"{self.basename}-{self.action}"
+        version = cache.versions(*self.cache_depends_on)
+        if version is None:
+            return None, None
+
+        key = cache.response_key(scope, version, kwargs, request.query_params)
+        cached = cache.get_response(key)
+        if cached is None:
+            cache.record(scope, hit=False)
+            return key, None
+
+        if self.action == "retrieve":
+            self.check_object_permissions(request, None)
+        cache.record(scope, hit=True)
+        response = Response(cached)
+        response["X-Cache"] = "HIT"
+        return key, response
+
+    def _cache_store(self, key, response):
+        if key is None:
+            return response
+        if response.status_code == 200:
+            cache.set_response(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,104 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from network import cache
+
+
+class ConditionalReadMixin:
+    """``ETag``/``Last-Modified`` для ``list``/``retrieve`` и ответ 304.
+
+    Список проверяется по версиям ``cache_depends_on``, объект — по своему
+    ``updated_at`` (один запрос по pk) и версиям остальных зависимостей.
+    ETag строгий: в нём параметры запроса и формат ответа. 304 отдаётся до
+    кэша ответов и сериализации, поэтому миксин ставится перед
+    ``CachedReadMixin``. Объектные права проверяются с ``obj=None``, как на
+    попадании в кэш.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._aconditional(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._aconditional(super().aretrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        validators = self._validators(request, kwargs)
+        response = self._not_modified(request, validators)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self._set_validators(response, validators)
+
+    async def _aconditional(self, handler, request, *args, **kwargs):
+        validators = await sync_to_async(self._validators)(request, kwargs)
+        response = self._not_modified(request, validators)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        return self._set_validators(response, validators)
+
+    def _validators(self, request, kwargs):
+        """``(ETag, время изменения)``; ``None`` — проверка пропускается."""
+        depends_on = self.cache_depends_on
+        if self.action == "retrieve":
+            own = cache.name_for(self.queryset.model)
+            depends_on = [name for name in depends_on if name != own]
+        version = cache.versions(*depends_on)
+        modified = cache.modified(*depends_on) if depends_on else 0
+        if version is None or modified is None:
+            return None
+        if self.action == "retrieve":
+            updated_at = self._updated_at(kwargs)
+            if updated_at is None:
+                return None
+            version = (updated_at.isoformat(), *version)
+            modified = max(modified, updated_at.timestamp())
+
+        scope = f"{self.basename}-{self.action}"
+        key = cache.response_key(scope, version, kwargs, request.query_params)
+        digest = hashlib.sha1(f"{key}:{request.accepted_media_type}".encode())
+        return f'"{digest.hexdigest()}"', int(modified)
+
+    def _updated_at(self, kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().prefetch_related(None).order_by()
+        try:
+            return queryset.values_list("updated_at", flat=True).get(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            DjangoValidationError,
+        ):
+            # Ошибку (404) отдаст обычный обработчик.
+            return None
+
+    def _not_modified(self, request, validators):
+        if validators is None:
+            return None
+        etag, modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=modified)
+        if response is not None and self.action == "retrieve":
+            self.check_object_permissions(request, None)
+        return response
+
+    @staticmethod
+    def _set_validators(response, validators):
+        if validators is None or response.status_code not in (200, 304):
+            return response
+        etag, modified = validators
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        # Кэшировать можно, но только с повторной проверкой.
+        response["Cache-Control"] = "private, no-cache"
+        return response
@@ -0,0 +1,110 @@
+"""Пакетная проводка по журналу задолженности (``POST /api/debt-entries/bulk/``).
+
+Пакет проверяется целиком: поля — по элементам, существование звеньев и
+номера документов — запросами на множество. Проводки только вставляются;
+в ``debt_to_supplier`` они попадают при следующем применении журнала.
+"""
+
+from decimal import Decimal
+
+from rest_framework import serializers
+
+from network import ledger
+from network.models import DebtEntry, Unit
+
+MAX_ITEMS = 10000
+POSTABLE_KINDS = (
+    DebtEntry.Kind.CHARGE,
+    DebtEntry.Kind.PAYMENT,
+    DebtEntry.Kind.WRITE_OFF,
+)
+POSTABLE_KIND_CHOICES = [(k.value, k.label) for k in POSTABLE_KINDS]
+
+
+class DebtEntryBulkItemSerializer(serializers.Serializer):
+    unit = serializers.IntegerField(min_value=1)
+    kind = serializers.ChoiceField(choices=POSTABLE_KIND_CHOICES)
+    amount = serializers.DecimalField(
+        max_digits=12, decimal_places=2, min_value=Decimal("0.01")
+    )
+    reference = serializers.CharField(
+        max_length=100, required=False, allow_blank=True, default=""
+    )
+    note = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, default=""
+    )
+
+
+class DebtEntryBulkWriter:
+    def __init__(self, data: list):
+        self.data = data
+        self.items = [None] * len(data)
+        self.errors = [{} for _ in data]
+        self.duplicates = []
+
+    def _error(self, i, field, message):
+        self.errors[i].setdefault(field, []).append(message)
+
+    def _valid(self):
+        return [(i, a) for i, a in enumerate(self.items) if a and not self.errors[i]]
+
+    def is_valid(self) -> bool:
+        self._validate_items()
+        self._validate_units()
+        self._find_duplicates()
+        return not any(self.errors)
+
+    def _validate_items(self):
+        # Один экземпляр на весь пакет: поля сериализатора строятся один раз,
+        # а не на каждую из тысяч проводок.
+        item = DebtEntryBulkItemSerializer()
+        seen = set()
+        for i, raw in enumerate(self.data):
+            try:
+                attrs = item.run_validation(raw)
+            except serializers.ValidationError as exc:
+                self.errors[i] = exc.detail
+                continue
+            if attrs["reference"]:
+                key = (attrs["unit"], attrs["reference"])
+                if key in seen:
+                    self._error(i, "reference", "Номер документа повторяется в пакете.")
+                    continue
+                seen.add(key)
+            self.items[i] = attrs
+
+    def _validate_units(self):
+        wanted = {a["unit"] for _, a in self._valid()}
+        found = set(Unit.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        for i, attrs in self._valid():
+            if attrs["unit"] not in found:
+                self._error(i, "unit", "Звено не найдено.")
+
+    def _find_duplicates(self):
+        # Уже проведённые документы — не ошибка: повтор пакета после сбоя
+        # должен быть безопасен.
+        refs = {
+            (a["unit"], a["reference"]): i for i, a in self._valid() if a["reference"]
+        }
+        if not refs:
+            return
+        existing = DebtEntry.objects.filter(
+            unit_id__in={u for u, _ in refs}, reference__in={r for _, r in refs}
+        ).values_list("unit_id", "reference")
+        self.duplicates = sorted(refs[key] for key in existing if key in refs)
+
+    def save(self) -> dict:
+        skip = set(self.duplicates)
+        entries = [
+            DebtEntry(
+                unit_id=a["unit"],
+                kind=a["kind"],
+                amount=a["amount"],
+                reference=a["reference"],
+                note=a["note"],
+            )
+            for i, a in self._valid()
+            if i not in skip
+        ]
+        ledger.post(entries)
+        return {"posted": len(entries), "duplicates": self.duplicates}
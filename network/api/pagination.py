@@ -0,0 +1,172 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset-пагинация по (поля сортировки ``OrderingFilter``, id).
+
+    Курсор хранит значения ключа последней строки страницы, следующая страница
+    выбирается условием ``WHERE (ключ) > (курсор)`` по индексу — без OFFSET и
+    без ``COUNT(*)``, поэтому страница N стоит столько же, сколько первая.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Некорректный курсор."
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        try:
+            size = int(raw) if raw else api_settings.PAGE_SIZE
+        except ValueError:
+            size = api_settings.PAGE_SIZE
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = [f for f in ordering if isinstance(f, str)]
+        pk = queryset.model._meta.pk.name
+        if not any(f.lstrip("-") in (pk, "pk") for f in ordering):
+            desc = bool(ordering) and ordering[0].startswith("-")
+            ordering.append(f"-{pk}" if desc else pk)
+        return ordering
+
+    def decode_cursor(self, raw, ordering):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(raw.encode()).decode())
+            values, cursor_ordering = data["v"], data["o"]
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            cursor_ordering != ordering
+            or not isinstance(values, list)
+            or len(values) != len(ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, obj, ordering):
+        values = [getattr(obj, f.lstrip("-")) for f in ordering]
+        # str(), а не DjangoJSONEncoder: тот обрезает datetime до миллисекунд.
+        data = json.dumps({"v": values, "o": ordering}, default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def keyset_filter(self, ordering, values) -> Q:
+        # (a, b, id) > (x, y, z) с учётом направления каждого поля:
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > z)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            op = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = list(self._page_queryset(queryset, request))
+        return self._set_page(rows)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        rows = [obj async for obj in queryset.aiterator(chunk_size=self.page_size + 1)]
+        return self._set_page(rows)
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        raw = request.query_params.get(self.cursor_query_param)
+        if raw:
+            values = self.decode_cursor(raw, self.ordering)
+            try:
+                queryset = queryset.filter(self.keyset_filter(self.ordering, values))
+            except (TypeError, ValueError, DjangoValidationError):
+                # Значения не приводятся к типам полей — курсор подделан.
+                raise NotFound(self.invalid_cursor_message)
+        return queryset.order_by(*self.ordering)[: self.page_size + 1]
+
+    def _set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.page[-1], self.ordering)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class NetworkPagination(PageNumberPagination):
+    """Постраничная пагинация по умолчанию; ``?cursor=`` включает keyset-режим."""
+
+    page_size_query_param = "page_size"
+    max_page_size = KeysetPagination.max_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант: ``acount()`` и строки страницы через ``aiterator()``."""
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        self.keyset = None
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Заранее посчитанный count: paginator.page() тогда не ходит в БД.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [
+            obj async for obj in self.page.object_list.aiterator(chunk_size=page_size)
+        ]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
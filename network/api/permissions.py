@@ -2,6 +2,9 @@ from rest_framework.permissions import BasePermission
 
 
 class IsActiveStaff(BasePermission):
-    def has_object_permission(self, request, view, obj):
+    def has_permission(self, request, view):
         u = request.user
         return bool(u and u.is_authenticated and u.is_staff and u.is_active)
+
+    def has_object_permission(self, request, view, obj):
+        return self.has_permission(request, view)
@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from network import metrics
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON-рендерер, время которого идёт в фазу ``serialize``."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.timed("serialize"):
+            return super().render(data, accepted_media_type, renderer_context)
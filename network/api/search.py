@@ -0,0 +1,35 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models.functions import Greatest
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+
+class TrigramSearchFilter(SearchFilter):
+    """``SearchFilter`` с ранжированием по сходству pg_trgm.
+
+    Условия остаются прежними (``icontains`` по ``search_fields``); на
+    PostgreSQL их обслуживают GIN-индексы ``UPPER(col::text) gin_trgm_ops``
+    из миграции 0006. Если клиент не задал ``?ordering=``, результаты
+    сортируются по убыванию сходства. На других БД поведение не меняется.
+    """
+
+    rank_annotation = "search_rank"
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms or connections[queryset.db].vendor != "postgresql":
+            return queryset
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+
+        fields = [f.lstrip("^=@$") for f in self.get_search_fields(view, request) or ()]
+        if not fields:
+            return queryset
+        query = " ".join(terms)
+        scores = [TrigramWordSimilarity(query, f) for f in fields]
+        rank = Greatest(*scores) if len(scores) > 1 else scores[0]
+        return queryset.annotate(**{self.rank_annotation: rank}).order_by(
+            f"-{self.rank_annotation}", "pk"
+        )
@@ -1,34 +1,178 @@
 from typing import Optional
 
-from django.db.models.functions import Lower
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
-from network.models import Product, Unit
+from network import metrics
+from network.hierarchy import (
+    HierarchyCycleError,
+    HierarchyDepthError,
+    resolve_placement,
+)
+from network.models import (
+    DEPTH_EXCEEDED,
+    EMAIL_CONSTRAINT,
+    EMAIL_TAKEN,
+    DebtEntry,
+    DebtRollup,
+    Product,
+    ProductAvailability,
+    Unit,
+)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def is_email_conflict(exc: IntegrityError) -> bool:
+    return EMAIL_CONSTRAINT in str(exc)
+
+
+def sparse_fields(request, expandable=()) -> Optional[set]:
+    """Поля из ``?fields=a,b`` плюс ``?expand=`` из ``expandable``.
+
+    ``None`` — параметра ``fields`` нет (или запрос на запись), нужно полное
+    представление.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    wanted = {"id", *filter(None, (f.strip() for f in raw.split(",")))}
+    expand = request.query_params.get("expand", "")
+    wanted.update(f.strip() for f in expand.split(",") if f.strip() in expandable)
+    return wanted
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """Список PK, проверяемый одним запросом ``pk__in``.
+
+    В отличие от ``PrimaryKeyRelatedField(many=True)`` не делает запрос на
+    каждый id и сообщает обо всех ненайденных id сразу. Возвращает объекты в
+    порядке первого появления id.
+    """
+
+    default_error_messages = {"does_not_exist": "Объекты не найдены: {pk_list}."}
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        kwargs["child"] = serializers.IntegerField(min_value=1)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pks = list(dict.fromkeys(super().to_internal_value(data)))
+        found = self.queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            self.fail("does_not_exist", pk_list=", ".join(map(str, missing)))
+        return [found[pk] for pk in pks]
+
+
+class TimedSerializerMixin:
+    """Время построения ``.data`` идёт в фазу ``serialize`` метрик запроса."""
+
+    @property
+    def data(self):
+        with metrics.timed("serialize"):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ("id", "name", "model", "released_at")
+        list_serializer_class = TimedListSerializer
+        fields = ("id", "name", "model", "released_at", "units_count", "updated_at")
+        read_only_fields = ("units_count", "updated_at")
+
+
+class ProductUnitSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Звено, у которого есть продукт: строка индекса ``ProductAvailability``."""
+
+    id = serializers.IntegerField(source="unit_id", read_only=True)
+    name = serializers.CharField(source="unit.name", read_only=True)
+    city = serializers.CharField(source="unit.city", read_only=True)
+    supplier = serializers.IntegerField(
+        source="unit.supplier_id", read_only=True, allow_null=True
+    )
+
+    class Meta:
+        model = ProductAvailability
+        list_serializer_class = TimedListSerializer
+        fields = ("id", "name", "kind", "country", "city", "level", "supplier")
+        read_only_fields = fields
+
+
+class DebtEntrySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DebtEntry
+        list_serializer_class = TimedListSerializer
+        fields = (
+            "id",
+            "unit",
+            "kind",
+            "amount",
+            "reference",
+            "note",
+            "created_at",
+            "applied_at",
+        )
+        read_only_fields = fields
+
+
+class DebtRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DebtRollup
+        fields = ("country", "level", "debt_total", "units_count", "debtors_count")
+
+
+class DebtTotalsSerializer(serializers.Serializer):
+    debt_total = serializers.DecimalField(max_digits=16, decimal_places=2)
+    units_count = serializers.IntegerField()
+    debtors_count = serializers.IntegerField()
+
+
+class DebtByCountrySerializer(DebtTotalsSerializer):
+    country = serializers.CharField()
+
+
+class DebtByLevelSerializer(DebtTotalsSerializer):
+    level = serializers.IntegerField()
 
 
-class UnitSerializer(serializers.ModelSerializer):
+class DebtSummarySerializer(TimedSerializerMixin, DebtTotalsSerializer):
+    unit = serializers.IntegerField(allow_null=True)
+    by_country = DebtByCountrySerializer(many=True)
+    by_level = DebtByLevelSerializer(many=True)
+    rows = DebtRollupSerializer(many=True)
+
+
+class UnitSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Звено сети; ``?fields=`` сужает ответ, ``?expand=products`` добавляет продукты."""
+
+    expandable_fields = ("products",)
+
     level = serializers.IntegerField(read_only=True)
     debt_to_supplier = serializers.DecimalField(
         max_digits=12, decimal_places=2, read_only=True
     )
     created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
     products = ProductSerializer(read_only=True, many=True)
-    product_ids = serializers.PrimaryKeyRelatedField(
-        many=True,
+    product_ids = PrimaryKeyListField(
         write_only=True,
         required=False,
         source="products",
         queryset=Product.objects.all(),
+        error_messages={"does_not_exist": "Продукты не найдены: {pk_list}."},
     )
 
     class Meta:
         model = Unit
+        list_serializer_class = TimedListSerializer
         fields = (
             "id",
             "name",
@@ -44,23 +188,28 @@ class UnitSerializer(serializers.ModelSerializer):
             "debt_to_supplier",
             "level",
             "created_at",
+            "updated_at",
         )
-        read_only_fields = ("products", "debt_to_supplier", "level", "created_at")
-
-    def validate_email(self, value: str) -> str:
-        v = (value or "").strip().lower()
-        qs = Unit.objects.annotate(email_l=Lower("email")).filter(email_l=v)
-        if self.instance:
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise serializers.ValidationError(
-                "Такой email уже используется другим звеном."
-            )
-        return v
+        read_only_fields = (
+            "products",
+            "debt_to_supplier",
+            "level",
+            "created_at",
+            "updated_at",
+        )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = sparse_fields(self.context.get("request"), self.expandable_fields)
+        if wanted is None:
+            return
+        for name in list(self.fields):
+            if name not in wanted and not self.fields[name].write_only:
+                self.fields.pop(name)
 
     def validate_supplier(self, supplier: Optional[Unit]) -> Optional[Unit]:
         inst = getattr(self, "instance", None)
-        if not inst or supplier is None:
+        if not inst or supplier is None or supplier.pk == inst.supplier_id:
             return supplier
 
         if supplier.pk == inst.pk:
@@ -68,13 +217,14 @@ class UnitSerializer(serializers.ModelSerializer):
                 "Нельзя указать самого себя как поставщика."
             )
 
-        cur = supplier
-        while cur is not None:
-            if cur.pk == inst.pk:
-                raise serializers.ValidationError(
-                    "Цепочка поставок станет циклической."
-                )
-            cur = cur.supplier
+        try:
+            placement = resolve_placement(supplier, inst.pk)
+        except HierarchyCycleError:
+            raise serializers.ValidationError("Цепочка поставок станет циклической.")
+        except HierarchyDepthError:
+            raise serializers.ValidationError(DEPTH_EXCEEDED)
+        # Unit.clean() возьмёт готовое размещение вместо повторного запроса.
+        self._placement = (supplier.pk, placement)
         return supplier
 
     def validate(self, attrs):
@@ -83,6 +233,17 @@ class UnitSerializer(serializers.ModelSerializer):
             attrs["email"] = email.strip().lower()
         return attrs
 
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as exc:
+            if is_email_conflict(exc):
+                raise serializers.ValidationError({"email": [EMAIL_TAKEN]})
+            raise
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(serializers.as_serializer_error(exc))
+
     def create(self, validated_data):
         products = validated_data.pop("products", [])
         unit = super().create(validated_data)
@@ -92,6 +253,8 @@ class UnitSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         products = validated_data.pop("products", None)
+        if hasattr(self, "_placement"):
+            instance._placement = self._placement
         unit = super().update(instance, validated_data)
         if products is not None:
             unit.products.set(products)
@@ -0,0 +1,51 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+CHUNK_SIZE = 500
+_DONE = object()
+
+
+def iter_json_array(queryset, serializer_class, context=None, chunk_size=CHUNK_SIZE):
+    """Отдаёт JSON-массив по частям, читая queryset серверным курсором."""
+    yield "["
+    sep = ""
+    buf = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        data = serializer_class(obj, context=context).data
+        buf.append(sep + json.dumps(data, cls=JSONEncoder, ensure_ascii=False))
+        sep = ","
+        if len(buf) >= chunk_size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+    yield "]"
+
+
+def streaming_response(request, content, **kwargs):
+    """``StreamingHttpResponse``, который и под ASGI отдаётся по частям.
+
+    Синхронный итератор ASGI-обработчик Django сначала собирает в список
+    целиком, поэтому под ASGI тело оборачивается в асинхронный генератор.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content = aiterate(content)
+    return StreamingHttpResponse(content, **kwargs)
+
+
+async def aiterate(iterator):
+    """Части синхронного генератора по одной, в потоке запроса.
+
+    ``thread_sensitive`` держит все шаги в том же потоке, что и view, — там
+    соединение с БД и серверный курсор ``iterator()``.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (part := await step(iterator, _DONE)) is not _DONE:
+            yield part
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
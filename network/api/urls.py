@@ -1,13 +1,14 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import ProductViewSet, UnitViewSet
+from .views import DebtEntryViewSet, ProductViewSet, UnitViewSet
 
 app_name = "network"
 
 router = DefaultRouter()
 router.register(r"units", UnitViewSet, basename="unit")
 router.register(r"products", ProductViewSet, basename="product")
+router.register(r"debt-entries", DebtEntryViewSet, basename="debt-entry")
 
 urlpatterns = [
     path("", include(router.urls)),
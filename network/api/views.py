@@ -1,28 +1,276 @@
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.viewsets import ModelViewSet
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from network.models import Product, Unit
+from network import cache, export, rollups, snapshot
+from network.hierarchy import subtree_prefix
+from network.models import DebtEntry, Product, ProductAvailability, Unit
 
+from .asyncviews import AsyncReadMixin
+from .bulk import MAX_ITEMS, UnitBulkItemSerializer, UnitBulkWriter
+from .caching import CachedReadMixin
+from .conditional import ConditionalReadMixin
+from .ledger import MAX_ITEMS as MAX_ENTRIES
+from .ledger import DebtEntryBulkItemSerializer, DebtEntryBulkWriter
+from .pagination import NetworkPagination
 from .permissions import IsActiveStaff
-from .serializers import ProductSerializer, UnitSerializer
+from .search import TrigramSearchFilter
+from .serializers import (
+    DebtEntrySerializer,
+    DebtSummarySerializer,
+    ProductSerializer,
+    ProductUnitSerializer,
+    UnitSerializer,
+    sparse_fields,
+)
+from .streaming import iter_json_array, streaming_response
 
 
-class UnitViewSet(ModelViewSet):
-    queryset = Unit.objects.select_related("supplier").prefetch_related("products")
+class UnitViewSet(ConditionalReadMixin, CachedReadMixin, AsyncReadMixin, ModelViewSet):
+    # supplier сериализуется как pk из supplier_id — JOIN не нужен.
+    queryset = Unit.objects.all()
     serializer_class = UnitSerializer
     permission_classes = [IsActiveStaff]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ["country"]
+    pagination_class = NetworkPagination
+    cache_depends_on = (cache.UNIT, cache.PRODUCT)
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, OrderingFilter]
+    filterset_fields = ["country", "level"]
     search_fields = ["name", "city", "country", "email"]
-    ordering_fields = ["name", "city", "country", "created_at"]
+    ordering_fields = ["name", "city", "country", "level", "created_at"]
 
+    def get_queryset(self):
+        return self._sparse(super().get_queryset())
 
-class ProductViewSet(ModelViewSet):
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        serializer_class=UnitBulkItemSerializer,
+    )
+    def bulk(self, request):
+        data = request.data
+        if not isinstance(data, list) or not data:
+            raise ValidationError({"non_field_errors": ["Ожидается непустой список."]})
+        if len(data) > MAX_ITEMS:
+            raise ValidationError(
+                {"non_field_errors": [f"Не больше {MAX_ITEMS} звеньев за запрос."]}
+            )
+
+        writer = UnitBulkWriter(data)
+        if not writer.is_valid():
+            return Response(writer.errors, status=status.HTTP_400_BAD_REQUEST)
+        pks = writer.save()
+
+        units = self.get_queryset().in_bulk(pks)
+        serializer = UnitSerializer(
+            [units[pk] for pk in pks], many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False)
+    def export(self, request):
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in export.FORMATS:
+            raise ValidationError({"fmt": f"Допустимо: {', '.join(export.FORMATS)}."})
+        qs = self.filter_queryset(Unit.objects.all())
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = streaming_response(
+            request,
+            export.render(qs, fmt),
+            content_type=f"{content_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="units.{fmt}"'
+        return response
+
+    @action(detail=False, url_path="snapshot")
+    def network_snapshot(self, request):
+        """Вся иерархия в бинарном колоночном виде (см. ``network.snapshot``).
+
+        ETag — версия данных сети: при совпадении ``If-None-Match`` ответ 304,
+        снимок не собирается и не читается из кэша.
+        """
+        tag = snapshot.etag()
+        if tag is not None:
+            not_modified = get_conditional_response(request, etag=tag)
+            if not_modified is not None:
+                not_modified["ETag"] = tag
+                return not_modified
+        tag, data = snapshot.current(tag)
+        response = HttpResponse(data, content_type=snapshot.CONTENT_TYPE)
+        response["ETag"] = tag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @action(detail=True)
+    def descendants(self, request, pk=None):
+        unit = self._anchor(pk)
+        qs = Unit.objects.filter(path__startswith=subtree_prefix(unit))
+        depth = self._depth_param()
+        if depth is not None:
+            qs = qs.filter(level__lte=unit.level + depth)
+        return self._stream_hierarchy(qs, ("level", "name", "id"))
+
+    @action(detail=True)
+    def ancestors(self, request, pk=None):
+        unit = self._anchor(pk)
+        qs = Unit.objects.filter(pk__in=unit.ancestor_ids)
+        depth = self._depth_param()
+        if depth is not None:
+            qs = qs.filter(level__gte=unit.level - depth)
+        return self._stream_hierarchy(qs, ("-level",))
+
+    # Оба действия на пути debt-summary/ — без явных operationId они совпадут.
+    @extend_schema(operation_id="units_debt_summary_retrieve")
+    @action(
+        detail=True, url_path="debt-summary", serializer_class=DebtSummarySerializer
+    )
+    def debt_summary(self, request, pk=None):
+        unit = self.get_object()
+        return Response(DebtSummarySerializer(rollups.summary(unit.pk)).data)
+
+    @extend_schema(operation_id="network_debt_summary_retrieve")
+    @action(
+        detail=False, url_path="debt-summary", serializer_class=DebtSummarySerializer
+    )
+    def network_debt_summary(self, request):
+        return Response(DebtSummarySerializer(rollups.summary()).data)
+
+    def _sparse(self, qs):
+        """Читает только колонки из ``?fields=``; продукты — только по запросу."""
+        wanted = sparse_fields(self.request, UnitSerializer.expandable_fields)
+        if wanted is None:
+            return qs.prefetch_related("products")
+        if "products" in wanted:
+            qs = qs.prefetch_related("products")
+        # Колонки сортировки нужны keyset-курсору следующей страницы.
+        ordering = self.request.query_params.get("ordering", "")
+        wanted |= {f.strip().lstrip("-") for f in ordering.split(",")}
+        wanted.update(Unit._meta.ordering)
+        columns = {f.name for f in Unit._meta.concrete_fields}
+        return qs.only(*sorted(wanted & columns))
+
+    def _depth_param(self):
+        raw = self.request.query_params.get("depth")
+        if raw in (None, ""):
+            return None
+        try:
+            depth = int(raw)
+        except ValueError:
+            depth = 0
+        if depth < 1:
+            raise ValidationError({"depth": "Ожидается целое число больше нуля."})
+        return depth
+
+    def _anchor(self, pk):
+        # Фильтры списка относятся к потомкам/предкам, а не к самому звену:
+        # get_object() с ними отдал бы 404 на звено из другой страны.
+        unit = get_object_or_404(Unit.objects.all(), pk=pk)
+        self.check_object_permissions(self.request, unit)
+        return unit
+
+    def _stream_hierarchy(self, qs, ordering):
+        kind = self.request.query_params.get("kind")
+        if kind:
+            qs = qs.filter(kind=kind)
+        # Фильтры и поиск списка; порядок — всегда по иерархии.
+        qs = self.filter_queryset(qs).order_by(*ordering)
+        return streaming_response(
+            self.request,
+            iter_json_array(
+                self._sparse(qs),
+                self.get_serializer_class(),
+                self.get_serializer_context(),
+            ),
+            content_type="application/json",
+        )
+
+
+class ProductViewSet(
+    ConditionalReadMixin, CachedReadMixin, AsyncReadMixin, ModelViewSet
+):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsActiveStaff]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = NetworkPagination
+    cache_depends_on = (cache.PRODUCT,)
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, OrderingFilter]
     filterset_fields = ["released_at"]
     search_fields = ["name", "model"]
     ordering_fields = ["name", "model", "released_at"]
+
+    @action(detail=True, serializer_class=ProductUnitSerializer)
+    def units(self, request, pk=None):
+        """Звенья с продуктом: ``?country=``, ``?kind=``, ``?level=``, ``?supplier=``.
+
+        ``supplier`` — звено, ниже которого искать. Читается обратный индекс
+        ``ProductAvailability``, а не M2M-таблица.
+        """
+        product = self.get_object()
+        qs = ProductAvailability.objects.filter(product=product)
+        params = request.query_params
+        for field in ("country", "kind"):
+            if params.get(field):
+                qs = qs.filter(**{field: params[field]})
+        if params.get("level"):
+            qs = qs.filter(level=self._int_param("level"))
+        if params.get("supplier"):
+            supplier = (
+                Unit.objects.filter(pk=self._int_param("supplier")).only("path").first()
+            )
+            if supplier is None:
+                raise ValidationError({"supplier": "Звено не найдено."})
+            qs = qs.filter(path__startswith=subtree_prefix(supplier))
+        qs = qs.select_related("unit").order_by("unit_id")
+
+        page = self.paginate_queryset(qs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def _int_param(self, name):
+        try:
+            return int(self.request.query_params[name])
+        except ValueError:
+            raise ValidationError({name: "Ожидается целое число."})
+
+
+class DebtEntryViewSet(
+    mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet
+):
+    """Журнал задолженности: чтение и пакетная проводка; изменять записи нельзя."""
+
+    queryset = DebtEntry.objects.all()
+    serializer_class = DebtEntrySerializer
+    permission_classes = [IsActiveStaff]
+    pagination_class = NetworkPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ["unit", "kind", "reference"]
+    ordering_fields = ["id", "created_at", "amount"]
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        serializer_class=DebtEntryBulkItemSerializer,
+    )
+    def bulk(self, request):
+        data = request.data
+        if not isinstance(data, list) or not data:
+            raise ValidationError({"non_field_errors": ["Ожидается непустой список."]})
+        if len(data) > MAX_ENTRIES:
+            raise ValidationError(
+                {"non_field_errors": [f"Не больше {MAX_ENTRIES} проводок за запрос."]}
+            )
+
+        writer = DebtEntryBulkWriter(data)
+        if not writer.is_valid():
+            return Response(writer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # 202: в debt_to_supplier проводки попадут при применении журнала.
+        return Response(writer.save(), status=status.HTTP_202_ACCEPTED)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class NetworkConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "network"
+
+    def ready(self):
+        from celery.signals import task_postrun, task_prerun, worker_ready
+        from django.db.backends.signals import connection_created
+
+        from . import metrics, signals  # noqa: F401
+
+        connection_created.connect(metrics.instrument_connection)
+        task_prerun.connect(metrics.task_started)
+        task_postrun.connect(metrics.task_finished)
+        worker_ready.connect(metrics.start_worker_server)
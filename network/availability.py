@@ -0,0 +1,166 @@
+"""Обратный индекс «продукт → звенья» (``ProductAvailability``).
+
+Строка индекса — связь из ``Unit.products`` вместе со страной, типом, уровнем
+и ``path`` звена, поэтому «кто продаёт продукт в стране X ниже завода Y»
+читается по составному индексу без JOIN со звеньями. Вместе со строками
+меняется ``Product.units_count`` — на число реально добавленных и удалённых
+строк, так что счётчик при чтении не агрегируется.
+
+Связи синхронизируются из ``m2m_changed``, пакетной записи звеньев и
+удаления звена; поля звена — из ``Unit.save`` (с перемещением поддерева) и
+``bulk_update``. Импорт и генератор сети пересобирают индекс целиком.
+"""
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Substr
+
+from . import hierarchy
+from .models import Product, ProductAvailability, Unit
+
+BATCH_SIZE = 1000
+FIELDS = ("country", "kind", "level", "path")
+
+
+def sync(unit_ids, product_ids=None) -> None:
+    """Приводит строки индекса звеньев ``unit_ids`` к их связям с продуктами.
+
+    ``product_ids`` сужает сверку до этих продуктов. Строки звеньев
+    блокируются по возрастанию pk: параллельная сверка тех же звеньев ждёт,
+    и счётчики не расходятся с индексом.
+    """
+    through = Unit.products.through
+    with transaction.atomic(savepoint=False):
+        units = {
+            pk: dict(zip(FIELDS, values))
+            for pk, *values in Unit._base_manager.filter(pk__in=set(unit_ids))
+            .order_by("pk")
+            .select_for_update()
+            .values_list("pk", *FIELDS)
+        }
+        if not units:
+            return
+        linked = through.objects.filter(unit_id__in=units)
+        indexed = ProductAvailability.objects.filter(unit_id__in=units)
+        if product_ids is not None:
+            linked = linked.filter(product_id__in=set(product_ids))
+            indexed = indexed.filter(product_id__in=set(product_ids))
+        linked = set(linked.values_list("unit_id", "product_id"))
+        indexed = {
+            (unit_id, product_id): pk
+            for pk, unit_id, product_id in indexed.values_list(
+                "pk", "unit_id", "product_id"
+            )
+        }
+
+        stale = [key for key in indexed if key not in linked]
+        ProductAvailability.objects.filter(
+            pk__in=[indexed[key] for key in stale]
+        ).delete()
+        ProductAvailability.objects.bulk_create(
+            [
+                ProductAvailability(unit_id=u, product_id=p, **units[u])
+                for u, p in linked
+                if (u, p) not in indexed
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        deltas = Counter(p for u, p in linked if (u, p) not in indexed)
+        deltas.subtract(p for _, p in stale)
+        _count(deltas)
+
+
+def product_units(product_id: int) -> list[int]:
+    """Звенья, проиндексированные для продукта (для ``units.clear()``)."""
+    return list(
+        ProductAvailability.objects.filter(product_id=product_id).values_list(
+            "unit_id", flat=True
+        )
+    )
+
+
+def unit_deleted(unit: Unit) -> None:
+    """Удаляет строки звена (до каскада) и снимает его со счётчиков продуктов."""
+    with transaction.atomic(savepoint=False):
+        rows = ProductAvailability.objects.filter(unit_id=unit.pk)
+        deltas = Counter(rows.values_list("product_id", flat=True))
+        rows.delete()
+        _count({pk: -n for pk, n in deltas.items()})
+
+
+def unit_saved(unit: Unit, old) -> None:
+    """Переносит в индекс поля звена и ``path``/``level`` его потомков."""
+    if old is None or all(getattr(unit, f) == old[f] for f in FIELDS):
+        return
+    ProductAvailability.objects.filter(unit_id=unit.pk).update(
+        **{f: getattr(unit, f) for f in FIELDS}
+    )
+    if unit.path == old["path"]:
+        return
+    # То же преобразование, что hierarchy.move_subtree сделал со звеньями;
+    # потомки ищутся по индексу path звеньев, где они уже перенесены.
+    old_prefix = f"{old['path']}{unit.pk}{hierarchy.SEPARATOR}"
+    descendants = Unit._base_manager.filter(
+        path__startswith=hierarchy.subtree_prefix(unit)
+    )
+    ProductAvailability.objects.filter(unit__in=descendants).update(
+        path=Concat(
+            Value(hierarchy.subtree_prefix(unit)),
+            Substr("path", len(old_prefix) + 1),
+        ),
+        level=F("level") + (unit.level - old["level"]),
+    )
+
+
+def units_updated(unit_ids) -> None:
+    """Перечитывает поля звеньев после ``bulk_update`` (сигналов нет)."""
+    unit = Unit._base_manager.filter(pk=OuterRef("unit_id"))
+    ProductAvailability.objects.filter(unit_id__in=set(unit_ids)).update(
+        **{f: Subquery(unit.values(f)[:1]) for f in FIELDS}
+    )
+
+
+def _count(deltas) -> None:
+    items = [(pk, n) for pk, n in deltas.items() if n]
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start : start + BATCH_SIZE]
+        Product.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            units_count=F("units_count")
+            + Case(*(When(pk=pk, then=Value(n)) for pk, n in batch), default=Value(0))
+        )
+
+
+_REBUILD_SQL = """
+INSERT INTO {availability} (product_id, unit_id, country, kind, level, path)
+SELECT t.product_id, t.unit_id, u.country, u.kind, u.level, u.path
+FROM {through} t JOIN {unit} u ON u.id = t.unit_id
+"""
+
+
+def rebuild() -> int:
+    """Пересобирает индекс и счётчики по текущим связям одним ``INSERT ... SELECT``."""
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        ProductAvailability.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _REBUILD_SQL.format(
+                    availability=qn(ProductAvailability._meta.db_table),
+                    through=qn(Unit.products.through._meta.db_table),
+                    unit=qn(Unit._meta.db_table),
+                )
+            )
+            rows = cursor.rowcount
+        counts = (
+            ProductAvailability.objects.filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(n=Count("*"))
+            .values("n")
+        )
+        # Только изменившиеся счётчики: update() ставит и updated_at.
+        count = Coalesce(Subquery(counts), 0)
+        Product.objects.exclude(units_count=count).update(units_count=count)
+    return rows
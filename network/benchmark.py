@@ -0,0 +1,284 @@
+"""Бенчмарк ключевых путей API, админки и рассылки (``manage.py benchmark``).
+
+Для каждого профиля сети создаётся отдельная тестовая БД (как у тест-раннера
+Django), сеть генерируется ``seed_demo --factories``. Сценарий выполняется
+несколько раз: число SQL-запросов сравнивается с потолком (он не должен
+зависеть от размера сети — так ловятся N+1), время — с сохранённым baseline.
+Кэш ответов API на время замеров отключён, Celery работает eager, почта —
+locmem, поэтому сеть не нужна.
+"""
+
+import io
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from math import ceil
+from typing import Callable, NamedTuple, Union
+
+from celery import current_app
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient
+
+from .models import Product, Unit
+from .tasks import send_notification_debt
+
+
+class Profile(NamedTuple):
+    factories: int
+    fanout: int
+    depth: int
+
+
+PROFILES = {
+    "small": Profile(2, 3, 2),
+    "medium": Profile(5, 6, 3),
+    "deep": Profile(2, 2, 9),
+    "large": Profile(20, 10, 3),
+}
+DEFAULT_PROFILES = ("small", "medium", "deep")
+PAGE_SIZE = 50
+# Разница меньше порога считается шумом таймера, а не регрессией.
+NOISE_MS = 2.0
+
+
+class Network(NamedTuple):
+    units: int
+    debtors: int
+
+
+class Scenario(NamedTuple):
+    name: str
+    budget: Union[int, Callable[[Network], int]]
+    run: Callable
+
+
+class Bench:
+    """Состояние одного профиля: клиенты и опорные объекты сети."""
+
+    def __init__(self):
+        user = get_user_model().objects.create_superuser(
+            "benchmark", "benchmark@example.com", "benchmark"
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+        self.admin = Client()
+        self.admin.force_login(user)
+        self.deepest = Unit.objects.order_by("-level", "pk").first()
+        factories = list(Unit.objects.filter(level=0).order_by("pk")[:2])
+        self.targets = [f.pk for f in factories]
+        self.moving = (
+            Unit.objects.filter(level=1, supplier=factories[0]).order_by("pk").first()
+        )
+        self.products = list(Product.objects.values_list("pk", flat=True)[:3])
+        self.counter = 0
+        self.network = Network(
+            Unit.objects.count(), Unit.objects.filter(debt_to_supplier__gt=0).count()
+        )
+
+    def next(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def _unit_list(b):
+    return b.api.get("/api/units/", {"page_size": PAGE_SIZE})
+
+
+def _unit_list_cursor(b):
+    return b.api.get("/api/units/", {"page_size": PAGE_SIZE, "cursor": ""})
+
+
+def _unit_retrieve(b):
+    return b.api.get(f"/api/units/{b.deepest.pk}/")
+
+
+def _unit_create(b):
+    n = b.next()
+    data = {
+        "name": f"Bench {n}",
+        "kind": Unit.Kind.SP,
+        "email": f"bench{n}@example.com",
+        "country": "DE",
+        "city": "Berlin",
+        "street": "Bench",
+        "house_number": str(n),
+        "supplier": b.deepest.pk,
+        "product_ids": b.products,
+    }
+    return b.api.post("/api/units/", data, format="json")
+
+
+def _unit_update(b):
+    # Перенос звена с поддеревом между заводами: проверка цикла, path
+    # потомков и сводки долга.
+    supplier = b.targets[b.next() % len(b.targets)]
+    return b.api.patch(
+        f"/api/units/{b.moving.pk}/", {"supplier": supplier}, format="json"
+    )
+
+
+def _product_list(b):
+    return b.api.get("/api/products/", {"page_size": PAGE_SIZE})
+
+
+def _admin_changelist(b):
+    return b.admin.get("/admin/network/unit/")
+
+
+def _notify(b):
+    run_date = date(2000, 1, 1) + timedelta(days=b.next())
+    return send_notification_debt.apply(kwargs={"run_date": run_date.isoformat()})
+
+
+def _notify_budget(network: Network) -> int:
+    chunks = ceil(network.debtors / settings.DEBT_NOTIFICATION_CHUNK_SIZE)
+    return 5 + 9 * chunks
+
+
+# Потолки не зависят от размера и глубины сети; рассылка — от числа пачек.
+SCENARIOS = (
+    Scenario("unit-list", 3, _unit_list),
+    Scenario("unit-list-cursor", 2, _unit_list_cursor),
+    Scenario("unit-retrieve", 2, _unit_retrieve),
+    Scenario("unit-create", 25, _unit_create),
+    Scenario("unit-update", 23, _unit_update),
+    Scenario("product-list", 2, _product_list),
+    Scenario("admin-changelist", 10, _admin_changelist),
+    Scenario("notify-debtors", _notify_budget, _notify),
+)
+
+
+def _ok(result) -> bool:
+    status = getattr(result, "status_code", None)
+    if status is not None:
+        return status < 400
+    return result.successful()
+
+
+def measure(bench, scenario, repeat) -> dict:
+    scenario.run(bench)  # прогрев
+    timings, queries = [], 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = scenario.run(bench)
+            timings.append((time.perf_counter() - started) * 1000)
+        if not _ok(result):
+            raise RuntimeError(f"{scenario.name}: ошибка ответа {result}")
+        queries = max(queries, len(ctx.captured_queries))
+    budget = scenario.budget
+    if callable(budget):
+        budget = budget(bench.network)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "queries": queries,
+        "budget": budget,
+        "median_ms": round(median, 2),
+        "p95_ms": round(timings[max(0, ceil(len(timings) * 0.95) - 1)], 2),
+        "rps": round(1000 / median, 1) if median else None,
+    }
+
+
+@contextmanager
+def isolated_environment():
+    """Отдельная тестовая БД, locmem-почта, eager Celery и кэш-заглушка."""
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    conf = current_app.conf
+    eager = conf.task_always_eager, conf.task_eager_propagates
+    conf.task_always_eager, conf.task_eager_propagates = True, True
+    caches = {
+        **settings.CACHES,
+        "benchmark": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    }
+    try:
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        with override_settings(CACHES=caches, API_CACHE_ALIAS="benchmark"):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        conf.task_always_eager, conf.task_eager_propagates = eager
+        teardown_test_environment()
+
+
+def run(profiles=DEFAULT_PROFILES, repeat=20, scenarios=None, progress=None) -> dict:
+    """``{профиль: {"network": {...}, "scenarios": {сценарий: метрики}}}``."""
+    progress = progress or (lambda message: None)
+    selected = [s for s in SCENARIOS if not scenarios or s.name in scenarios]
+    results = {}
+    with isolated_environment():
+        for name in profiles:
+            profile = PROFILES[name]
+            call_command("flush", interactive=False, verbosity=0)
+            call_command(
+                "seed_demo",
+                factories=profile.factories,
+                fanout=profile.fanout,
+                depth=profile.depth,
+                products=50,
+                products_per_unit=3,
+                seed=1,
+                stdout=io.StringIO(),
+            )
+            bench = Bench()
+            progress(f"{name}: {bench.network.units} звеньев")
+            metrics = {}
+            for scenario in selected:
+                metrics[scenario.name] = measure(bench, scenario, repeat)
+                progress(f"  {scenario.name}: {metrics[scenario.name]}")
+            results[name] = {
+                "network": bench.network._asdict(),
+                "scenarios": metrics,
+            }
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Нарушения: превышенные потолки запросов и замедления против baseline."""
+    problems = []
+    for profile, data in results.items():
+        base = baseline.get(profile, {}).get("scenarios", {})
+        for name, metrics in data["scenarios"].items():
+            if metrics["queries"] > metrics["budget"]:
+                problems.append(
+                    f"{profile}/{name}: {metrics['queries']} запросов "
+                    f"при потолке {metrics['budget']}"
+                )
+            before = base.get(name, {}).get("median_ms")
+            if before is None:
+                continue
+            now = metrics["median_ms"]
+            if now > before * (1 + tolerance) and now - before > NOISE_MS:
+                problems.append(
+                    f"{profile}/{name}: медиана {now} мс против {before} мс в baseline"
+                )
+    return problems
+
+
+def load_baseline(path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
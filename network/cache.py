@@ -0,0 +1,201 @@
+"""Версии данных сети и кэш ответов API.
+
+Каждой сущности (``unit``, ``product``) соответствует счётчик версии в кэше.
+Ключ закэшированного ответа включает версии, от которых ответ зависит, поэтому
+любое изменение делает старые записи недостижимыми, а TTL их вытесняет.
+Версии повышаются после коммита транзакции — из сигналов моделей и из
+``VersionedQuerySet`` для ``update()``/``bulk_*``, которые сигналов не шлют.
+Вместе с версией запоминается время изменения — для ``Last-Modified``.
+"""
+
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "network"
+UNIT = "unit"
+PRODUCT = "product"
+
+
+def _cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _version_key(name: str) -> str:
+    return f"{PREFIX}:version:{name}"
+
+
+def _modified_key(name: str) -> str:
+    return f"{PREFIX}:modified:{name}"
+
+
+def versions(*names: str) -> tuple:
+    """Текущие версии; недоступный кэш даёт ``None`` — кэширование пропускается."""
+    keys = [_version_key(n) for n in names]
+    try:
+        found = _cache().get_many(keys)
+        for key in keys:
+            if key not in found:
+                # Стартовое значение от времени, а не 1: если Redis вытеснит
+                # счётчик, старые ответы не станут снова «свежими».
+                _cache().add(key, time.time_ns() // 1000, timeout=None)
+                found[key] = _cache().get(key)
+    except Exception:
+        logger.warning("Кэш версий недоступен", exc_info=True)
+        return None
+    if None in found.values():
+        # Кэш ничего не хранит (DummyCache): версии неизвестны.
+        return None
+    return tuple(found[key] for key in keys)
+
+
+def _incr(key: str, initial: int) -> None:
+    try:
+        _cache().incr(key)
+    except ValueError:
+        # Счётчика нет: вытеснен или кэш ничего не хранит (DummyCache).
+        _cache().set(key, initial, timeout=None)
+
+
+def bump(*names: str) -> None:
+    """Повышает версии после коммита текущей транзакции."""
+
+    def _bump():
+        for name in names:
+            try:
+                _incr(_version_key(name), time.time_ns() // 1000)
+                _cache().set(_modified_key(name), time.time(), timeout=None)
+            except Exception:
+                logger.warning("Не удалось повысить версию %s", name, exc_info=True)
+
+    transaction.on_commit(_bump)
+
+
+def modified(*names: str):
+    """Время последнего изменения (Unix) любой из сущностей; ``None`` без кэша.
+
+    Неизвестное время считается текущим: лишний полный ответ лучше, чем 304
+    на изменившиеся данные.
+    """
+    keys = [_modified_key(n) for n in names]
+    try:
+        found = _cache().get_many(keys)
+        for key in keys:
+            if key not in found:
+                _cache().add(key, time.time(), timeout=None)
+                found[key] = _cache().get(key)
+    except Exception:
+        logger.warning("Кэш версий недоступен", exc_info=True)
+        return None
+    if None in found.values():
+        return None
+    return max(found[key] for key in keys)
+
+
+def name_for(model) -> str:
+    from .models import Product
+
+    return PRODUCT if issubclass(model, Product) else UNIT
+
+
+def bump_for(model) -> None:
+    bump(name_for(model))
+
+
+class VersionedQuerySet(models.QuerySet):
+    """QuerySet, повышающий версию модели при массовых изменениях.
+
+    ``update()``/``bulk_update()`` заодно ставят ``updated_at`` — ``auto_now``
+    срабатывает только в ``save()``.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        rows = super().update(**kwargs)
+        if rows:
+            bump_for(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            bump_for(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, now = tuple(objs), timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        rows = super().bulk_update(objs, {*fields, "updated_at"}, *args, **kwargs)
+        if rows:
+            bump_for(self.model)
+        return rows
+
+    def touch(self) -> int:
+        """Отмечает строки изменёнными (например, после правки их M2M-связей)."""
+        return self.update(updated_at=timezone.now())
+
+
+def response_key(scope: str, version: tuple, kwargs: dict, query_params) -> str:
+    params = sorted((k, sorted(query_params.getlist(k))) for k in query_params)
+    raw = repr((sorted(kwargs.items()), params)).encode()
+    digest = hashlib.sha1(raw).hexdigest()
+    return f"{PREFIX}:resp:{scope}:{'.'.join(map(str, version))}:{digest}"
+
+
+def get_response(key: str):
+    try:
+        return _cache().get(key)
+    except Exception:
+        logger.warning("Кэш ответов недоступен", exc_info=True)
+        return None
+
+
+def set_response(key: str, data) -> None:
+    try:
+        _cache().set(key, data, timeout=settings.API_CACHE_TTL)
+    except Exception:
+        logger.warning("Кэш ответов недоступен", exc_info=True)
+
+
+def facet_values(name: str, compute) -> list:
+    """Значения фильтра админки; ``compute`` вызывается не чаще раза в TTL."""
+    key = f"{PREFIX}:facet:{name}"
+    try:
+        return _cache().get_or_set(key, compute, timeout=settings.ADMIN_FACET_TTL)
+    except Exception:
+        logger.warning("Кэш фильтров админки недоступен", exc_info=True)
+        return compute()
+
+
+def record(scope: str, hit: bool) -> None:
+    key = f"{PREFIX}:stats:{scope}:{'hit' if hit else 'miss'}"
+    try:
+        _incr(key, 1)
+    except Exception:
+        pass
+
+
+def stats(scopes) -> dict:
+    """Счётчики попаданий и промахов: ``{"unit-list": {"hit": 10, "miss": 2}}``."""
+    keys = {
+        f"{PREFIX}:stats:{scope}:{kind}": (scope, kind)
+        for scope in scopes
+        for kind in ("hit", "miss")
+    }
+    try:
+        found = _cache().get_many(list(keys))
+    except Exception:
+        found = {}
+    result = {scope: {"hit": 0, "miss": 0} for scope in scopes}
+    for key, value in found.items():
+        scope, kind = keys[key]
+        result[scope][kind] = value
+    return result
@@ -0,0 +1,82 @@
+"""Потоковая выгрузка сети в NDJSON/CSV.
+
+Звенья читаются серверным курсором, продукты подтягиваются одним запросом на
+пачку, поэтому память не растёт с размером сети.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Unit
+
+CHUNK_SIZE = 2000
+FORMATS = ("ndjson", "csv")
+FIELDS = (
+    "id",
+    "name",
+    "kind",
+    "email",
+    "country",
+    "city",
+    "street",
+    "house_number",
+    "supplier_id",
+    "level",
+    "debt_to_supplier",
+    "created_at",
+)
+
+
+def iter_units(queryset, chunk_size=CHUNK_SIZE):
+    """Словари звеньев с ``product_ids``; продукты — один запрос на пачку."""
+    through = Unit.products.through
+    chunk = []
+    for row in queryset.values(*FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_products(chunk, through)
+            chunk = []
+    if chunk:
+        yield from _with_products(chunk, through)
+
+
+def _with_products(chunk, through):
+    products = {row["id"]: [] for row in chunk}
+    links = (
+        through.objects.filter(unit_id__in=products)
+        .order_by("unit_id", "product_id")
+        .values_list("unit_id", "product_id")
+    )
+    for unit_id, product_id in links:
+        products[unit_id].append(product_id)
+    for row in chunk:
+        row["product_ids"] = products[row["id"]]
+        yield row
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([*FIELDS, "product_ids"])
+    for row in rows:
+        values = [row[f] for f in FIELDS]
+        values[FIELDS.index("created_at")] = row["created_at"].isoformat()
+        yield writer.writerow([*values, ";".join(str(pk) for pk in row["product_ids"])])
+
+
+def render(queryset, fmt: str):
+    if not queryset.query.order_by:
+        queryset = queryset.order_by("pk")
+    rows = iter_units(queryset)
+    return iter_csv(rows) if fmt == "csv" else iter_ndjson(rows)
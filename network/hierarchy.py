@@ -0,0 +1,156 @@
+"""Материализованная иерархия звеньев сети.
+
+У каждого звена хранится ``level`` (глубина от завода) и ``path`` — id всех
+предков от корня к родителю, каждый с завершающим разделителем, например
+``"1/5/"``. Потомки звена ``X`` — это строки с ``path``, начинающимся с
+``X.path + f"{X.pk}/"``, поэтому и уровень, и проверки предков читаются из
+колонок без обхода ``supplier``.
+"""
+
+from typing import NamedTuple
+
+from django.db import connection
+from django.db.models import F, Max, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+SEPARATOR = "/"
+MAX_DEPTH = 100
+# На каждом уровне — id (bigint, до 19 цифр) и разделитель.
+PATH_MAX_LENGTH = MAX_DEPTH * 20
+
+
+class HierarchyCycleError(ValueError):
+    pass
+
+
+class HierarchyDepthError(ValueError):
+    """Цепочка глубже ``MAX_DEPTH`` или ``path`` не помещается в колонку."""
+
+
+class Placement(NamedTuple):
+    level: int
+    path: str
+
+
+ROOT = Placement(0, "")
+
+_CHAIN_SQL = """
+WITH RECURSIVE chain (id, supplier_id, depth) AS (
+    SELECT id, supplier_id, 0 FROM {table} WHERE id = %(supplier)s
+    UNION ALL
+    SELECT u.id, u.supplier_id, chain.depth + 1
+    FROM {table} u JOIN chain ON u.id = chain.supplier_id
+    WHERE chain.id <> %(unit)s AND chain.depth < %(max_depth)s
+)
+SELECT
+    COUNT(*),
+    COALESCE(BOOL_OR(id = %(unit)s), FALSE),
+    COALESCE(STRING_AGG(id::text || '/', '' ORDER BY depth DESC), '')
+FROM chain
+"""
+
+
+def child_path(supplier) -> str:
+    """Путь звена, у которого поставщик ``supplier``."""
+    if supplier is None:
+        return ""
+    return f"{supplier.path}{supplier.pk}{SEPARATOR}"
+
+
+def subtree_prefix(unit) -> str:
+    """Префикс ``path`` всех потомков звена."""
+    return f"{unit.path}{unit.pk}{SEPARATOR}"
+
+
+def ancestor_ids(path: str) -> list[int]:
+    """Id предков от корня к непосредственному поставщику."""
+    return [int(p) for p in path.split(SEPARATOR) if p]
+
+
+def resolve_placement(supplier, unit_id=None) -> Placement:
+    """Уровень и путь звена ``unit_id`` при поставщике ``supplier``.
+
+    ``supplier`` — экземпляр ``Unit``, его id или ``None``. Бросает
+    ``HierarchyCycleError``, если звено оказалось бы своим же предком, и
+    ``HierarchyDepthError``, если цепочка слишком глубокая.
+    На PostgreSQL цепочка проверяется одним рекурсивным CTE по реальным
+    ``supplier_id``; на остальных БД — по материализованному ``path``
+    поставщика (не больше одного SELECT).
+    """
+    from .models import Unit
+
+    if supplier is None:
+        return ROOT
+    supplier_id = supplier if isinstance(supplier, int) else supplier.pk
+    if unit_id is not None and supplier_id == unit_id:
+        raise HierarchyCycleError(supplier_id)
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _CHAIN_SQL.format(table=connection.ops.quote_name(Unit._meta.db_table)),
+                {"supplier": supplier_id, "unit": unit_id or 0, "max_depth": MAX_DEPTH},
+            )
+            level, cycle, path = cursor.fetchone()
+        if cycle:
+            raise HierarchyCycleError(supplier_id)
+        return _checked(Placement(level, path))
+
+    if isinstance(supplier, int):
+        row = Unit._base_manager.filter(pk=supplier_id).values_list("path").first()
+        supplier_path = row[0] if row else ""
+    else:
+        supplier_path = supplier.path
+    if unit_id is not None and unit_id in ancestor_ids(supplier_path):
+        raise HierarchyCycleError(supplier_id)
+    path = f"{supplier_path}{supplier_id}{SEPARATOR}"
+    return _checked(Placement(path.count(SEPARATOR), path))
+
+
+def _checked(placement: Placement) -> Placement:
+    # CTE обрывает цепочку на MAX_DEPTH + 1 звеньях, так что level > MAX_DEPTH
+    # означает «слишком глубоко», а не точную глубину.
+    if placement.level > MAX_DEPTH or len(placement.path) > PATH_MAX_LENGTH:
+        raise HierarchyDepthError(placement.level)
+    return placement
+
+
+def check_subtree(unit, placement: Placement) -> None:
+    """Проверяет, что потомки звена поместятся после переноса в ``placement``.
+
+    ``unit.path``/``unit.level`` — текущие значения из БД. Длину ``path``
+    отдельно проверять не нужно: она не больше ``20 * level``. Запрос к БД —
+    только если поддерево опускается глубже. Бросает ``HierarchyDepthError``.
+    """
+    shift = placement.level - unit.level
+    if shift <= 0:
+        return
+    deepest = (
+        type(unit)
+        ._base_manager.filter(path__startswith=subtree_prefix(unit))
+        .aggregate(level=Max("level"))["level"]
+    )
+    if deepest is not None and deepest + shift > MAX_DEPTH:
+        raise HierarchyDepthError(deepest)
+
+
+def move_subtree(unit, old_path: str, old_level: int) -> int:
+    """Переписывает ``path``/``level`` потомков после смены поставщика.
+
+    Вызывается после сохранения самого звена; ``old_path`` и ``old_level`` —
+    значения до перемещения. Возвращает число обновлённых потомков.
+    """
+    old_prefix = f"{old_path}{unit.pk}{SEPARATOR}"
+    new_prefix = subtree_prefix(unit)
+    if old_prefix == new_prefix:
+        return 0
+    return (
+        type(unit)
+        ._base_manager.filter(path__startswith=old_prefix)
+        .update(
+            path=Concat(Value(new_prefix), Substr("path", len(old_prefix) + 1)),
+            level=F("level") + (unit.level - old_level),
+            updated_at=timezone.now(),
+        )
+    )
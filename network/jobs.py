@@ -0,0 +1,132 @@
+"""Массовые действия админки в фоне (``AdminJob``).
+
+Действие в админке сохраняет выборку как непрерывные диапазоны id
+(``[[от, до], ...]``, один запрос на множество) и ставит задачу
+``run_admin_job``. Задача проходит выборку по возрастанию id пачками по
+``ADMIN_JOB_CHUNK_SIZE`` звеньев; каждая пачка — своя короткая транзакция,
+в которой вместе со строками сдвигается и курсор задания. Повтор задачи после
+сбоя продолжает с курсора и не применяет пачку дважды.
+
+Выборка — снимок на момент запуска: новые звенья (с большими id) в неё не
+попадают, удалённые просто пропускаются.
+"""
+
+import bisect
+import itertools
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups
+from .models import AdminJob, Unit
+
+CHUNK_SIZE = 1000
+
+# Обработчик получает queryset диапазона и возвращает число изменённых звеньев.
+HANDLERS = {
+    AdminJob.Action.CLEAR_DEBT: rollups.clear_debt,
+}
+
+
+# Острова подряд идущих id выборки: у id одного острова разность с номером
+# строки одинакова.
+_RANGES_SQL = """
+SELECT MIN(pk), MAX(pk) FROM (
+    SELECT pk, pk - ROW_NUMBER() OVER (ORDER BY pk) AS island FROM ({}) s
+) t
+GROUP BY island ORDER BY 1
+"""
+
+
+def id_ranges(queryset) -> list[list[int]]:
+    """Выборка как отсортированные диапазоны id ``[[от, до], ...]``."""
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(_RANGES_SQL.format(sql), params)
+        return [[lo, hi] for lo, hi in cursor.fetchall()]
+
+
+def create(action: str, queryset, user=None) -> AdminJob:
+    ranges = id_ranges(queryset)
+    return AdminJob.objects.create(
+        action=action,
+        user=user if user is not None and user.is_authenticated else None,
+        selection=ranges,
+        total=sum(hi - lo + 1 for lo, hi in ranges),
+    )
+
+
+def next_chunk(ranges, cursor: int, chunk_size: int) -> list[int]:
+    """Следующие id выборки после ``cursor``, не больше ``chunk_size``."""
+    ids = []
+    first = bisect.bisect_right(ranges, cursor, key=lambda r: r[1])
+    for lo, hi in itertools.islice(ranges, first, None):
+        start = max(lo, cursor + 1)
+        ids.extend(range(start, min(hi, start + chunk_size - len(ids) - 1) + 1))
+        if len(ids) == chunk_size:
+            break
+    return ids
+
+
+def run(job_id: int, chunk_size: int = CHUNK_SIZE) -> AdminJob:
+    job = AdminJob.objects.get(pk=job_id)
+    if job.status == AdminJob.Status.DONE:
+        return job
+    handler = HANDLERS[job.action]
+    AdminJob.objects.filter(pk=job.pk).update(
+        status=AdminJob.Status.RUNNING, error="", notified=False
+    )
+
+    cursor = job.cursor
+    try:
+        while ids := next_chunk(job.selection, cursor, chunk_size):
+            cursor = _run_chunk(job.pk, handler, cursor, ids)
+    except Exception as exc:
+        AdminJob.objects.filter(pk=job.pk).update(
+            status=AdminJob.Status.FAILED, error=str(exc)[:1000]
+        )
+        raise
+
+    AdminJob.objects.filter(pk=job.pk).update(
+        status=AdminJob.Status.DONE, finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
+
+
+def _run_chunk(job_id, handler, cursor, ids) -> int:
+    with transaction.atomic():
+        # Строка задания блокируется на время диапазона: дубль задачи
+        # дождётся её и продолжит с уже сдвинутого курсора.
+        current = (
+            AdminJob.objects.select_for_update()
+            .values_list("cursor", flat=True)
+            .get(pk=job_id)
+        )
+        if current != cursor:
+            return current
+        last = ids[-1]
+        affected = handler(Unit.objects.filter(pk__in=ids))
+        AdminJob.objects.filter(pk=job_id).update(
+            cursor=last,
+            processed=F("processed") + len(ids),
+            affected=F("affected") + affected,
+        )
+    return last
+
+
+def unreported(user) -> list[AdminJob]:
+    """Незавершённые и ещё не показанные завершённые задания пользователя.
+
+    Завершённые отмечаются показанными — итог сообщается один раз.
+    """
+    jobs = list(AdminJob.objects.filter(user=user, notified=False).defer("selection"))
+    finished = [
+        job.pk
+        for job in jobs
+        if job.status in (AdminJob.Status.DONE, AdminJob.Status.FAILED)
+    ]
+    if finished:
+        AdminJob.objects.filter(pk__in=finished).update(notified=True)
+    return jobs
@@ -0,0 +1,126 @@
+"""Журнал задолженности: проводки и их применение к ``debt_to_supplier``.
+
+Проводки (``DebtEntry``) только вставляются — параллельные оплаты и
+начисления по одному звену не конкурируют за его строку. Баланс звена
+материализуется периодической задачей ``apply_debt_ledger``: она забирает
+неучтённые проводки пачками (``FOR UPDATE SKIP LOCKED`` — несколько воркеров
+не мешают друг другу), складывает их по звеньям и одной короткой транзакцией
+на пачку обновляет балансы, сводки ``DebtRollup`` и версию кэша.
+
+Баланс не уходит ниже нуля: переплата фиксируется корректировкой на сумму
+излишка, поэтому изменение баланса всегда равно сумме учтённых проводок.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import rollups
+from .models import DebtEntry, Unit
+
+ZERO = Decimal("0.00")
+BATCH_SIZE = 5000
+INSERT_BATCH_SIZE = 1000
+OVERPAYMENT_NOTE = "Переплата сверх задолженности"
+OPENING_NOTE = "Начальный баланс"
+
+
+def post(entries: list[DebtEntry]) -> None:
+    """Добавляет проводки в журнал; дубли по ``(unit, reference)`` пропускаются."""
+    DebtEntry.objects.bulk_create(
+        entries, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def opening_entries(balances: dict) -> list[DebtEntry]:
+    """Учтённые проводки на баланс, записанный новым звеньям напрямую.
+
+    ``balances`` — ``{unit_id: долг}``; с ними баланс звена по-прежнему
+    равен сумме учтённых проводок.
+    """
+    now = timezone.now()
+    return [
+        DebtEntry(
+            unit_id=pk,
+            kind=DebtEntry.Kind.ADJUSTMENT,
+            amount=debt,
+            note=OPENING_NOTE,
+            applied_at=now,
+        )
+        for pk, debt in balances.items()
+        if debt > 0
+    ]
+
+
+def apply_pending(batch_size: int = BATCH_SIZE) -> int:
+    """Учитывает все неприменённые проводки; возвращает их число."""
+    applied = 0
+    while True:
+        count = _apply_batch(batch_size)
+        applied += count
+        if count < batch_size:
+            return applied
+
+
+def _apply_batch(batch_size: int) -> int:
+    with transaction.atomic():
+        entries = list(
+            DebtEntry.objects.filter(applied_at__isnull=True)
+            .order_by("pk")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", "unit_id", "kind", "amount")[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        deltas = defaultdict(lambda: ZERO)
+        for _, unit_id, kind, amount in entries:
+            deltas[unit_id] += DebtEntry.SIGNS[kind] * amount
+
+        # Строки звеньев блокируются по возрастанию pk — без взаимоблокировок
+        # с параллельной пачкой, задевшей те же звенья.
+        before = list(
+            Unit.objects.filter(pk__in=deltas)
+            .order_by("pk")
+            .select_for_update()
+            .values_list("pk", "path", "country", "level", "debt_to_supplier")
+        )
+        now = timezone.now()
+        changed, after, adjustments = [], [], []
+        for pk, path, country, level, debt in before:
+            balance = debt + deltas[pk]
+            if balance < 0:
+                adjustments.append(
+                    DebtEntry(
+                        unit_id=pk,
+                        kind=DebtEntry.Kind.ADJUSTMENT,
+                        amount=-balance,
+                        note=OVERPAYMENT_NOTE,
+                        applied_at=now,
+                    )
+                )
+                balance = ZERO
+            if balance != debt:
+                changed.append((pk, path, country, level, debt))
+                after.append((pk, path, country, level, balance))
+
+        _set_balances({row[0]: row[4] for row in after})
+        rollups.units_changed(changed, after)
+        DebtEntry.objects.bulk_create(adjustments, batch_size=INSERT_BATCH_SIZE)
+        DebtEntry.objects.filter(pk__in=[e[0] for e in entries]).update(applied_at=now)
+    return len(entries)
+
+
+def _set_balances(balances: dict) -> None:
+    items = list(balances.items())
+    field = Unit._meta.get_field("debt_to_supplier")
+    for start in range(0, len(items), INSERT_BATCH_SIZE):
+        batch = items[start : start + INSERT_BATCH_SIZE]
+        Unit.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            debt_to_supplier=Case(
+                *(When(pk=pk, then=Value(v)) for pk, v in batch), output_field=field
+            )
+        )
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from network import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет число SQL-запросов и время ключевых эндпоинтов на сетях разного "
+        "размера во временной тестовой БД и сравнивает с потолками и baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=benchmark.PROFILES,
+            default=benchmark.DEFAULT_PROFILES,
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[s.name for s in benchmark.SCENARIOS],
+            help="Только этот сценарий (можно повторять).",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--baseline",
+            default=str(settings.BASE_DIR / "benchmark-baseline.json"),
+            help="JSON с результатами прошлого прогона.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Записать результаты в --baseline вместо сравнения по времени.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Допустимое замедление медианы относительно baseline (0.5 = +50%%).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["repeat"] < 1:
+            raise CommandError("--repeat должен быть больше нуля.")
+        results = benchmark.run(
+            opts["profiles"],
+            opts["repeat"],
+            opts["scenario"],
+            progress=lambda message: self.stderr.write(message),
+        )
+
+        baseline = (
+            {} if opts["save_baseline"] else benchmark.load_baseline(opts["baseline"])
+        )
+        self._report(results, baseline)
+        problems = benchmark.compare(results, baseline, opts["tolerance"])
+        if opts["save_baseline"]:
+            benchmark.save_baseline(opts["baseline"], results)
+            self.stdout.write(f"Baseline записан в {opts['baseline']}")
+        if problems:
+            for problem in problems:
+                self.stderr.write(self.style.ERROR(problem))
+            raise CommandError(f"Регрессий: {len(problems)}.")
+        self.stdout.write(self.style.SUCCESS("Регрессий нет."))
+
+    def _report(self, results, baseline):
+        header = f"{'сценарий':<20} {'запросы':>9} {'медиана':>9} {'p95':>9} {'rps':>8} {'baseline':>9}"
+        for profile, data in results.items():
+            network = data["network"]
+            self.stdout.write(
+                f"\n{profile}: {network['units']} звеньев, должников {network['debtors']}"
+            )
+            self.stdout.write(header)
+            base = baseline.get(profile, {}).get("scenarios", {})
+            for name, m in data["scenarios"].items():
+                before = base.get(name, {}).get("median_ms", "—")
+                self.stdout.write(
+                    f"{name:<20} {m['queries']:>4}/{m['budget']:<4} "
+                    f"{m['median_ms']:>9} {m['p95_ms']:>9} {m['rps']:>8} {before:>9}"
+                )
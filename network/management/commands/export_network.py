@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from network import export
+from network.models import Unit
+
+
+class Command(BaseCommand):
+    help = "Выгружает все звенья сети (с поставщиком, уровнем и продуктами) в NDJSON или CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="ndjson")
+        parser.add_argument("--output", help="Файл для выгрузки (по умолчанию stdout).")
+        parser.add_argument("--country", help="Только звенья этой страны.")
+        parser.add_argument("--kind", choices=Unit.Kind.values)
+        parser.add_argument("--level", type=int)
+
+    def handle(self, *args, **opts):
+        qs = Unit.objects.all()
+        for field in ("country", "kind", "level"):
+            if opts.get(field) is not None:
+                qs = qs.filter(**{field: opts[field]})
+
+        out = (
+            open(opts["output"], "w", encoding="utf-8", newline="")
+            if opts.get("output")
+            else sys.stdout
+        )
+        try:
+            for line in export.render(qs, opts["format"]):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+                self.stderr.write(self.style.SUCCESS(f"Выгружено в {opts['output']}"))
@@ -0,0 +1,79 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует звенья и продукты из CSV/NDJSON (COPY во временные таблицы, "
+        "upsert по email и (name, model)). Только PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--units", help="Файл звеньев ('-' — stdin).")
+        parser.add_argument("--products", help="Файл продуктов ('-' — stdin).")
+        parser.add_argument(
+            "--format",
+            choices=importer.FORMATS,
+            help="Формат обоих файлов; по умолчанию по расширению (.csv, иначе NDJSON).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=importer.CHUNK_SIZE,
+            help="Строк на одну пачку COPY и одну транзакцию записи.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только загрузить и проверить, ничего не записывая.",
+        )
+
+    def handle(self, *args, **opts):
+        if not opts.get("units") and not opts.get("products"):
+            raise CommandError("Укажите --units и/или --products.")
+        if opts["units"] == "-" and opts["products"] == "-":
+            raise CommandError("stdin можно использовать только для одного файла.")
+        if opts["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля.")
+
+        try:
+            job = importer.NetworkImporter(opts["chunk_size"], self._progress)
+        except importer.UnsupportedDatabaseError as exc:
+            raise CommandError(str(exc))
+
+        streams = {}
+        try:
+            for name in ("units", "products"):
+                path = opts.get(name)
+                if not path:
+                    continue
+                fmt = opts["format"] or importer.detect_format(path)
+                if path == "-":
+                    streams[name] = (sys.stdin, fmt)
+                else:
+                    streams[name] = (open(path, encoding="utf-8", newline=""), fmt)
+            stats = job.run(dry_run=opts["dry_run"], **streams)
+        except importer.NetworkImportError as exc:
+            for line, message in exc.errors:
+                self.stderr.write(f"строка {line}: {message}")
+            if exc.total > len(exc.errors):
+                self.stderr.write(f"... и ещё {exc.total - len(exc.errors)}")
+            raise CommandError(f"{exc} Ничего не записано.")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            for stream, _ in streams.values():
+                if stream is not sys.stdin:
+                    stream.close()
+
+        for key, value in stats.items():
+            self.stdout.write(f"{key}: {value}")
+        verb = "Проверено" if opts["dry_run"] else "Импортировано"
+        self.stdout.write(self.style.SUCCESS(f"{verb} без ошибок."))
+
+    def _progress(self, stage, done, total):
+        suffix = f"/{total}" if total else ""
+        self.stderr.write(f"{stage}: {done}{suffix}")
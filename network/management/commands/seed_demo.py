@@ -1,28 +1,251 @@
+import random
+from datetime import date, timedelta
 from decimal import Decimal
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
-from network.models import Product, Unit
+from network import availability, cache, hierarchy, ledger, rollups
+from network.models import (
+    DebtEntry,
+    DebtNotification,
+    DebtRollup,
+    Product,
+    ProductAvailability,
+    Unit,
+)
+
+SYNTHETIC_DOMAIN = "synthetic.example.com"
+SYNTHETIC_PRODUCT = "Synthetic"
+COUNTRIES = {
+    "DE": ("Berlin", "Munich", "Hamburg", "Cologne"),
+    "PL": ("Warsaw", "Gdansk", "Poznan", "Krakow"),
+    "CZ": ("Prague", "Brno"),
+    "FR": ("Paris", "Lyon", "Marseille"),
+    "IT": ("Milan", "Rome", "Turin"),
+    "NL": ("Amsterdam", "Rotterdam"),
+}
+COUNTRY_WEIGHTS = (30, 20, 10, 20, 12, 8)
+# Доля звеньев без долга и параметры логнормального долга остальных.
+NO_DEBT_SHARE = 0.35
+DEBT_MU, DEBT_SIGMA = 9.0, 1.3
+MAX_DEBT = 9_999_999.99
 
 
 class Command(BaseCommand):
-    help = "Создаёт демонстрационные данные: продукты, заводы, розницу и ИП (с долгами и связями)."
+    help = (
+        "Создаёт демонстрационные данные: продукты, заводы, розницу и ИП (с долгами и связями). "
+        "С --factories генерирует синтетическую сеть заданного размера для нагрузочных тестов."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--reset",
             action="store_true",
-            help="Очистить связанные таблицы (Units/Products) перед созданием демо-данных.",
+            help=(
+                "Очистить звенья, продукты и производные таблицы перед созданием демо-данных; "
+                "журнал задолженности, рассылки и фоновые действия не трогаются."
+            ),
+        )
+        parser.add_argument(
+            "--reset-all",
+            action="store_true",
+            help="Очистить все таблицы приложения, включая журнал задолженности и рассылки.",
+        )
+        synthetic = parser.add_argument_group("синтетическая сеть")
+        synthetic.add_argument(
+            "--factories",
+            type=int,
+            default=0,
+            help="Число заводов; больше нуля включает генерацию вместо фиксированного демо.",
+        )
+        synthetic.add_argument(
+            "--fanout",
+            type=int,
+            default=5,
+            help="Среднее число клиентов у звена (от 0 до 2*fanout).",
+        )
+        synthetic.add_argument(
+            "--depth", type=int, default=3, help="Уровней под заводами."
+        )
+        synthetic.add_argument(
+            "--products", type=int, default=100, help="Размер каталога продуктов."
+        )
+        synthetic.add_argument("--products-per-unit", type=int, default=3)
+        synthetic.add_argument(
+            "--seed", type=int, default=42, help="Зерно генератора (детерминизм)."
         )
+        synthetic.add_argument("--batch-size", type=int, default=5000)
 
-    @transaction.atomic
     def handle(self, *args, **options):
-        if options.get("reset"):
+        if options.get("reset_all"):
+            self.stdout.write(self.style.WARNING("Удаляю все данные приложения..."))
+            self._flush(self._app_models())
+        elif options.get("reset"):
             self.stdout.write(self.style.WARNING("Удаляю старые данные..."))
-            Unit.objects.all().delete()
-            Product.objects.all().delete()
+            self._flush(self._network_models())
+        if options["factories"] > 0:
+            self._generate(options)
+        else:
+            self._seed_fixed()
+
+    @staticmethod
+    def _app_models():
+        return apps.get_app_config("network").get_models(include_auto_created=True)
+
+    @staticmethod
+    def _network_models():
+        """Звенья, продукты, M2M и производные таблицы.
+
+        Журнал задолженности и уведомления ссылаются на звенья и без них
+        не живут: если они не пусты, нужен явный ``--reset-all``.
+        """
+        owned = (DebtEntry, DebtNotification)
+        if any(model.objects.exists() for model in owned):
+            raise CommandError(
+                "У звеньев есть журнал задолженности или уведомления; "
+                "для полной очистки запустите с --reset-all."
+            )
+        # Пустые таблицы со ссылками на звенья очищаются вместе с ними:
+        # TRUNCATE без них не пройдёт.
+        return (
+            Unit,
+            Product,
+            Unit.products.through,
+            DebtRollup,
+            ProductAvailability,
+            *owned,
+        )
+
+    def _flush(self, models):
+        """Очищает таблицы одним TRUNCATE/DELETE, без сигналов по строкам."""
+        tables = [m._meta.db_table for m in models]
+        sql = connection.ops.sql_flush(no_style(), tables, allow_cascade=False)
+        with transaction.atomic():
+            connection.ops.execute_sql_flush(sql)
+        cache.bump(cache.UNIT, cache.PRODUCT)
+
+    def _generate(self, options):
+        fanout, depth = options["fanout"], options["depth"]
+        per_unit, batch_size = options["products_per_unit"], options["batch_size"]
+        if fanout < 0 or depth < 0 or per_unit < 0 or batch_size < 1:
+            raise CommandError("Параметры генерации не могут быть отрицательными.")
+        if depth >= hierarchy.MAX_DEPTH:
+            raise CommandError(f"--depth должен быть меньше {hierarchy.MAX_DEPTH}.")
+        if Unit.objects.filter(email__endswith=f"@{SYNTHETIC_DOMAIN}").exists():
+            raise CommandError("Синтетическая сеть уже есть; запустите с --reset.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = batch_size
+        self.per_unit = per_unit
+        self.seq = 0
+        self.product_ids = self._generate_products(options["products"])
 
+        parents = [(None, "", None)] * options["factories"]
+        for level in range(depth + 1):
+            keep = level < depth
+            children = []
+            batch = []
+            for parent in parents:
+                count = 1 if level == 0 else self.rng.randint(0, 2 * fanout)
+                for _ in range(count):
+                    batch.append(self._unit(level, *parent))
+                    if len(batch) >= batch_size:
+                        children.extend(self._save_units(batch, keep))
+                        batch = []
+            children.extend(self._save_units(batch, keep))
+            self.stdout.write(
+                self.style.NOTICE(f"Уровень {level}: всего звеньев {self.seq}")
+            )
+            parents = children
+            if not parents:
+                break
+
+        self.stdout.write(
+            self.style.NOTICE(
+                "Пересчитываю сводки задолженности и наличие продуктов..."
+            )
+        )
+        rollups.rebuild()
+        availability.rebuild()
+        # Вставки в M2M-таблицу идут мимо m2m_changed.
+        cache.bump(cache.UNIT)
+        self.stdout.write(
+            self.style.SUCCESS(f"\nГотово! Синтетическая сеть: {self.seq} звеньев.\n")
+        )
+
+    def _generate_products(self, count):
+        start = date(2015, 1, 1)
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"{SYNTHETIC_PRODUCT} {i:06d}",
+                    model=f"M{self.rng.randrange(100, 1000)}",
+                    released_at=start + timedelta(days=self.rng.randrange(3650)),
+                )
+                for i in range(count)
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        ids = Product.objects.filter(name__startswith=f"{SYNTHETIC_PRODUCT} ")
+        return sorted(ids.values_list("pk", flat=True))
+
+    def _debt(self):
+        if self.rng.random() < NO_DEBT_SHARE:
+            return Decimal("0.00")
+        debt = min(self.rng.lognormvariate(DEBT_MU, DEBT_SIGMA), MAX_DEBT)
+        return Decimal(f"{debt:.2f}")
+
+    def _unit(self, level, supplier_id, path, country):
+        self.seq += 1
+        if supplier_id is None:
+            kind, debt = Unit.Kind.FACTORY, Decimal("0.00")
+        else:
+            # Ближе к заводу — больше розничных сетей, в глубине — ИП.
+            retail = self.rng.random() < 0.6 / level
+            kind = Unit.Kind.RETAIL if retail else Unit.Kind.SP
+            debt = self._debt()
+        if country is None or self.rng.random() < 0.2:
+            country = self.rng.choices(list(COUNTRIES), COUNTRY_WEIGHTS)[0]
+        return Unit(
+            name=f"{kind.label} {self.seq}",
+            kind=kind,
+            email=f"unit{self.seq}@{SYNTHETIC_DOMAIN}",
+            country=country,
+            city=self.rng.choice(COUNTRIES[country]),
+            street=f"Street {self.rng.randrange(1, 500)}",
+            house_number=str(self.rng.randrange(1, 200)),
+            supplier_id=supplier_id,
+            debt_to_supplier=debt,
+            path=path,
+            level=level,
+        )
+
+    def _save_units(self, batch, keep):
+        """Пишет пачку; для следующего уровня возвращает (id, path детей, страна)."""
+        if not batch:
+            return []
+        Unit.objects.bulk_create(batch, batch_size=self.batch_size)
+        ledger.post(ledger.opening_entries({u.pk: u.debt_to_supplier for u in batch}))
+        k = min(self.per_unit, len(self.product_ids))
+        through = Unit.products.through
+        through.objects.bulk_create(
+            [
+                through(unit_id=unit.pk, product_id=pid)
+                for unit in batch
+                for pid in self.rng.sample(self.product_ids, k)
+            ],
+            batch_size=self.batch_size,
+        )
+        if not keep:
+            return []
+        return [(u.pk, hierarchy.child_path(u), u.country) for u in batch]
+
+    @transaction.atomic
+    def _seed_fixed(self):
         self.stdout.write(self.style.NOTICE("Создаю продукты..."))
         products_data = [
             ("Smart TV", "Q90", "2024-02-15"),
@@ -180,4 +403,11 @@ class Command(BaseCommand):
                 products[("Tablet", "T10")],
             ]
         )
+        # Долги заданы напрямую — в журнал они попадают начальными проводками;
+        # звенья, у которых журнал уже есть, не трогаются.
+        units = (factory_a, factory_b, retail_x, retail_y, sp_anna, sp_bob, sp_chen)
+        fresh = Unit.objects.filter(
+            pk__in=[u.pk for u in units], debt_entries__isnull=True
+        ).values_list("pk", "debt_to_supplier")
+        ledger.post(ledger.opening_entries(dict(fresh)))
         self.stdout.write(self.style.SUCCESS("\nГотово! Демо-данные созданы.\n"))
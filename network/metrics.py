@@ -0,0 +1,290 @@
+"""Метрики запросов и задач Celery: SQL, сериализация, аутентификация, итог.
+
+Запрос (``RequestMetricsMiddleware``) или задача (сигналы Celery) открывает
+``Span`` в contextvar; обёртка ``execute_wrapper``, повешенная на каждое
+соединение с БД, и ``timed()`` добавляют в него время по фазам. По закрытии
+span попадает в гистограммы Prometheus, а если он дольше порога — в лог
+вместе с самыми дорогими SQL.
+
+При ``PROMETHEUS_MULTIPROC_DIR`` значения пишутся в файлы каталога и
+собираются ``MultiProcessCollector`` — так видны метрики всех процессов
+сервера и пула воркера.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+# Каталог многопроцессных метрик создаётся при старте: без него каждая запись
+# падает с FileNotFoundError (entrypoint.sh есть не у всех способов запуска).
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+SECONDS_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+PHASES = ("db", "serialize", "auth")
+TOP_STATEMENTS = 5
+STATEMENT_PREVIEW = 300
+CACHE_SCOPES = ("unit-list", "unit-retrieve", "product-list", "product-retrieve")
+
+REQUEST_DURATION = Histogram(
+    "network_http_request_duration_seconds",
+    "Полное время обработки запроса.",
+    ("route", "method", "status"),
+    buckets=SECONDS_BUCKETS,
+)
+REQUEST_PHASE = Histogram(
+    "network_http_request_phase_seconds",
+    "Время запроса по фазам: SQL, сериализация, аутентификация.",
+    ("route", "method", "phase"),
+    buckets=SECONDS_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "network_http_request_queries",
+    "Число SQL-запросов на запрос.",
+    ("route", "method"),
+    buckets=QUERIES_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    "network_celery_task_duration_seconds",
+    "Полное время выполнения задачи.",
+    ("task", "state"),
+    buckets=SECONDS_BUCKETS,
+)
+TASK_PHASE = Histogram(
+    "network_celery_task_phase_seconds",
+    "Время задачи по фазам.",
+    ("task", "phase"),
+    buckets=SECONDS_BUCKETS,
+)
+TASK_QUERIES = Histogram(
+    "network_celery_task_queries",
+    "Число SQL-запросов на задачу.",
+    ("task",),
+    buckets=QUERIES_BUCKETS,
+)
+
+
+class Span:
+    """Замер одного запроса или задачи."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.statements = {}  # sql -> [число, секунды]
+        self._active = set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        self.queries += 1
+        self.phases["db"] += seconds
+        stat = self.statements.get(sql)
+        if stat is None:
+            self.statements[sql] = [1, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+
+    def top_statements(self, limit: int = TOP_STATEMENTS) -> list:
+        ranked = sorted(self.statements.items(), key=lambda i: i[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("network_metrics_span", default=None)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def activate(span: Span):
+    return _current.set(span)
+
+
+def deactivate(token) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Стриминговый ответ закрывается в другом контексте.
+        _current.set(None)
+
+
+@contextmanager
+def timed(phase: str):
+    """Добавляет время блока к фазе текущего span; вложенные блоки не удваиваются."""
+    span = _current.get()
+    if span is None or phase in span._active:
+        yield
+        return
+    span._active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        span.phases[phase] += time.perf_counter() - started
+        span._active.discard(phase)
+
+
+def _observe_query(execute, sql, params, many, context):
+    span = _current.get()
+    if span is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        span.add_query(sql, time.perf_counter() - started)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: вешает замер SQL на соединение."""
+    if _observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_observe_query)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _log_slow(kind: str, name: str, span: Span, total: float) -> None:
+    lines = [
+        f"Медленный {kind} {name}: {_ms(total)} мс "
+        f"(SQL {_ms(span.phases['db'])} мс, запросов {span.queries}, "
+        f"сериализация {_ms(span.phases['serialize'])} мс)"
+    ]
+    for sql, count, seconds in span.top_statements():
+        lines.append(f"  {count}× {_ms(seconds)} мс: {sql[:STATEMENT_PREVIEW]}")
+    logger.warning("\n".join(lines))
+
+
+def observe_request(span: Span, route: str, method: str, status: int) -> None:
+    total = span.elapsed
+    try:
+        REQUEST_DURATION.labels(route, method, str(status)).observe(total)
+        for phase, seconds in span.phases.items():
+            REQUEST_PHASE.labels(route, method, phase).observe(seconds)
+        REQUEST_QUERIES.labels(route, method).observe(span.queries)
+    except Exception:
+        # Метрики не должны ронять запрос (например, нет каталога
+        # PROMETHEUS_MULTIPROC_DIR).
+        logger.exception("Не удалось записать метрики запроса %s %s", method, route)
+    if total * 1000 >= settings.SLOW_REQUEST_MS:
+        _log_slow("запрос", f"{method} {route} → {status}", span, total)
+
+
+def server_timing(span: Span) -> str:
+    """Значение заголовка ``Server-Timing`` для уже выполненной части запроса."""
+    parts = [f'db;dur={_ms(span.phases["db"])};desc="{span.queries} queries"']
+    for phase in PHASES[1:]:
+        parts.append(f"{phase};dur={_ms(span.phases[phase])}")
+    parts.append(f"total;dur={_ms(span.elapsed)}")
+    return ", ".join(parts)
+
+
+# Задачи: span на время выполнения, ключ — id задачи (eager-задача внутри
+# запроса получает собственный span и возвращает span запроса после себя).
+_tasks = {}
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    span = Span()
+    _tasks[task_id] = (span, activate(span))
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    entry = _tasks.pop(task_id, None)
+    if entry is None:
+        return
+    span, token = entry
+    deactivate(token)
+    total = span.elapsed
+    name = getattr(task, "name", "unknown")
+    try:
+        TASK_DURATION.labels(name, state or "UNKNOWN").observe(total)
+        for phase, seconds in span.phases.items():
+            TASK_PHASE.labels(name, phase).observe(seconds)
+        TASK_QUERIES.labels(name).observe(span.queries)
+    except Exception:
+        logger.exception("Не удалось записать метрики задачи %s", name)
+    if total * 1000 >= settings.SLOW_TASK_MS:
+        _log_slow("задача", f"{name} [{task_id}] → {state}", span, total)
+
+
+def _multiprocess() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def registry():
+    """Реестр для экспорта: общий процесса или сборщик по файлам всех процессов."""
+    if not _multiprocess():
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+class CacheStatsCollector:
+    """Попадания и промахи кэша ответов API (счётчики живут в Redis)."""
+
+    def collect(self):
+        family = CounterMetricFamily(
+            "network_api_cache_requests",
+            "Обращения к кэшу ответов API.",
+            labels=("scope", "result"),
+        )
+        for scope, counts in cache.stats(CACHE_SCOPES).items():
+            for result, value in counts.items():
+                family.add_metric((scope, result), value)
+        yield family
+
+
+_cache_registry = CollectorRegistry(auto_describe=False)
+_cache_registry.register(CacheStatsCollector())
+
+
+def exposition() -> bytes:
+    return generate_latest(registry()) + generate_latest(_cache_registry)
+
+
+def start_worker_server(sender=None, **kwargs) -> None:
+    """Обработчик ``worker_ready``: HTTP-экспорт метрик воркера на ``TASK_METRICS_PORT``."""
+    port = settings.TASK_METRICS_PORT
+    if port:
+        start_http_server(port, registry=registry())
+        logger.info("Метрики задач доступны на порту %s", port)
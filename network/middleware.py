@@ -0,0 +1,61 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    """Замеряет запрос: SQL, сериализацию, аутентификацию и полное время.
+
+    Итог уходит в гистограммы ``/metrics`` и, при ``SERVER_TIMING``, в заголовок
+    ``Server-Timing``. У стримингового ответа метрики фиксируются при его
+    закрытии, а заголовок описывает только часть до начала отдачи тела.
+    Работает и в синхронной, и в асинхронной цепочке — под ASGI не заставляет
+    Django выполнять асинхронные view в потоке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        span = metrics.Span()
+        token = metrics.activate(span)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            metrics.deactivate(token)
+            raise
+        return self._finish(request, response, span, token)
+
+    async def __acall__(self, request):
+        span = metrics.Span()
+        token = metrics.activate(span)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            metrics.deactivate(token)
+            raise
+        return self._finish(request, response, span, token)
+
+    def _finish(self, request, response, span, token):
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+
+        def finish():
+            metrics.deactivate(token)
+            metrics.observe_request(span, route, request.method, response.status_code)
+
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = metrics.server_timing(span)
+        if response.streaming:
+            response._resource_closers.append(finish)
+        else:
+            finish()
+        return response
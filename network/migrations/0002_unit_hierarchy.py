@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2025-11-20 10:14
+
+from django.db import migrations, models
+
+
+def fill_hierarchy(apps, schema_editor):
+    Unit = apps.get_model("network", "Unit")
+
+    children = {}
+    for pk, supplier_id in Unit.objects.values_list("id", "supplier_id"):
+        children.setdefault(supplier_id, []).append(pk)
+
+    batch = []
+    stack = [(pk, "") for pk in children.get(None, [])]
+    while stack:
+        pk, path = stack.pop()
+        batch.append(Unit(id=pk, path=path, level=path.count("/")))
+        stack.extend((child, f"{path}{pk}/") for child in children.get(pk, []))
+        if len(batch) >= 1000:
+            Unit.objects.bulk_update(batch, ["path", "level"])
+            batch = []
+    if batch:
+        Unit.objects.bulk_update(batch, ["path", "level"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="unit",
+            name="level",
+            field=models.PositiveSmallIntegerField(
+                db_index=True, default=0, editable=False, verbose_name="Уровень"
+            ),
+        ),
+        migrations.AddField(
+            model_name="unit",
+            name="path",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=255,
+                verbose_name="Путь предков",
+            ),
+        ),
+        migrations.RunPython(fill_hierarchy, migrations.RunPython.noop),
+    ]
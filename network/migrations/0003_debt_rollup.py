@@ -0,0 +1,106 @@
+# Generated by Django 5.2.8 on 2025-11-24 12:41
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    Unit = apps.get_model("network", "Unit")
+    DebtRollup = apps.get_model("network", "DebtRollup")
+
+    totals = {}
+    rows = Unit.objects.values_list(
+        "id", "path", "country", "level", "debt_to_supplier"
+    ).order_by()
+    for pk, path, country, level, debt in rows.iterator():
+        targets = [int(p) for p in path.split("/") if p] + [pk, None]
+        for target in targets:
+            acc = totals.setdefault((target, country, level), [Decimal("0.00"), 0, 0])
+            acc[0] += debt
+            acc[1] += 1
+            acc[2] += int(debt > 0)
+
+    DebtRollup.objects.bulk_create(
+        [
+            DebtRollup(
+                unit_id=target,
+                country=country,
+                level=level,
+                debt_total=debt,
+                units_count=units,
+                debtors_count=debtors,
+            )
+            for (target, country, level), (debt, units, debtors) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0002_unit_hierarchy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DebtRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("country", models.CharField(max_length=100, verbose_name="Страна")),
+                ("level", models.PositiveSmallIntegerField(verbose_name="Уровень")),
+                (
+                    "debt_total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=16,
+                        verbose_name="Сумма задолженности",
+                    ),
+                ),
+                ("units_count", models.IntegerField(default=0, verbose_name="Звеньев")),
+                (
+                    "debtors_count",
+                    models.IntegerField(default=0, verbose_name="Должников"),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="debt_rollups",
+                        to="network.unit",
+                        verbose_name="Корень поддерева",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка задолженности",
+                "verbose_name_plural": "Сводки задолженности",
+                "ordering": ["country", "level"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("unit__isnull", False)),
+                        fields=("unit", "country", "level"),
+                        name="debt_rollup_unit_country_level_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("unit__isnull", True)),
+                        fields=("country", "level"),
+                        name="debt_rollup_network_country_level_uniq",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
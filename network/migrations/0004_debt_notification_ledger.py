@@ -0,0 +1,107 @@
+# Generated by Django 5.2.8 on 2025-11-27 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0003_debt_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "run_date",
+                    models.DateField(unique=True, verbose_name="Дата рассылки"),
+                ),
+                ("cursor", models.BigIntegerField(default=0, verbose_name="Курсор")),
+                (
+                    "dispatched_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Все пачки поставлены"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+            ],
+            options={
+                "verbose_name": "Запуск рассылки",
+                "verbose_name_plural": "Запуски рассылки",
+                "ordering": ["-run_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DebtNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run_date", models.DateField(verbose_name="Дата рассылки")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("sent", "Отправлено"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="Попыток"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Отправлено"
+                    ),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="debt_notifications",
+                        to="network.unit",
+                        verbose_name="Звено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Уведомление о задолженности",
+                "verbose_name_plural": "Уведомления о задолженности",
+                "ordering": ["-run_date", "unit_id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run_date", "unit"),
+                        name="debt_notification_run_unit_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2025-12-02 11:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Какое из звеньев оставить с email, решить автоматически нельзя:
+    # миграция останавливается со списком повторов до создания индекса.
+    Unit = apps.get_model("network", "Unit")
+    duplicates = list(
+        Unit.objects.annotate(email_l=Lower("email"))
+        .values("email_l")
+        .annotate(ids=Count("id"))
+        .filter(ids__gt=1)
+        .order_by("email_l")
+        .values_list("email_l", flat=True)
+    )
+    if not duplicates:
+        return
+    lines = []
+    for email in duplicates[:50]:
+        ids = Unit.objects.annotate(email_l=Lower("email")).filter(email_l=email)
+        ids = ", ".join(
+            str(pk) for pk in ids.order_by("pk").values_list("pk", flat=True)
+        )
+        lines.append(f"  {email}: звенья {ids}")
+    if len(duplicates) > 50:
+        lines.append(f"  ... и ещё {len(duplicates) - 50}")
+    raise RuntimeError(
+        "Email звеньев повторяются без учёта регистра — уникальный индекс "
+        "unit_email_ci_uniq не создать. Исправьте email и повторите migrate:\n"
+        + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0004_debt_notification_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="unit",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="unit_email_ci_uniq",
+                violation_error_message="Такой email уже используется другим звеном.",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = {
+    "Unit": ("name", "city", "country", "email"),
+    "Product": ("name", "model"),
+}
+
+
+def _indexes(apps):
+    for model_name, columns in SEARCH_COLUMNS.items():
+        table = apps.get_model("network", model_name)._meta.db_table
+        for column in columns:
+            yield table, column, f"{table}_{column}_trgm"
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Выражение совпадает с тем, что Django строит для icontains на
+    # PostgreSQL: UPPER(col::text) LIKE UPPER(%s).
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column, name in _indexes(apps):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, _, name in _indexes(apps):
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0005_unit_email_ci_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:21
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0006_trigram_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DebtEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("charge", "Начисление"),
+                            ("payment", "Оплата"),
+                            ("write_off", "Списание"),
+                            ("adjustment", "Корректировка"),
+                        ],
+                        max_length=20,
+                        verbose_name="Тип проводки",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=12,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.01"))
+                        ],
+                        verbose_name="Сумма",
+                    ),
+                ),
+                (
+                    "reference",
+                    models.CharField(
+                        blank=True,
+                        help_text="Номер документа; повторная проводка с тем же номером пропускается.",
+                        max_length=100,
+                        verbose_name="Внешний номер",
+                    ),
+                ),
+                (
+                    "note",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Комментарий"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "applied_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Учтено в балансе"
+                    ),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="debt_entries",
+                        to="network.unit",
+                        verbose_name="Звено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Проводка по задолженности",
+                "verbose_name_plural": "Журнал задолженности",
+                "ordering": ["-id"],
+                "indexes": [
+                    models.Index(fields=["unit", "-id"], name="debt_entry_unit_idx"),
+                    models.Index(
+                        condition=models.Q(("applied_at__isnull", True)),
+                        fields=["id"],
+                        name="debt_entry_pending_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("reference", ""), _negated=True),
+                        fields=("unit", "reference"),
+                        name="debt_entry_unit_reference_uniq",
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(("amount__gt", 0)),
+                        name="debt_entry_amount_positive",
+                    ),
+                ],
+            },
+        ),
+    ]
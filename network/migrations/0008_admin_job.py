@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0007_debt_ledger"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdminJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("clear_debt", "Очистка задолженности")],
+                        max_length=32,
+                        verbose_name="Действие",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("done", "Завершено"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("selection", models.BinaryField(verbose_name="Выборка")),
+                (
+                    "total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Звеньев в выборке"
+                    ),
+                ),
+                (
+                    "processed",
+                    models.PositiveIntegerField(default=0, verbose_name="Обработано"),
+                ),
+                (
+                    "affected",
+                    models.PositiveIntegerField(default=0, verbose_name="Изменено"),
+                ),
+                ("cursor", models.BigIntegerField(default=0, verbose_name="Курсор")),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+                (
+                    "notified",
+                    models.BooleanField(default=False, verbose_name="Итог показан"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Завершено"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="admin_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Запустил",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Фоновое действие",
+                "verbose_name_plural": "Фоновые действия",
+                "ordering": ["-id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("notified", False)),
+                        fields=["user", "id"],
+                        name="admin_job_unnotified_idx",
+                    )
+                ],
+            },
+        ),
+    ]
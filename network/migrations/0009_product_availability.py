@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_availability(apps, schema_editor):
+    # Индекс и счётчики по уже существующим связям (как availability.rebuild).
+    Unit = apps.get_model("network", "Unit")
+    Product = apps.get_model("network", "Product")
+    Availability = apps.get_model("network", "ProductAvailability")
+    qn = schema_editor.quote_name
+    availability = qn(Availability._meta.db_table)
+    product = qn(Product._meta.db_table)
+    schema_editor.execute(
+        f"INSERT INTO {availability} (product_id, unit_id, country, kind, level, path) "
+        f"SELECT t.product_id, t.unit_id, u.country, u.kind, u.level, u.path "
+        f"FROM {qn(Unit.products.through._meta.db_table)} t "
+        f"JOIN {qn(Unit._meta.db_table)} u ON u.id = t.unit_id"
+    )
+    schema_editor.execute(
+        f"UPDATE {product} SET units_count = (SELECT COUNT(*) FROM {availability} a "
+        f"WHERE a.product_id = {product}.id)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0008_admin_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="units_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Звеньев с продуктом"
+            ),
+        ),
+        migrations.CreateModel(
+            name="ProductAvailability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("country", models.CharField(max_length=100, verbose_name="Страна")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("factory", "Завод"),
+                            ("retail", "Розничная сеть"),
+                            ("sp", "ИП"),
+                        ],
+                        max_length=20,
+                        verbose_name="Тип звена",
+                    ),
+                ),
+                ("level", models.PositiveSmallIntegerField(verbose_name="Уровень")),
+                ("path", models.CharField(max_length=255, verbose_name="Путь предков")),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="availability",
+                        to="network.product",
+                        verbose_name="Продукт",
+                    ),
+                ),
+                (
+                    "unit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="network.unit",
+                        verbose_name="Звено",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Наличие продукта",
+                "verbose_name_plural": "Наличие продуктов",
+                "ordering": ["product", "unit"],
+                "indexes": [
+                    models.Index(
+                        fields=["product", "country", "kind", "level", "unit"],
+                        name="availability_lookup_idx",
+                    ),
+                    models.Index(
+                        fields=["product", "path"],
+                        name="availability_subtree_idx",
+                        opclasses=["int8_ops", "varchar_pattern_ops"],
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "unit"), name="product_availability_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    # Звенья, не менявшиеся с создания; у продуктов даты создания нет.
+    Unit = apps.get_model("network", "Unit")
+    Unit._base_manager.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0009_product_availability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Изменено",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="unit",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Изменено",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
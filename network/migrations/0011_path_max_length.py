@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0010_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productavailability",
+            name="path",
+            field=models.CharField(max_length=2000, verbose_name="Путь предков"),
+        ),
+        migrations.AlterField(
+            model_name="unit",
+            name="path",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=2000,
+                verbose_name="Путь предков",
+            ),
+        ),
+    ]
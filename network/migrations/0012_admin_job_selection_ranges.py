@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+def fail_unfinished_jobs(apps, schema_editor):
+    # Старая выборка (pickle запроса) не читается: незавершённые задания
+    # останавливаются, действие запускается заново.
+    AdminJob = apps.get_model("network", "AdminJob")
+    AdminJob.objects.filter(status__in=["pending", "running"]).update(
+        status="failed",
+        error="Выборка сохранена в старом формате; запустите действие заново.",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0011_path_max_length"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="adminjob",
+            name="selection",
+        ),
+        migrations.AddField(
+            model_name="adminjob",
+            name="selection",
+            field=models.JSONField(default=list, verbose_name="Выборка"),
+        ),
+        migrations.RunPython(fail_unfinished_jobs, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
 from decimal import Decimal
 
-from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+
+from . import hierarchy
+from .cache import VersionedQuerySet
 
 
 class Product(models.Model):
@@ -11,6 +16,12 @@ class Product(models.Model):
     released_at = models.DateField(
         "Дата выхода на рынок", help_text="Дата выхода продукта на рынок"
     )
+    units_count = models.PositiveIntegerField(
+        "Звеньев с продуктом", default=0, editable=False
+    )
+    updated_at = models.DateTimeField("Изменено", auto_now=True)
+
+    objects = VersionedQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Продукт"
@@ -22,6 +33,13 @@ class Product(models.Model):
         return f"{self.name} {self.model}"
 
 
+EMAIL_CONSTRAINT = "unit_email_ci_uniq"
+EMAIL_TAKEN = "Такой email уже используется другим звеном."
+DEPTH_EXCEEDED = f"Цепочка поставок станет глубже {hierarchy.MAX_DEPTH} уровней."
+# Поля, от которых зависят сводки долга и индекс наличия.
+SNAPSHOT_FIELDS = ("path", "level", "country", "kind", "debt_to_supplier")
+
+
 class Unit(models.Model):
     class Kind(models.TextChoices):
         FACTORY = "factory", "Завод"
@@ -61,27 +79,110 @@ class Unit(models.Model):
         default=Decimal("0.00"),
     )
 
+    level = models.PositiveSmallIntegerField(
+        "Уровень", default=0, editable=False, db_index=True
+    )
+    path = models.CharField(
+        "Путь предков",
+        max_length=hierarchy.PATH_MAX_LENGTH,
+        default="",
+        editable=False,
+        db_index=True,
+    )
+
     created_at = models.DateTimeField("Создано", auto_now_add=True)
+    updated_at = models.DateTimeField("Изменено", auto_now=True)
+
+    objects = VersionedQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Звено сети"
         verbose_name_plural = "Звенья сети"
         ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                Lower("email"),
+                name=EMAIL_CONSTRAINT,
+                violation_error_message=EMAIL_TAKEN,
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     @property
-    def level(self) -> int:
-        level = 0
-        p = self.supplier
-        while p is not None:
-            level += 1
-            p = p.supplier
-        return level
+    def ancestor_ids(self) -> list[int]:
+        return hierarchy.ancestor_ids(self.path)
+
+    def is_descendant_of(self, other: "Unit") -> bool:
+        return self.path.startswith(hierarchy.subtree_prefix(other))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _snapshot(self) -> dict:
+        """Значения полей иерархии и долга в БД; строка блокируется до конца транзакции.
+
+        Снимок из ``from_db`` для сводок не годится: ``ledger.apply_pending``
+        мог изменить баланс после загрузки звена.
+        """
+        return (
+            Unit._base_manager.select_for_update()
+            .filter(pk=self.pk)
+            .values("supplier_id", *SNAPSHOT_FIELDS)
+            .get()
+        )
+
+    def _supplier_changed(self) -> bool:
+        """Поставщик отличается от загруженного из БД (новое звено — всегда)."""
+        loaded = getattr(self, "_loaded_values", {})
+        return "supplier_id" not in loaded or loaded["supplier_id"] != self.supplier_id
+
+    def _resolve_placement(self) -> hierarchy.Placement:
+        """``resolve_placement`` для текущего поставщика с ошибками поля ``supplier``."""
+        supplier_field = self._meta.get_field("supplier")
+        supplier = self.supplier if supplier_field.is_cached(self) else self.supplier_id
+        try:
+            return hierarchy.resolve_placement(supplier, self.pk)
+        except hierarchy.HierarchyCycleError:
+            raise ValidationError(
+                {
+                    "supplier": "Цикл в цепочке поставок: поставщик не может быть своим потомком."
+                }
+            )
+        except hierarchy.HierarchyDepthError:
+            raise ValidationError({"supplier": DEPTH_EXCEEDED})
+
+    def _check_subtree(self, placement: hierarchy.Placement) -> None:
+        if self.pk and placement.path != self.path:
+            try:
+                hierarchy.check_subtree(self, placement)
+            except hierarchy.HierarchyDepthError:
+                raise ValidationError({"supplier": DEPTH_EXCEEDED})
+
+    def validate_constraints(self, exclude=None):
+        # Ограничение на Lower("email") — выражение, Django относит его ошибку
+        # к __all__; переносим её на поле email.
+        try:
+            super().validate_constraints(exclude=exclude)
+        except ValidationError as exc:
+            errors = exc.message_dict
+            general = errors.pop(NON_FIELD_ERRORS, [])
+            if EMAIL_TAKEN in general:
+                general.remove(EMAIL_TAKEN)
+                errors.setdefault("email", []).append(EMAIL_TAKEN)
+            if general:
+                errors[NON_FIELD_ERRORS] = general
+            raise ValidationError(errors)
 
     def clean(self):
-        if self.kind == self.Kind.FACTORY and self.supplier is not None:
+        if self.email:
+            self.email = self.email.strip().lower()
+
+        if self.kind == self.Kind.FACTORY and self.supplier_id is not None:
             raise ValidationError({"supplier": "У завода не может быть поставщика."})
 
         if self.pk and self.supplier_id == self.pk:
@@ -89,16 +190,354 @@ class Unit(models.Model):
                 {"supplier": "Нельзя указать самого себя как поставщика."}
             )
 
-        cur = self.supplier
-        while cur is not None:
-            if self.pk and cur.pk == self.pk:
-                raise ValidationError(
-                    {
-                        "supplier": "Цикл в цепочке поставок: поставщик не может быть своим потомком."
-                    }
-                )
-            cur = cur.supplier
+        # Без смены поставщика место в иерархии не меняется: save() возьмёт
+        # path/level из заблокированной строки. Размещение, уже вычисленное
+        # сериализатором для этого же поставщика, повторно не запрашивается.
+        preset = self.__dict__.pop("_placement", None)
+        if not self._supplier_changed():
+            return
+        if preset is not None and preset[0] == self.supplier_id:
+            placement = preset[1]
+        else:
+            placement = self._resolve_placement()
+        self._check_subtree(placement)
+        self._placement = (self.supplier_id, placement)
 
     def save(self, *args, **kwargs):
+        from . import availability, rollups
+
         self.full_clean()
-        return super().save(*args, **kwargs)
+
+        loaded_debt = getattr(self, "_loaded_values", {}).get("debt_to_supplier")
+        preset = self.__dict__.pop("_placement", None)
+        placement = preset[1] if preset and preset[0] == self.supplier_id else None
+
+        with transaction.atomic():
+            old = None if self._state.adding else self._snapshot()
+            if placement is None and old is not None:
+                # Поставщик в БД мог смениться после загрузки — тогда место
+                # вычисляется заново, иначе берётся актуальное из строки.
+                self.level, self.path = old["level"], old["path"]
+                if old["supplier_id"] == self.supplier_id:
+                    placement = hierarchy.Placement(old["level"], old["path"])
+                else:
+                    placement = self._resolve_placement()
+                    self._check_subtree(placement)
+            self.level, self.path = placement or self._resolve_placement()
+            if (
+                old is not None
+                and kwargs.get("update_fields") is None
+                and self.debt_to_supplier in (loaded_debt, old["debt_to_supplier"])
+            ):
+                # Баланс ведёт журнал проводок: правка других полей не должна
+                # затирать его значением, прочитанным до последнего применения.
+                self.debt_to_supplier = old["debt_to_supplier"]
+                kwargs["update_fields"] = [
+                    f.name
+                    for f in self._meta.concrete_fields
+                    if not f.primary_key and f.name != "debt_to_supplier"
+                ]
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "path",
+                    "level",
+                    "updated_at",
+                }
+
+            result = super().save(*args, **kwargs)
+            if old is not None and self.path != old["path"]:
+                hierarchy.move_subtree(self, old["path"], old["level"])
+            rollups.unit_saved(self, old)
+            availability.unit_saved(self, old)
+
+        self._loaded_values = {
+            f: getattr(self, f) for f in ("supplier_id", *SNAPSHOT_FIELDS)
+        }
+        return result
+
+
+class ProductAvailability(models.Model):
+    """Обратный индекс «продукт → звенья» (``network.availability``).
+
+    Повторяет связь ``Unit.products`` вместе с полями звена, по которым ищут,
+    кто продаёт продукт: поиск идёт по составному индексу без JOIN со звеньями.
+    """
+
+    # Отдельный индекс по product не нужен: он ведёт во всех составных.
+    product = models.ForeignKey(
+        Product,
+        verbose_name="Продукт",
+        on_delete=models.CASCADE,
+        related_name="availability",
+        db_index=False,
+    )
+    unit = models.ForeignKey(
+        Unit, verbose_name="Звено", on_delete=models.CASCADE, related_name="+"
+    )
+    country = models.CharField("Страна", max_length=100)
+    kind = models.CharField("Тип звена", max_length=20, choices=Unit.Kind.choices)
+    level = models.PositiveSmallIntegerField("Уровень")
+    path = models.CharField("Путь предков", max_length=hierarchy.PATH_MAX_LENGTH)
+
+    class Meta:
+        verbose_name = "Наличие продукта"
+        verbose_name_plural = "Наличие продуктов"
+        ordering = ["product", "unit"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "unit"], name="product_availability_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["product", "country", "kind", "level", "unit"],
+                name="availability_lookup_idx",
+            ),
+            models.Index(
+                fields=["product", "path"],
+                name="availability_subtree_idx",
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.unit_id}"
+
+
+class DebtRollup(models.Model):
+    """Сводка задолженности поддерева звена по стране и уровню.
+
+    Строка с ``unit`` учитывает само звено и всех его потомков; строки с
+    ``unit=None`` — сводка по всей сети. Поддерживается инкрементально
+    модулем ``network.rollups``.
+    """
+
+    unit = models.ForeignKey(
+        Unit,
+        verbose_name="Корень поддерева",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="debt_rollups",
+    )
+    country = models.CharField("Страна", max_length=100)
+    level = models.PositiveSmallIntegerField("Уровень")
+    debt_total = models.DecimalField(
+        "Сумма задолженности",
+        max_digits=16,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+    units_count = models.IntegerField("Звеньев", default=0)
+    debtors_count = models.IntegerField("Должников", default=0)
+
+    class Meta:
+        verbose_name = "Сводка задолженности"
+        verbose_name_plural = "Сводки задолженности"
+        ordering = ["country", "level"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unit", "country", "level"],
+                condition=models.Q(unit__isnull=False),
+                name="debt_rollup_unit_country_level_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["country", "level"],
+                condition=models.Q(unit__isnull=True),
+                name="debt_rollup_network_country_level_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.unit or 'Сеть'}: {self.country}, уровень {self.level}"
+
+
+class DebtEntry(models.Model):
+    """Проводка журнала задолженности звена; журнал только пополняется.
+
+    ``amount`` всегда положительный, направление задаёт ``kind``: начисление
+    и корректировка увеличивают долг, оплата и списание — уменьшают.
+    Проводки попадают в ``Unit.debt_to_supplier`` пачками
+    (``network.ledger.apply_pending``); ``applied_at`` — когда это произошло.
+    """
+
+    class Kind(models.TextChoices):
+        CHARGE = "charge", "Начисление"
+        PAYMENT = "payment", "Оплата"
+        WRITE_OFF = "write_off", "Списание"
+        ADJUSTMENT = "adjustment", "Корректировка"
+
+    SIGNS = {
+        Kind.CHARGE: 1,
+        Kind.PAYMENT: -1,
+        Kind.WRITE_OFF: -1,
+        Kind.ADJUSTMENT: 1,
+    }
+
+    unit = models.ForeignKey(
+        Unit,
+        verbose_name="Звено",
+        on_delete=models.CASCADE,
+        related_name="debt_entries",
+    )
+    kind = models.CharField("Тип проводки", max_length=20, choices=Kind.choices)
+    amount = models.DecimalField(
+        "Сумма",
+        max_digits=12,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal("0.01"))],
+    )
+    reference = models.CharField(
+        "Внешний номер",
+        max_length=100,
+        blank=True,
+        help_text="Номер документа; повторная проводка с тем же номером пропускается.",
+    )
+    note = models.CharField("Комментарий", max_length=255, blank=True)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    applied_at = models.DateTimeField("Учтено в балансе", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Проводка по задолженности"
+        verbose_name_plural = "Журнал задолженности"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["unit", "-id"], name="debt_entry_unit_idx"),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(applied_at__isnull=True),
+                name="debt_entry_pending_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unit", "reference"],
+                condition=~models.Q(reference=""),
+                name="debt_entry_unit_reference_uniq",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(amount__gt=0), name="debt_entry_amount_positive"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.unit_id}: {self.get_kind_display()} {self.amount}"
+
+    @property
+    def signed_amount(self) -> Decimal:
+        return self.SIGNS[self.kind] * self.amount
+
+
+class NotificationRun(models.Model):
+    """Запуск рассылки должникам; ``cursor`` — последний поставленный в очередь id."""
+
+    run_date = models.DateField("Дата рассылки", unique=True)
+    cursor = models.BigIntegerField("Курсор", default=0)
+    dispatched_at = models.DateTimeField("Все пачки поставлены", null=True, blank=True)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Запуск рассылки"
+        verbose_name_plural = "Запуски рассылки"
+        ordering = ["-run_date"]
+
+    def __str__(self):
+        return f"Рассылка {self.run_date}"
+
+
+class DebtNotification(models.Model):
+    """Журнал доставки: одно письмо звену в рамках запуска рассылки."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ожидает"
+        SENT = "sent", "Отправлено"
+        FAILED = "failed", "Ошибка"
+
+    run_date = models.DateField("Дата рассылки")
+    unit = models.ForeignKey(
+        Unit,
+        verbose_name="Звено",
+        on_delete=models.CASCADE,
+        related_name="debt_notifications",
+    )
+    status = models.CharField(
+        "Статус", max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    error = models.TextField("Ошибка", blank=True)
+    sent_at = models.DateTimeField("Отправлено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Уведомление о задолженности"
+        verbose_name_plural = "Уведомления о задолженности"
+        ordering = ["-run_date", "unit_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run_date", "unit"], name="debt_notification_run_unit_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.unit_id} @ {self.run_date}: {self.status}"
+
+
+class AdminJob(models.Model):
+    """Массовое действие админки, выполняемое в фоне пачками (``network.jobs``).
+
+    ``selection`` — id выбранных звеньев диапазонами ``[[от, до], ...]``,
+    ``cursor`` — последний обработанный id.
+    """
+
+    class Action(models.TextChoices):
+        CLEAR_DEBT = "clear_debt", "Очистка задолженности"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Завершено"
+        FAILED = "failed", "Ошибка"
+
+    action = models.CharField("Действие", max_length=32, choices=Action.choices)
+    status = models.CharField(
+        "Статус", max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Запустил",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="admin_jobs",
+    )
+    selection = models.JSONField("Выборка", default=list)
+    total = models.PositiveIntegerField("Звеньев в выборке", null=True, blank=True)
+    processed = models.PositiveIntegerField("Обработано", default=0)
+    affected = models.PositiveIntegerField("Изменено", default=0)
+    cursor = models.BigIntegerField("Курсор", default=0)
+    error = models.TextField("Ошибка", blank=True)
+    notified = models.BooleanField("Итог показан", default=False)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    finished_at = models.DateTimeField("Завершено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Фоновое действие"
+        verbose_name_plural = "Фоновые действия"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(
+                fields=["user", "id"],
+                condition=models.Q(notified=False),
+                name="admin_job_unnotified_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} №{self.pk}"
+
+    @property
+    def progress(self) -> int:
+        if not self.total:
+            return 100 if self.status == self.Status.DONE else 0
+        return min(100, self.processed * 100 // self.total)
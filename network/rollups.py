@@ -0,0 +1,363 @@
+"""Инкрементальные сводки задолженности (``DebtRollup``).
+
+Вклад звена в сводки — ``{(страна, уровень): [долг, звеньев, должников]}``.
+Он прибавляется к строкам самого звена, всех его предков и сети целиком
+(``unit=None``), поэтому чтение сводки по заводу — это выборка нескольких
+готовых строк, а не обход сети.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from . import hierarchy
+from .models import DebtEntry, DebtRollup, Unit
+
+ZERO = Decimal("0.00")
+BATCH_SIZE = 500
+_COUNTERS = (("debt_total", ZERO), ("units_count", 0), ("debtors_count", 0))
+CLEAR_DEBT_NOTE = "Очистка задолженности в админке"
+
+
+def _own(country, level, debt) -> dict:
+    return {(country, level): [debt, 1, int(debt > 0)]}
+
+
+def _targets(pk, path) -> list:
+    return [*hierarchy.ancestor_ids(path), pk, None]
+
+
+def _merge(acc, contribution, sign=1):
+    for key, values in contribution.items():
+        row = acc[key]
+        for i, value in enumerate(values):
+            row[i] += sign * value
+
+
+def _add(deltas, targets, contribution, sign=1):
+    for target in targets:
+        _merge(
+            deltas,
+            {(target, *key): values for key, values in contribution.items()},
+            sign,
+        )
+
+
+def _apply(deltas):
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+    targets = {target for target, _, _ in deltas}
+    scope = Q(unit_id__in=targets - {None})
+    if None in targets:
+        scope |= Q(unit__isnull=True)
+    existing = {
+        (unit_id, country, level): pk
+        for pk, unit_id, country, level in DebtRollup.objects.filter(scope).values_list(
+            "pk", "unit_id", "country", "level"
+        )
+    }
+
+    updates, missing, decremented = {}, [], []
+    for key, values in deltas.items():
+        pk = existing.get(key)
+        if pk is None:
+            if values[1] > 0:
+                missing.append((key, values))
+            continue
+        updates[pk] = values
+        if values[1] < 0:
+            decremented.append(pk)
+    _increment(updates)
+    if decremented:
+        DebtRollup.objects.filter(pk__in=decremented, units_count__lte=0).delete()
+    if not missing:
+        return
+
+    rows = [
+        DebtRollup(
+            unit_id=target,
+            country=country,
+            level=level,
+            debt_total=debt,
+            units_count=units,
+            debtors_count=debtors,
+        )
+        for (target, country, level), (debt, units, debtors) in missing
+    ]
+    try:
+        with transaction.atomic():
+            DebtRollup.objects.bulk_create(rows, batch_size=1000)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос — прибавляем по одной.
+        for key, values in missing:
+            _bump(key, values)
+
+
+def _increment(updates):
+    """Прибавляет дельты ``{pk: [долг, звеньев, должников]}`` одним UPDATE на пачку."""
+    items = list(updates.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start : start + BATCH_SIZE]
+        changes = {}
+        for i, (field, zero) in enumerate(_COUNTERS):
+            whens = [When(pk=pk, then=Value(v[i])) for pk, v in batch if v[i]]
+            if whens:
+                output = DebtRollup._meta.get_field(field)
+                changes[field] = F(field) + Case(
+                    *whens, default=Value(zero), output_field=output
+                )
+        DebtRollup.objects.filter(pk__in=[pk for pk, _ in batch]).update(**changes)
+
+
+def _bump(key, values):
+    target, country, level = key
+    debt, units, debtors = values
+    qs = DebtRollup.objects.filter(unit_id=target, country=country, level=level)
+    changes = {
+        "debt_total": F("debt_total") + debt,
+        "units_count": F("units_count") + units,
+        "debtors_count": F("debtors_count") + debtors,
+    }
+    if qs.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            DebtRollup.objects.create(
+                unit_id=target,
+                country=country,
+                level=level,
+                debt_total=debt,
+                units_count=units,
+                debtors_count=debtors,
+            )
+    except IntegrityError:
+        qs.update(**changes)
+
+
+def _new_deltas():
+    return defaultdict(lambda: [ZERO, 0, 0])
+
+
+def unit_saved(unit: Unit, old) -> None:
+    """Обновляет сводки после ``Unit.save``; ``old`` — снимок до записи."""
+    deltas = _new_deltas()
+    own = _own(unit.country, unit.level, unit.debt_to_supplier)
+
+    if old is None:
+        _add(deltas, _targets(unit.pk, unit.path), own)
+        _apply(deltas)
+        return
+
+    moved = old["path"] != unit.path
+    if (
+        not moved
+        and old["country"] == unit.country
+        and old["debt_to_supplier"] == unit.debt_to_supplier
+    ):
+        return
+
+    old_own = _own(old["country"], old["level"], old["debt_to_supplier"])
+    if moved:
+        # Собственные строки звена — это его поддерево до перемещения;
+        # после перемещения все уровни в нём сдвигаются на одну величину.
+        shift = unit.level - old["level"]
+        before = {
+            (r.country, r.level): [r.debt_total, r.units_count, r.debtors_count]
+            for r in DebtRollup.objects.filter(unit=unit)
+        }
+        after = defaultdict(lambda: [ZERO, 0, 0])
+        _merge(after, {(c, lvl + shift): v for (c, lvl), v in before.items()})
+        _merge(after, _own(old["country"], unit.level, old["debt_to_supplier"]), -1)
+        _merge(after, own)
+        after = {key: values for key, values in after.items() if values[1] > 0}
+        if shift:
+            _shift_descendant_rows(unit, shift)
+    else:
+        before, after = old_own, own
+
+    _add(deltas, _targets(unit.pk, old["path"]), before, -1)
+    _add(deltas, _targets(unit.pk, unit.path), after)
+    _apply(deltas)
+
+
+def _shift_descendant_rows(unit: Unit, shift: int) -> None:
+    rows = DebtRollup.objects.filter(
+        unit__path__startswith=hierarchy.subtree_prefix(unit)
+    )
+    moved = [
+        DebtRollup(
+            unit_id=r.unit_id,
+            country=r.country,
+            level=r.level + shift,
+            debt_total=r.debt_total,
+            units_count=r.units_count,
+            debtors_count=r.debtors_count,
+        )
+        for r in rows
+    ]
+    rows.delete()
+    DebtRollup.objects.bulk_create(moved, batch_size=1000)
+
+
+def unit_deleted(unit: Unit) -> None:
+    """Снимает вклад удалённого звена со сводок предков и сети."""
+    deltas = _new_deltas()
+    own = _own(unit.country, unit.level, unit.debt_to_supplier)
+    _add(deltas, [*hierarchy.ancestor_ids(unit.path), None], own, -1)
+    _apply(deltas)
+
+
+def units_changed(before=(), after=()) -> None:
+    """Пакетно переносит вклады звеньев: ``before`` вычитается, ``after`` прибавляется.
+
+    Элементы — кортежи ``(pk, path, country, level, debt)``. Подходит для
+    ``bulk_create``/``bulk_update``, где ``save()`` не вызывается; перемещения
+    поддеревьев сюда не относятся.
+    """
+    deltas = _new_deltas()
+    for rows, sign in ((before, -1), (after, 1)):
+        for pk, path, country, level, debt in rows:
+            _add(deltas, _targets(pk, path), _own(country, level, debt), sign)
+    _apply(deltas)
+
+
+def clear_debt(queryset) -> int:
+    """Обнуляет задолженность звеньев queryset и вычитает её из сводок.
+
+    Списанный долг фиксируется в журнале учтёнными проводками ``write_off``.
+    Меняются только должники; их строки блокируются по возрастанию pk, как и
+    при применении журнала, чтобы списанная сумма совпала с обнулённой.
+    """
+    with transaction.atomic():
+        deltas = _new_deltas()
+        now = timezone.now()
+        entries = []
+        rows = (
+            queryset.filter(debt_to_supplier__gt=0)
+            .order_by("pk")
+            .select_for_update(of=("self",))
+            .values_list("pk", "path", "country", "level", "debt_to_supplier")
+        )
+        for pk, path, country, level, debt in rows:
+            _add(deltas, _targets(pk, path), {(country, level): [debt, 0, 1]}, -1)
+            entries.append(
+                DebtEntry(
+                    unit_id=pk,
+                    kind=DebtEntry.Kind.WRITE_OFF,
+                    amount=debt,
+                    note=CLEAR_DEBT_NOTE,
+                    applied_at=now,
+                )
+            )
+        updated = Unit.objects.filter(pk__in=[e.unit_id for e in entries]).update(
+            debt_to_supplier=ZERO
+        )
+        DebtEntry.objects.bulk_create(entries, batch_size=1000)
+        _apply(deltas)
+    return updated
+
+
+def summary(unit_id=None) -> dict:
+    """Сводка поддерева звена (или всей сети) из готовых строк ``DebtRollup``."""
+    rows = list(DebtRollup.objects.filter(unit_id=unit_id))
+    total, by_country, by_level = _new_deltas(), _new_deltas(), _new_deltas()
+    for r in rows:
+        values = [r.debt_total, r.units_count, r.debtors_count]
+        _merge(total, {None: values})
+        _merge(by_country, {r.country: values})
+        _merge(by_level, {r.level: values})
+
+    def totals(values):
+        debt, units, debtors = values
+        return {"debt_total": debt, "units_count": units, "debtors_count": debtors}
+
+    return {
+        "unit": unit_id,
+        **totals(total[None]),
+        "by_country": [
+            {"country": c, **totals(v)} for c, v in sorted(by_country.items())
+        ],
+        "by_level": [
+            {"level": lvl, **totals(v)} for lvl, v in sorted(by_level.items())
+        ],
+        "rows": rows,
+    }
+
+
+# Вклад звена в собственные строки, строки предков (id из path) и сети.
+_REBUILD_SQL = """
+INSERT INTO {rollup} (unit_id, country, level, debt_total, units_count, debtors_count)
+SELECT target, country, level, SUM(debt), COUNT(*), COUNT(*) FILTER (WHERE debt > 0)
+FROM (
+    SELECT u.id AS target, u.country, u.level, u.debt_to_supplier AS debt
+    FROM {unit} u
+    UNION ALL
+    SELECT a.id, u.country, u.level, u.debt_to_supplier
+    FROM {unit} u
+    CROSS JOIN LATERAL UNNEST(
+        STRING_TO_ARRAY(RTRIM(u.path, '{sep}'), '{sep}')::bigint[]
+    ) AS a (id)
+    UNION ALL
+    SELECT NULL, u.country, u.level, u.debt_to_supplier
+    FROM {unit} u
+) contributions
+GROUP BY target, country, level
+"""
+
+
+def rebuild() -> int:
+    """Полностью пересчитывает сводки по текущему состоянию сети.
+
+    На PostgreSQL — одним ``INSERT ... SELECT`` по разобранному ``path``.
+    """
+    with transaction.atomic():
+        DebtRollup.objects.all().delete()
+        if connection.vendor == "postgresql":
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    _REBUILD_SQL.format(
+                        rollup=qn(DebtRollup._meta.db_table),
+                        unit=qn(Unit._meta.db_table),
+                        sep=hierarchy.SEPARATOR,
+                    )
+                )
+                return cursor.rowcount
+        deltas = _new_deltas()
+        rows = Unit.objects.values_list(
+            "pk", "path", "country", "level", "debt_to_supplier"
+        ).order_by()
+        for pk, path, country, level, debt in rows.iterator():
+            _add(deltas, _targets(pk, path)[:-1], _own(country, level, debt))
+        network = (
+            Unit.objects.values("country", "level")
+            .annotate(
+                debt=Sum("debt_to_supplier"),
+                units=Count("id"),
+                debtors=Count("id", filter=Q(debt_to_supplier__gt=0)),
+            )
+            .order_by()
+        )
+        for row in network:
+            deltas[(None, row["country"], row["level"])] = [
+                row["debt"],
+                row["units"],
+                row["debtors"],
+            ]
+        objs = [
+            DebtRollup(
+                unit_id=target,
+                country=country,
+                level=level,
+                debt_total=debt,
+                units_count=units,
+                debtors_count=debtors,
+            )
+            for (target, country, level), (debt, units, debtors) in deltas.items()
+        ]
+        DebtRollup.objects.bulk_create(objs, batch_size=1000)
+    return len(objs)
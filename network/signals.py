@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import availability, cache, rollups
+from .models import Product, Unit
+
+
+@receiver(pre_delete, sender=Unit)
+def unit_pre_delete(sender, instance, **kwargs):
+    availability.unit_deleted(instance)
+
+
+@receiver(post_delete, sender=Unit)
+def unit_post_delete(sender, instance, **kwargs):
+    rollups.unit_deleted(instance)
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_cache_version(sender, **kwargs):
+    cache.bump_for(sender)
+
+
+@receiver(m2m_changed, sender=Unit.products.through)
+def unit_products_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # После очистки уже не узнать, у каких звеньев был продукт.
+        instance._cleared_units = availability.product_units(instance.pk)
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        units, products = [instance.pk], pk_set
+    elif action == "post_clear":
+        units, products = instance.__dict__.pop("_cleared_units", []), [instance.pk]
+    else:
+        units, products = pk_set, [instance.pk]
+    # Состав продуктов — часть представления звена: touch() повышает версию.
+    Unit.objects.filter(pk__in=units).touch()
+    availability.sync(units, products)
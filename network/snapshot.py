@@ -0,0 +1,182 @@
+"""Бинарный снимок сети (``GET /api/units/snapshot/``).
+
+Иерархия звеньев отдаётся колонками вместо JSON: звено — позиция в массивах,
+поставщик — индекс родителя, продукты — смежность в формате CSR.
+
+Раскладка (little-endian)::
+
+    "ENSN" | u16 версия формата | u16 0 | u32 длина метаданных | JSON метаданных | колонки
+
+Метаданные: ``units``, ``products``, ``links``, ``kinds`` (коды ``kind``),
+``debt_scale`` и ``columns`` — имя, тип, смещение от начала колонок и длина.
+Каждая колонка выровнена на 8 байт, её можно читать без копирования
+(``numpy.frombuffer``). Колонки:
+
+- ``unit_id`` int64, ``parent`` int32 (индекс поставщика, -1 у завода),
+  ``level`` uint16, ``kind`` uint8, ``debt`` int64 (копейки);
+- ``product_offsets`` uint32[units + 1] и ``product_index`` uint32[links] —
+  продукты звена ``i``: ``product_index[product_offsets[i]:product_offsets[i + 1]]``,
+  индексы в ``product_id`` int64.
+
+Снимок собирается один раз на версию данных (``network.cache``); версия
+служит ETag, так что неизменившаяся сеть отдаётся ответом 304.
+"""
+
+import hashlib
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+from django.db import connection, transaction
+
+from . import cache
+from .models import Product, Unit
+
+FORMAT = 1
+MAGIC = b"ENSN"
+CONTENT_TYPE = "application/vnd.electro-network.snapshot"
+CHUNK_SIZE = 5000
+KINDS = [kind.value for kind in Unit.Kind]
+DEBT_SCALE = 100
+
+_HEADER = struct.Struct("<4sHHI")
+_TYPES = {
+    "int64": "q",
+    "int32": "i",
+    "uint32": "I",
+    "uint16": "H",
+    "uint8": "B",
+}
+
+
+def etag():
+    """ETag текущей версии сети; ``None``, если кэш версий недоступен."""
+    version = cache.versions(cache.UNIT, cache.PRODUCT)
+    if version is None:
+        return None
+    return f'"{FORMAT}-{"-".join(map(str, version))}"'
+
+
+def current(tag=None) -> tuple[str, bytes]:
+    """Снимок для ETag ``tag`` (из кэша или собранный) и его ETag.
+
+    Версия читается до сборки, поэтому под ключом версии никогда не лежат
+    данные старше неё.
+    """
+    if tag is None:
+        data = build()
+        return f'"{hashlib.sha1(data).hexdigest()}"', data
+    version = tag.strip('"')
+    key = f"{cache.PREFIX}:snapshot:{version}"
+    data = cache.get_response(key)
+    if data is None:
+        data = build()
+        cache.set_response(key, data)
+    return tag, data
+
+
+def build() -> bytes:
+    # Звенья, продукты и связи — из одного снимка БД (на PostgreSQL).
+    isolate = connection.vendor == "postgresql" and not connection.in_atomic_block
+    with transaction.atomic():
+        if isolate:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        return _pack(_columns())
+
+
+def _columns() -> list:
+    ids, levels, kinds, debts = array("q"), array("H"), array("B"), array("q")
+    suppliers = []
+    codes = {kind: i for i, kind in enumerate(KINDS)}
+    rows = Unit.objects.order_by("pk").values_list(
+        "pk", "supplier_id", "kind", "level", "debt_to_supplier"
+    )
+    for pk, supplier_id, kind, level, debt in rows.iterator(chunk_size=CHUNK_SIZE):
+        ids.append(pk)
+        suppliers.append(supplier_id)
+        kinds.append(codes[kind])
+        levels.append(level)
+        debts.append(int(debt * DEBT_SCALE))
+    position = {pk: i for i, pk in enumerate(ids)}
+    parents = array("i", (-1 if s is None else position[s] for s in suppliers))
+    del suppliers
+
+    product_ids = array(
+        "q",
+        Product.objects.order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=CHUNK_SIZE),
+    )
+    product_position = {pk: i for i, pk in enumerate(product_ids)}
+    counts = [0] * len(ids)
+    adjacency = array("I")
+    # Связи в порядке unit_id — том же, что и звенья: смежность сразу по группам.
+    links = (
+        Unit.products.through.objects.order_by("unit_id", "product_id")
+        .values_list("unit_id", "product_id")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for unit_id, product_id in links:
+        counts[position[unit_id]] += 1
+        adjacency.append(product_position[product_id])
+    offsets = array("I", accumulate(counts, initial=0))
+
+    return [
+        ("unit_id", "int64", ids),
+        ("parent", "int32", parents),
+        ("level", "uint16", levels),
+        ("kind", "uint8", kinds),
+        ("debt", "int64", debts),
+        ("product_offsets", "uint32", offsets),
+        ("product_index", "uint32", adjacency),
+        ("product_id", "int64", product_ids),
+    ]
+
+
+def _pack(columns) -> bytes:
+    body = bytearray()
+    described = []
+    for name, dtype, values in columns:
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+        described.append(
+            {"name": name, "type": dtype, "offset": len(body), "length": len(values)}
+        )
+        body += values.tobytes()
+        body += bytes(-len(body) % 8)
+    lengths = {name: len(values) for name, _, values in columns}
+    meta = json.dumps(
+        {
+            "units": lengths["unit_id"],
+            "products": lengths["product_id"],
+            "links": lengths["product_index"],
+            "kinds": KINDS,
+            "debt_scale": DEBT_SCALE,
+            "columns": described,
+        }
+    ).encode()
+    # Пробелы после JSON допустимы и выравнивают начало колонок.
+    meta += b" " * (-(_HEADER.size + len(meta)) % 8)
+    return _HEADER.pack(MAGIC, FORMAT, 0, len(meta)) + meta + bytes(body)
+
+
+def load(data: bytes) -> tuple[dict, dict]:
+    """Разбирает снимок: ``(метаданные, {колонка: array})``."""
+    magic, version, _, meta_size = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT:
+        raise ValueError("Неизвестный формат снимка.")
+    start = _HEADER.size + meta_size
+    meta = json.loads(data[_HEADER.size : start])
+    columns = {}
+    for column in meta["columns"]:
+        values = array(_TYPES[column["type"]])
+        offset = start + column["offset"]
+        values.frombytes(data[offset : offset + column["length"] * values.itemsize])
+        if sys.byteorder == "big":
+            values.byteswap()
+        columns[column["name"]] = values
+    return meta, columns
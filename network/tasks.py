@@ -1,14 +1,36 @@
+from datetime import date
+from typing import Optional
+
 from celery import shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
 from django.utils import timezone
 
-from .models import Unit
+from . import jobs, ledger
+from .models import DebtNotification, NotificationRun, Unit
 
 User = get_user_model()
 
 
+def _debt_message(unit: Unit, today: str, from_email: str) -> EmailMessage:
+    company = unit.name
+    supplier_name = unit.supplier.name if unit.supplier else "Поставщик не указан"
+    debt = unit.debt_to_supplier
+
+    subject = f"Задолженность компании «{company}» перед «{supplier_name}»"
+    message = (
+        f"Добрый день!\n\n"
+        f"На {today} сумма задолженности составляет: {debt}.\n"
+        f"Поставщик: {supplier_name}.\n\n"
+        f"Если вы уже произвели оплату — игнорируйте это письмо."
+    )
+    return EmailMessage(
+        subject=subject, body=message, from_email=from_email, to=[unit.email]
+    )
+
+
 @shared_task(
     bind=True,
     autoretry_for=(Exception,),
@@ -16,33 +38,131 @@ User = get_user_model()
     retry_jitter=True,
     max_retries=3,
 )
-def send_notification_debt(self):
-    qs = (
-        Unit.objects.filter(debt_to_supplier__gt=0)
-        .select_related("supplier")
+def send_notification_debt(self, run_date: Optional[str] = None):
+    """Раскладывает должников по пачкам и ставит отправку каждой в очередь.
+
+    Запуск идентифицируется датой: повтор или перезапуск продолжает с
+    сохранённого курсора, а уже поставленные звенья не дублируются.
+    """
+    today = date.fromisoformat(run_date) if run_date else timezone.now().date()
+    run, _ = NotificationRun.objects.get_or_create(run_date=today)
+    if run.dispatched_at is not None:
+        return 0
+
+    ids = (
+        Unit.objects.filter(debt_to_supplier__gt=0, pk__gt=run.cursor)
         .exclude(email__isnull=True)
         .exclude(email__exact="")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    chunk_size = settings.DEBT_NOTIFICATION_CHUNK_SIZE
+
+    chunks = 0
+    chunk = []
+    for pk in ids.iterator(chunk_size=chunk_size):
+        chunk.append(pk)
+        if len(chunk) >= chunk_size:
+            _dispatch_chunk(run, chunk)
+            chunks += 1
+            chunk = []
+    if chunk:
+        _dispatch_chunk(run, chunk)
+        chunks += 1
+
+    NotificationRun.objects.filter(pk=run.pk).update(dispatched_at=timezone.now())
+    return chunks
+
+
+def _dispatch_chunk(run: NotificationRun, unit_ids: list[int]) -> None:
+    # Сначала очередь, потом курсор: при падении между ними пачка уйдёт
+    # повторно, а дубли отсечёт журнал доставки.
+    DebtNotification.objects.bulk_create(
+        [DebtNotification(run_date=run.run_date, unit_id=pk) for pk in unit_ids],
+        ignore_conflicts=True,
     )
+    send_debt_notifications_chunk.delay(unit_ids, run.run_date.isoformat())
+    NotificationRun.objects.filter(pk=run.pk).update(cursor=unit_ids[-1])
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=3,
+)
+def send_debt_notifications_chunk(self, unit_ids: list[int], today: str):
+    """Отправляет письма пачки через одно соединение с почтовым сервером.
 
-    today = timezone.now().date().isoformat()
+    Звенья, уже отмеченные в журнале как отправленные, пропускаются, поэтому
+    повтор задачи досылает только неотправленные и упавшие письма.
+    """
     from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com")
+    done = DebtNotification.objects.filter(
+        run_date=today, unit_id__in=unit_ids, status=DebtNotification.Status.SENT
+    ).values_list("unit_id", flat=True)
+    units = (
+        Unit.objects.filter(pk__in=unit_ids, debt_to_supplier__gt=0)
+        .exclude(pk__in=list(done))
+        .select_related("supplier")
+        .order_by("pk")
+    )
+    messages = [(unit.pk, _debt_message(unit, today, from_email)) for unit in units]
+    if not messages:
+        return 0
 
-    for unit in qs:
-        company = unit.name
-        supplier_name = unit.supplier.name if unit.supplier else "Поставщик не указан"
-        debt = unit.debt_to_supplier
-
-        subject = f"Задолженность компании «{company}» перед «{supplier_name}»"
-        message = (
-            f"Добрый день!\n\n"
-            f"На {today} сумма задолженности составляет: {debt}.\n"
-            f"Поставщик: {supplier_name}.\n\n"
-            f"Если вы уже произвели оплату — игнорируйте это письмо."
+    sent, failed = [], {}
+    try:
+        with get_connection(fail_silently=False) as connection:
+            for pk, message in messages:
+                try:
+                    connection.send_messages([message])
+                except Exception as exc:
+                    failed[pk] = exc
+                else:
+                    sent.append(pk)
+    finally:
+        _record_delivery(today, sent, failed)
+
+    if failed:
+        raise next(iter(failed.values()))
+    return len(sent)
+
+
+def _record_delivery(today: str, sent: list[int], failed: dict) -> None:
+    deliveries = DebtNotification.objects.filter(run_date=today)
+    if sent:
+        deliveries.filter(unit_id__in=sent).update(
+            status=DebtNotification.Status.SENT,
+            sent_at=timezone.now(),
+            attempts=F("attempts") + 1,
+            error="",
         )
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=from_email,
-            recipient_list=[unit.email],
-            fail_silently=False,
+    for pk, exc in failed.items():
+        deliveries.filter(unit_id=pk).update(
+            status=DebtNotification.Status.FAILED,
+            attempts=F("attempts") + 1,
+            error=str(exc)[:1000],
         )
+
+
+@shared_task
+def apply_debt_ledger():
+    """Учитывает новые проводки журнала в балансах звеньев (см. ``network.ledger``)."""
+    return ledger.apply_pending(settings.DEBT_LEDGER_BATCH_SIZE)
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=3,
+)
+def run_admin_job(self, job_id: int):
+    """Выполняет массовое действие админки пачками (см. ``network.jobs``).
+
+    Повтор продолжает с курсора задания.
+    """
+    return jobs.run(job_id, settings.ADMIN_JOB_CHUNK_SIZE).affected
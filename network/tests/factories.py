@@ -0,0 +1,68 @@
+import datetime
+from itertools import count
+
+from django.contrib.auth import get_user_model
+
+from network.models import DebtRollup, Product, ProductAvailability, Unit
+
+_seq = count(1)
+
+
+def make_unit(supplier=None, **fields) -> Unit:
+    n = next(_seq)
+    kind = Unit.Kind.FACTORY if supplier is None else Unit.Kind.RETAIL
+    values = {
+        "name": f"Звено {n}",
+        "kind": kind,
+        "email": f"unit{n}@example.com",
+        "country": "RU",
+        "city": "Москва",
+        "street": "Ленина",
+        "house_number": str(n),
+        "supplier": supplier,
+        **fields,
+    }
+    unit = Unit(**values)
+    unit.save()
+    return unit
+
+
+def make_product(**fields) -> Product:
+    n = next(_seq)
+    values = {
+        "name": f"Продукт {n}",
+        "model": "M",
+        "released_at": datetime.date(2024, 1, 1),
+    }
+    return Product.objects.create(**{**values, **fields})
+
+
+def make_chain(length: int, **fields) -> list[Unit]:
+    """Завод и ``length - 1`` звеньев под ним, каждое — поставщик следующего."""
+    units = [make_unit(**fields)]
+    for _ in range(length - 1):
+        units.append(make_unit(supplier=units[-1], **fields))
+    return units
+
+
+def make_staff(username="staff"):
+    return get_user_model().objects.create_user(
+        username, f"{username}@example.com", "password", is_staff=True
+    )
+
+
+def rollup_rows() -> list[tuple]:
+    """Строки ``DebtRollup`` без id — для сравнения с ``rollups.rebuild()``."""
+    rows = DebtRollup.objects.values_list(
+        "unit_id", "country", "level", "debt_total", "units_count", "debtors_count"
+    )
+    return sorted(rows, key=str)
+
+
+def availability_rows() -> tuple[list, dict]:
+    """Строки ``ProductAvailability`` и ``Product.units_count`` — для сравнения с ``availability.rebuild()``."""
+    rows = ProductAvailability.objects.values_list(
+        "product_id", "unit_id", "country", "kind", "level", "path"
+    )
+    counts = dict(Product.objects.values_list("pk", "units_count"))
+    return sorted(rows), counts
@@ -0,0 +1,17 @@
+from network import availability, rollups
+
+from .factories import availability_rows, rollup_rows
+
+
+class RollupConsistencyMixin:
+    def assertRollupsMatchRebuild(self):
+        incremental = rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, rollup_rows())
+
+
+class AvailabilityConsistencyMixin:
+    def assertAvailabilityMatchesRebuild(self):
+        incremental = availability_rows()
+        availability.rebuild()
+        self.assertEqual(incremental, availability_rows())
@@ -0,0 +1,71 @@
+import inspect
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from network.admin import EstimatedCountPaginator, FacetFilter
+from network.models import Unit
+
+from .factories import make_unit
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        for _ in range(25):
+            make_unit()
+
+    def paginator(self, estimate):
+        paginator = EstimatedCountPaginator(Unit.objects.order_by("pk"), 10)
+        paginator.__dict__["count"] = estimate
+        paginator.estimated = True
+        return paginator
+
+    def test_overestimate_clamps_to_last_page(self):
+        paginator = self.paginator(100)
+        self.assertEqual(len(paginator.page(1)), 10)
+        self.assertEqual(paginator.num_pages, 10)
+
+        page = paginator.page(3)
+        self.assertEqual(len(page), 5)
+        self.assertEqual((paginator.count, paginator.num_pages), (25, 3))
+
+        page = self.paginator(100).page(7)
+        self.assertEqual((page.number, len(page)), (3, 5))
+
+    def test_underestimate_keeps_next_pages_reachable(self):
+        paginator = self.paginator(12)
+        paginator.page(2)
+        self.assertEqual(paginator.num_pages, 3)
+        page = paginator.page(3)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.count, 25)
+
+
+class FacetFilterTests(TestCase):
+    def test_values_is_abstract(self):
+        self.assertTrue(inspect.isabstract(FacetFilter))
+
+
+@skipUnless(connection.vendor == "postgresql", "Оценка числа строк — только PostgreSQL")
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+class UnitChangeListTests(TestCase):
+    def setUp(self):
+        for _ in range(250):
+            make_unit()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Unit._meta.db_table}")
+        user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        self.client.force_login(user)
+
+    def test_page_past_the_end_shows_last_page(self):
+        response = self.client.get("/admin/network/unit/", {"p": 999})
+        self.assertEqual(response.status_code, 200)
+        cl = response.context["cl"]
+        self.assertFalse(cl.paginator.estimated)
+        self.assertEqual((cl.result_count, cl.page_num), (250, 3))
+        self.assertEqual(len(cl.result_list), 50)
@@ -0,0 +1,117 @@
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from network.models import Product, ProductAvailability, Unit
+
+from .factories import make_chain, make_product, make_staff, make_unit
+from .mixins import AvailabilityConsistencyMixin
+
+
+class AvailabilityIndexTests(AvailabilityConsistencyMixin, TestCase):
+    """После каждого изменения индекс и ``units_count`` равны ``availability.rebuild()``."""
+
+    def setUp(self):
+        self.factory, self.dealer, self.shop = make_chain(3, country="RU")
+        self.other = make_unit(country="DE")
+        self.p1, self.p2, self.p3 = (make_product() for _ in range(3))
+
+    def units_count(self, product):
+        return Product.objects.values_list("units_count", flat=True).get(pk=product.pk)
+
+    def test_set_and_clear_from_unit(self):
+        self.shop.products.set([self.p1, self.p2])
+        self.dealer.products.add(self.p1)
+        self.assertEqual(self.units_count(self.p1), 2)
+        self.assertAvailabilityMatchesRebuild()
+
+        self.shop.products.set([self.p2, self.p3])
+        self.assertEqual(self.units_count(self.p1), 1)
+        self.assertAvailabilityMatchesRebuild()
+
+        self.shop.products.clear()
+        self.assertEqual(self.units_count(self.p2), 0)
+        self.assertAvailabilityMatchesRebuild()
+
+    def test_set_and_clear_from_product(self):
+        self.p1.units.set([self.shop, self.dealer, self.other])
+        self.assertEqual(self.units_count(self.p1), 3)
+        self.assertAvailabilityMatchesRebuild()
+
+        self.p1.units.remove(self.other)
+        self.assertAvailabilityMatchesRebuild()
+
+        self.p1.units.clear()
+        self.assertEqual(self.units_count(self.p1), 0)
+        self.assertFalse(ProductAvailability.objects.exists())
+        self.assertAvailabilityMatchesRebuild()
+
+    def test_repeated_add_does_not_double_count(self):
+        self.shop.products.add(self.p1)
+        self.shop.products.add(self.p1)
+        self.assertEqual(self.units_count(self.p1), 1)
+
+    def test_supplier_move_updates_subtree_rows(self):
+        self.dealer.products.add(self.p1)
+        self.shop.products.add(self.p1, self.p2)
+
+        self.dealer.supplier = self.other
+        self.dealer.country = "DE"
+        self.dealer.save()
+
+        row = ProductAvailability.objects.get(product=self.p2, unit=self.shop)
+        shop = Unit.objects.get(pk=self.shop.pk)
+        self.assertEqual((row.path, row.level), (shop.path, shop.level))
+        self.assertAvailabilityMatchesRebuild()
+
+    def test_unit_delete(self):
+        self.shop.products.add(self.p1, self.p2)
+        self.dealer.products.add(self.p1)
+        self.shop.delete()
+        self.assertEqual(self.units_count(self.p1), 1)
+        self.assertEqual(self.units_count(self.p2), 0)
+        self.assertAvailabilityMatchesRebuild()
+
+
+class ProductUnitsEndpointTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.product = make_product()
+        self.factory, self.dealer, self.shop = make_chain(3, country="RU")
+        self.foreign = make_unit(self.dealer, country="DE")
+        self.elsewhere = make_unit(make_unit(), country="RU")
+        for unit in (
+            self.factory,
+            self.dealer,
+            self.shop,
+            self.foreign,
+            self.elsewhere,
+        ):
+            unit.products.add(self.product)
+        make_unit().products.add(make_product())
+        self.url = f"/api/products/{self.product.pk}/units/"
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_lists_units_with_product(self):
+        expected = [self.factory, self.dealer, self.shop, self.foreign, self.elsewhere]
+        self.assertEqual(self.ids(), sorted(u.pk for u in expected))
+
+    def test_filters(self):
+        self.assertEqual(self.ids(country="DE"), [self.foreign.pk])
+        self.assertEqual(self.ids(kind="factory"), [self.factory.pk])
+        self.assertEqual(self.ids(level=2), sorted([self.shop.pk, self.foreign.pk]))
+        self.assertEqual(
+            self.ids(supplier=self.dealer.pk), sorted([self.shop.pk, self.foreign.pk])
+        )
+        self.assertEqual(
+            self.ids(supplier=self.factory.pk, country="RU"),
+            sorted([self.dealer.pk, self.shop.pk]),
+        )
+
+    def test_invalid_filters_are_400(self):
+        for params in ({"level": "x"}, {"supplier": "x"}, {"supplier": 10**9}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
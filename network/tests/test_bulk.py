@@ -0,0 +1,164 @@
+from decimal import Decimal
+from unittest import mock
+
+from rest_framework.test import APITestCase
+
+from network import hierarchy
+from network.models import DEPTH_EXCEEDED, EMAIL_TAKEN, Unit
+
+from .factories import make_chain, make_product, make_staff, make_unit
+from .mixins import AvailabilityConsistencyMixin, RollupConsistencyMixin
+
+
+def new_unit(ref=None, **fields) -> dict:
+    values = {
+        "name": "Новое звено",
+        "kind": "retail",
+        "email": f"{ref or 'unit'}@bulk.example.com",
+        "country": "RU",
+        "city": "Москва",
+        "street": "Ленина",
+        "house_number": "1",
+        **fields,
+    }
+    if ref is not None:
+        values["ref"] = ref
+    return values
+
+
+class UnitBulkTests(AvailabilityConsistencyMixin, RollupConsistencyMixin, APITestCase):
+    url = "/api/units/bulk/"
+
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+
+    def post(self, items, status=200):
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    def assertConsistent(self):
+        for unit in Unit.objects.all():
+            supplier = unit.supplier
+            self.assertEqual(unit.path, hierarchy.child_path(supplier), unit.email)
+            self.assertEqual(unit.level, unit.path.count(hierarchy.SEPARATOR))
+        self.assertRollupsMatchRebuild()
+        self.assertAvailabilityMatchesRebuild()
+
+    def test_refs_resolve_to_units_created_in_batch(self):
+        factory = make_unit()
+        product = make_product()
+        data = self.post(
+            [
+                new_unit("shop", supplier_ref="dealer", product_ids=[product.pk]),
+                new_unit("dealer", supplier_ref="plant", country="DE"),
+                new_unit("plant", kind="factory"),
+                new_unit("outlet", supplier=factory.pk),
+            ]
+        )
+
+        shop, dealer, plant, outlet = (Unit.objects.get(pk=row["id"]) for row in data)
+        self.assertEqual(shop.supplier, dealer)
+        self.assertEqual(dealer.supplier, plant)
+        self.assertIsNone(plant.supplier)
+        self.assertEqual(outlet.supplier, factory)
+        self.assertEqual(shop.level, 2)
+        self.assertEqual(list(shop.products.all()), [product])
+        self.assertConsistent()
+
+    def test_unknown_supplier_ref_is_rejected(self):
+        errors = self.post([new_unit("shop", supplier_ref="nowhere")], status=400)
+        self.assertIn("supplier_ref", errors[0])
+
+    def test_cycle_within_batch_is_rejected(self):
+        factory, a, b = make_chain(3)
+        errors = self.post([{"id": a.pk, "supplier": b.pk}], status=400)
+        self.assertIn("supplier", errors[0])
+
+        a.refresh_from_db()
+        self.assertEqual(a.supplier, factory)
+
+    def test_cycle_between_batch_items_is_rejected(self):
+        factory, a, b = make_chain(3)
+        c = make_unit(supplier=factory)
+        errors = self.post(
+            [{"id": c.pk, "supplier": b.pk}, {"id": a.pk, "supplier": c.pk}],
+            status=400,
+        )
+        self.assertIn("supplier", errors[1])
+
+    def test_depth_is_checked_against_final_hierarchy(self):
+        chain = make_chain(hierarchy.MAX_DEPTH + 1)
+        items = [new_unit("n0", supplier=chain[-1].pk)]
+        errors = self.post(items, status=400)
+        self.assertEqual(errors[0]["supplier"], [DEPTH_EXCEEDED])
+
+        refs = [new_unit("root", kind="factory")]
+        for n in range(hierarchy.MAX_DEPTH + 1):
+            parent = refs[-1]["ref"]
+            refs.append(new_unit(f"n{n}", supplier_ref=parent))
+        errors = self.post(refs, status=400)
+        self.assertEqual(errors[-1]["supplier"], [DEPTH_EXCEEDED])
+        self.assertEqual(errors[-2], {})
+
+    def test_moves_are_applied_in_level_order(self):
+        # a → b в пакете раньше, чем b выносится из-под a: в порядке пакета
+        # первый перенос создал бы цикл.
+        factory, a, b = make_chain(3)
+        other = make_unit()
+        self.post([{"id": a.pk, "supplier": b.pk}, {"id": b.pk, "supplier": other.pk}])
+
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual(b.supplier, other)
+        self.assertEqual(a.supplier, b)
+        self.assertEqual(a.level, 2)
+        self.assertConsistent()
+
+    def test_errors_are_reported_per_item_and_nothing_is_written(self):
+        taken = make_unit(supplier=make_unit())
+        data = [
+            new_unit("ok", supplier=taken.supplier_id),
+            new_unit("dup", email=taken.email.upper(), supplier=taken.supplier_id),
+            new_unit("bad", product_ids=[10**9], supplier=taken.supplier_id),
+            {"id": 10**9, "name": "x"},
+            new_unit("ok2", supplier=taken.supplier_id),
+        ]
+        errors = self.post(data, status=400)
+
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1]["email"], [EMAIL_TAKEN])
+        self.assertIn("product_ids", errors[2])
+        self.assertIn("id", errors[3])
+        self.assertEqual(errors[4], {})
+        self.assertFalse(
+            Unit.objects.filter(email__endswith="@bulk.example.com").exists()
+        )
+
+    def test_item_limit(self):
+        with mock.patch("network.api.views.MAX_ITEMS", 2):
+            errors = self.post([new_unit("a"), new_unit("b"), new_unit("c")], 400)
+        self.assertIn("non_field_errors", errors)
+        self.assertIn("non_field_errors", self.post([], status=400))
+
+    def test_updates_keep_rollups_and_availability(self):
+        factory, retail, shop = make_chain(3, country="RU")
+        other = make_unit()
+        products = [make_product(), make_product()]
+        shop.products.set(products)
+        for unit, debt in ((retail, "40.00"), (shop, "15.00")):
+            unit.debt_to_supplier = Decimal(debt)
+            unit.save()
+        self.post(
+            [
+                {"id": retail.pk, "supplier": other.pk},
+                {"id": shop.pk, "country": "DE", "product_ids": [products[1].pk]},
+                new_unit("new", supplier=shop.pk, product_ids=[products[0].pk]),
+            ]
+        )
+
+        retail.refresh_from_db()
+        shop.refresh_from_db()
+        self.assertEqual(shop.path, hierarchy.child_path(retail))
+        self.assertEqual(list(shop.products.all()), [products[1]])
+        self.assertConsistent()
@@ -0,0 +1,43 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from network import cache
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+DUMMY = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+
+@override_settings(CACHES={"default": LOCMEM, "dummy": DUMMY}, API_CACHE_ALIAS="dummy")
+class DummyCacheTests(TestCase):
+    def test_bump_without_storage_logs_nothing(self):
+        with self.assertNoLogs("network.cache", level="WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                cache.bump(cache.UNIT, cache.PRODUCT)
+            cache.record("unit-list", hit=True)
+
+    def test_versions_are_unknown(self):
+        self.assertIsNone(cache.versions(cache.UNIT))
+        self.assertIsNone(cache.modified(cache.UNIT))
+
+
+@override_settings(CACHES={"default": LOCMEM}, API_CACHE_ALIAS="default")
+class VersionTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.bump(cache.UNIT)
+
+    def test_bump_increments_version(self):
+        (before,) = cache.versions(cache.UNIT)
+        self.bump()
+        self.assertEqual(cache.versions(cache.UNIT), (before + 1,))
+
+    def test_evicted_counter_restarts_above_old_value(self):
+        (before,) = cache.versions(cache.UNIT)
+        caches["default"].delete(f"{cache.PREFIX}:version:{cache.UNIT}")
+        with self.assertNoLogs("network.cache", level="WARNING"):
+            self.bump()
+        (after,) = cache.versions(cache.UNIT)
+        self.assertGreater(after, before)
@@ -0,0 +1,86 @@
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from network.models import Unit
+
+from .factories import make_product, make_staff, make_unit
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+
+@override_settings(CACHES={"default": LOCMEM}, API_CACHE_ALIAS="default")
+class ConditionalReadTests(APITestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_authenticate(make_staff())
+        self.unit = make_unit(supplier=make_unit())
+        self.detail = f"/api/units/{self.unit.pk}/"
+
+    def get(self, url, status=200, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def write(self, method, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, response.data)
+
+    def test_unchanged_resource_is_not_modified(self):
+        for url in ("/api/units/", self.detail, "/api/products/"):
+            first = self.get(url)
+            etag, modified = first["ETag"], first["Last-Modified"]
+
+            response = self.get(url, 304, if_none_match=etag)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["ETag"], etag)
+            self.get(url, 304, if_modified_since=modified)
+            self.get(url, 200, if_none_match='"other"')
+
+    def test_etag_depends_on_query(self):
+        etag = self.get("/api/units/")["ETag"]
+        self.get("/api/units/?country=DE", 200, if_none_match=etag)
+
+    def test_write_changes_etag(self):
+        list_etag = self.get("/api/units/")["ETag"]
+        detail_etag = self.get(self.detail)["ETag"]
+
+        self.write("patch", self.detail, {"name": "Переименовано"})
+
+        self.get("/api/units/", 200, if_none_match=list_etag)
+        self.get(self.detail, 200, if_none_match=detail_etag)
+
+    def test_bulk_update_changes_etag(self):
+        list_etag = self.get("/api/units/")["ETag"]
+        detail_etag = self.get(self.detail)["ETag"]
+
+        self.write("post", "/api/units/bulk/", [{"id": self.unit.pk, "city": "Казань"}])
+
+        self.get("/api/units/", 200, if_none_match=list_etag)
+        response = self.get(self.detail, 200, if_none_match=detail_etag)
+        self.assertEqual(response.data["city"], "Казань")
+
+    def test_queryset_update_changes_etag(self):
+        list_etag = self.get("/api/units/")["ETag"]
+        detail_etag = self.get(self.detail)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Unit.objects.filter(pk=self.unit.pk).update(city="Тула")
+
+        self.get("/api/units/", 200, if_none_match=list_etag)
+        self.get(self.detail, 200, if_none_match=detail_etag)
+
+    def test_m2m_change_changes_etag(self):
+        product = make_product()
+        list_etag = self.get("/api/units/")["ETag"]
+        detail_etag = self.get(self.detail)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unit.products.add(product)
+
+        self.get("/api/units/", 200, if_none_match=list_etag)
+        self.get(self.detail, 200, if_none_match=detail_etag)
+
+    def test_missing_object_is_404(self):
+        self.get("/api/units/0/", 404, if_none_match="*")
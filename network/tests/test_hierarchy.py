@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from network import hierarchy
+from network.models import Unit
+
+from .factories import make_chain, make_staff, make_unit
+
+
+class DepthLimitTests(TestCase):
+    def test_too_deep_chain_is_validation_error(self):
+        chain = make_chain(3)
+        with mock.patch.object(hierarchy, "MAX_DEPTH", 2):
+            with self.assertRaises(ValidationError) as ctx:
+                make_unit(supplier=chain[-1])
+        self.assertIn("supplier", ctx.exception.message_dict)
+
+    def test_path_longer_than_column_is_validation_error(self):
+        chain = make_chain(2)
+        limit = len(hierarchy.subtree_prefix(chain[-1])) - 1
+        with mock.patch.object(hierarchy, "PATH_MAX_LENGTH", limit):
+            with self.assertRaises(ValidationError):
+                make_unit(supplier=chain[-1])
+
+    def test_moving_subtree_checks_its_deepest_unit(self):
+        deep = make_chain(3)
+        branch = make_chain(3)
+        mover = Unit.objects.get(pk=branch[1].pk)
+        mover.supplier = deep[-1]
+        with mock.patch.object(hierarchy, "MAX_DEPTH", 3):
+            with self.assertRaises(ValidationError):
+                mover.save()
+        branch[-1].refresh_from_db()
+        self.assertEqual(branch[-1].level, 2)
+
+    def test_path_column_fits_max_depth(self):
+        self.assertGreaterEqual(
+            Unit._meta.get_field("path").max_length, hierarchy.PATH_MAX_LENGTH
+        )
+
+
+class PlacementTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.factory, self.dealer, self.shop = make_chain(3)
+        self.other = make_unit()
+
+    def resolve_calls(self):
+        # Сериализатор импортирует resolve_placement по имени.
+        wrapped = mock.patch.object(
+            hierarchy, "resolve_placement", wraps=hierarchy.resolve_placement
+        )
+        serializer = mock.patch(
+            "network.api.serializers.resolve_placement",
+            wraps=hierarchy.resolve_placement,
+        )
+        return wrapped, serializer
+
+    def patch(self, unit, data):
+        model, serializer = self.resolve_calls()
+        with model as model_calls, serializer as serializer_calls:
+            response = self.client.patch(f"/api/units/{unit.pk}/", data, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return model_calls.call_count + serializer_calls.call_count
+
+    def test_update_without_supplier_change_skips_resolution(self):
+        self.assertEqual(self.patch(self.shop, {"name": "Новое имя"}), 0)
+        self.assertEqual(self.patch(self.shop, {"supplier": self.dealer.pk}), 0)
+
+    def test_supplier_change_resolves_once(self):
+        self.assertEqual(self.patch(self.dealer, {"supplier": self.other.pk}), 1)
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.path, f"{self.other.pk}/{self.dealer.pk}/")
+
+    def test_save_keeps_current_path_after_ancestor_moved(self):
+        stale = Unit.objects.get(pk=self.shop.pk)
+        self.dealer.supplier = self.other
+        self.dealer.save()
+
+        stale.name = "Переименовано"
+        stale.save()
+
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.path, f"{self.other.pk}/{self.dealer.pk}/")
+        self.assertEqual(stale.path, self.shop.path)
+
+    def test_save_after_concurrent_move_keeps_path_consistent(self):
+        stale = Unit.objects.get(pk=self.shop.pk)
+        moved = Unit.objects.get(pk=self.shop.pk)
+        moved.supplier = self.other
+        moved.save()
+
+        stale.name = "Переименовано"
+        stale.save()
+
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.supplier_id, self.dealer.pk)
+        self.assertEqual(self.shop.path, hierarchy.child_path(self.dealer))
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.test import APITestCase
+
+from .factories import make_chain, make_staff, make_unit
+
+
+class HierarchyEndpointTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.factory, self.retail = make_chain(2, country="RU")
+        self.foreign = make_unit(supplier=self.retail, country="DE")
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_descendants_filter_does_not_apply_to_anchor(self):
+        rows = self.get_json(f"/api/units/{self.factory.pk}/descendants/", country="DE")
+        self.assertEqual([r["id"] for r in rows], [self.foreign.pk])
+
+    def test_ancestors_filter_does_not_apply_to_anchor(self):
+        rows = self.get_json(f"/api/units/{self.foreign.pk}/ancestors/", country="RU")
+        self.assertEqual([r["id"] for r in rows], [self.retail.pk, self.factory.pk])
+
+    def test_descendants_level_filter(self):
+        rows = self.get_json(f"/api/units/{self.factory.pk}/descendants/", level=2)
+        self.assertEqual([r["id"] for r in rows], [self.foreign.pk])
+
+    def test_missing_anchor_is_404(self):
+        self.assertEqual(self.client.get("/api/units/0/descendants/").status_code, 404)
+        self.assertEqual(self.client.get("/api/units/x/ancestors/").status_code, 404)
@@ -0,0 +1,149 @@
+import io
+import json
+from decimal import Decimal
+from unittest import skipIf, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from network import hierarchy, importer, rollups
+from network.models import DebtEntry, DebtRollup, Unit
+
+from .factories import make_chain, make_unit
+
+
+def ndjson(*records) -> tuple:
+    return io.StringIO("\n".join(json.dumps(r) for r in records)), "ndjson"
+
+
+def unit_record(email, supplier_email=None, **fields) -> dict:
+    return {
+        "email": email,
+        "name": email,
+        "kind": "retail" if supplier_email else "factory",
+        "country": "RU",
+        "city": "Москва",
+        "street": "Ленина",
+        "house_number": "1",
+        "supplier_email": supplier_email,
+        **fields,
+    }
+
+
+@skipUnless(connection.vendor == "postgresql", "Импорт работает только на PostgreSQL")
+class ImporterHierarchyTests(TransactionTestCase):
+    def assertHierarchyConsistent(self):
+        units = {u.pk: u for u in Unit.objects.all()}
+        for unit in units.values():
+            supplier = units.get(unit.supplier_id)
+            self.assertEqual(unit.path, hierarchy.child_path(supplier), unit.email)
+            self.assertEqual(unit.level, unit.path.count(hierarchy.SEPARATOR))
+
+    def rollups(self):
+        return sorted(
+            DebtRollup.objects.values_list(
+                "unit_id", "country", "level", "debt_total", "units_count"
+            ),
+            key=str,
+        )
+
+    def test_nested_moves_and_new_chain_in_small_batches(self):
+        a, x, y, z = make_chain(4)
+        b, c = make_unit(), make_unit()
+        records = [
+            # Клиент раньше поставщика: порядок записи — по уровням.
+            unit_record("new3@example.com", "new2@example.com"),
+            unit_record("new2@example.com", "new1@example.com"),
+            unit_record("new1@example.com"),
+            unit_record(x.email, b.email),
+            unit_record(y.email, c.email),
+        ]
+        stats = importer.NetworkImporter(chunk_size=1).run(units=ndjson(*records))
+
+        self.assertEqual(stats["units_created"], 3)
+        self.assertEqual(stats["moved"], 2)
+        self.assertHierarchyConsistent()
+        z.refresh_from_db()
+        self.assertEqual(z.path, f"{c.pk}/{y.pk}/")
+        self.assertEqual(Unit.objects.get(email="new3@example.com").level, 2)
+
+    def test_untouched_subtrees_keep_their_rows(self):
+        moved = make_chain(2)
+        other = make_chain(3)
+        before = Unit.objects.get(pk=other[-1].pk).updated_at
+        importer.NetworkImporter().run(
+            units=ndjson(unit_record(moved[-1].email, other[0].email))
+        )
+        self.assertEqual(Unit.objects.get(pk=other[-1].pk).updated_at, before)
+        self.assertHierarchyConsistent()
+
+    def test_failure_leaves_written_batches_linked(self):
+        factory = make_unit()
+        records = [
+            unit_record("a@example.com", factory.email),
+            unit_record("b@example.com", "a@example.com"),
+        ]
+
+        def progress(stage, done, total):
+            if stage == "Звенья":
+                raise RuntimeError("сбой после первой пачки")
+
+        job = importer.NetworkImporter(chunk_size=1, progress=progress)
+        with self.assertRaises(RuntimeError):
+            job.run(units=ndjson(*records))
+
+        self.assertHierarchyConsistent()
+        self.assertEqual(
+            Unit.objects.get(email="a@example.com").supplier_id, factory.pk
+        )
+        self.assertFalse(Unit.objects.filter(email="b@example.com").exists())
+        # Сводки пересобраны по записанным пачкам.
+        written = self.rollups()
+        rollups.rebuild()
+        self.assertEqual(self.rollups(), written)
+
+
+@skipUnless(connection.vendor == "postgresql", "Импорт работает только на PostgreSQL")
+class ImporterLedgerTests(TransactionTestCase):
+    def ledger_balance(self, unit):
+        entries = DebtEntry.objects.filter(unit=unit, applied_at__isnull=False)
+        return sum((e.signed_amount for e in entries), Decimal("0.00"))
+
+    def test_balance_changes_are_posted_to_ledger(self):
+        factory = make_unit()
+        records = [
+            unit_record("shop@example.com", factory.email, debt_to_supplier="100.00")
+        ]
+        importer.NetworkImporter().run(units=ndjson(*records))
+        shop = Unit.objects.get(email="shop@example.com")
+        self.assertEqual(shop.debt_to_supplier, Decimal("100.00"))
+        self.assertEqual(self.ledger_balance(shop), shop.debt_to_supplier)
+
+        for debt, kind in (
+            ("40.00", DebtEntry.Kind.WRITE_OFF),
+            ("55.50", DebtEntry.Kind.ADJUSTMENT),
+        ):
+            records[0]["debt_to_supplier"] = debt
+            importer.NetworkImporter().run(units=ndjson(*records))
+            shop.refresh_from_db()
+            self.assertEqual(shop.debt_to_supplier, Decimal(debt))
+            self.assertEqual(shop.debt_entries.first().kind, kind)
+            self.assertEqual(self.ledger_balance(shop), shop.debt_to_supplier)
+
+        # Без изменения долга проводок не добавляется.
+        count = shop.debt_entries.count()
+        del records[0]["debt_to_supplier"]
+        importer.NetworkImporter().run(units=ndjson(*records))
+        self.assertEqual(shop.debt_entries.count(), count)
+
+
+@skipIf(connection.vendor == "postgresql", "Проверка для остальных СУБД")
+class UnsupportedDatabaseTests(TestCase):
+    def test_importer_refuses_other_databases(self):
+        with self.assertRaises(importer.UnsupportedDatabaseError):
+            importer.NetworkImporter()
+
+    def test_command_reports_error(self):
+        with self.assertRaisesMessage(CommandError, "только PostgreSQL"):
+            call_command("import_network", units="-")
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from network import jobs
+from network.models import AdminJob, Unit
+
+from .factories import make_unit
+
+
+class SelectionTests(TestCase):
+    def setUp(self):
+        self.units = [
+            make_unit(country=country, debt_to_supplier=Decimal("10.00"))
+            for country in ("DE", "DE", "PL", "DE", "DE", "DE", "PL", "DE")
+        ]
+        self.ids = [u.pk for u in self.units]
+
+    def test_selection_is_stored_as_id_ranges(self):
+        job = jobs.create(AdminJob.Action.CLEAR_DEBT, Unit.objects.filter(country="DE"))
+        job.refresh_from_db()
+        ids = self.ids
+        self.assertEqual(
+            job.selection, [[ids[0], ids[1]], [ids[3], ids[5]], [ids[7], ids[7]]]
+        )
+        self.assertEqual(job.total, 6)
+
+    def test_next_chunk_walks_ranges_from_cursor(self):
+        ranges = [[1, 2], [5, 9], [12, 12]]
+        self.assertEqual(jobs.next_chunk(ranges, 0, 3), [1, 2, 5])
+        self.assertEqual(jobs.next_chunk(ranges, 5, 3), [6, 7, 8])
+        self.assertEqual(jobs.next_chunk(ranges, 8, 3), [9, 12])
+        self.assertEqual(jobs.next_chunk(ranges, 12, 3), [])
+
+    def test_run_applies_snapshot_in_chunks(self):
+        job = jobs.create(AdminJob.Action.CLEAR_DEBT, Unit.objects.filter(country="DE"))
+        # Звено после запуска в выборку не попадает, удалённое пропускается.
+        late = make_unit(country="DE", debt_to_supplier=Decimal("10.00"))
+        self.units[1].delete()
+
+        job = jobs.run(job.pk, chunk_size=2)
+
+        self.assertEqual(job.status, AdminJob.Status.DONE)
+        self.assertEqual((job.processed, job.affected), (6, 5))
+        self.assertEqual(job.cursor, self.ids[7])
+        debts = dict(Unit.objects.values_list("pk", "debt_to_supplier"))
+        self.assertEqual(debts[self.ids[0]], Decimal("0.00"))
+        self.assertEqual(debts[self.ids[2]], Decimal("10.00"))
+        self.assertEqual(debts[late.pk], Decimal("10.00"))
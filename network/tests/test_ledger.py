@@ -0,0 +1,232 @@
+import threading
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APITestCase
+
+from network import ledger
+from network.models import DebtEntry, Unit
+
+from .factories import make_chain, make_staff, make_unit
+from .mixins import RollupConsistencyMixin
+
+
+def entry(unit, kind, amount, **fields) -> DebtEntry:
+    return DebtEntry(unit=unit, kind=kind, amount=Decimal(amount), **fields)
+
+
+class StaleSaveTests(RollupConsistencyMixin, TestCase):
+    def test_save_after_ledger_apply_uses_current_balance(self):
+        factory, retail = make_chain(2, country="DE")
+        other = make_unit(country="PL")
+        stale = Unit.objects.get(pk=retail.pk)
+        ledger.post(
+            [
+                DebtEntry(
+                    unit=retail, kind=DebtEntry.Kind.CHARGE, amount=Decimal("70.00")
+                )
+            ]
+        )
+        ledger.apply_pending()
+
+        stale.country = "PL"
+        stale.supplier = other
+        stale.save()
+
+        retail.refresh_from_db()
+        self.assertEqual(retail.debt_to_supplier, Decimal("70.00"))
+        self.assertEqual(stale.debt_to_supplier, Decimal("70.00"))
+        self.assertRollupsMatchRebuild()
+
+    def test_explicit_debt_change_is_written(self):
+        unit = make_unit(supplier=make_unit())
+        unit.debt_to_supplier = Decimal("12.50")
+        unit.save()
+        unit.refresh_from_db()
+        self.assertEqual(unit.debt_to_supplier, Decimal("12.50"))
+        self.assertRollupsMatchRebuild()
+
+
+class ApplyPendingTests(RollupConsistencyMixin, TestCase):
+    def assertBalanceMatchesLedger(self, unit):
+        signed = sum(
+            DebtEntry.SIGNS[kind] * amount
+            for kind, amount in DebtEntry.objects.filter(
+                unit=unit, applied_at__isnull=False
+            ).values_list("kind", "amount")
+        )
+        unit.refresh_from_db()
+        self.assertEqual(unit.debt_to_supplier, signed)
+
+    def test_entries_are_summed_per_unit(self):
+        factory, retail = make_chain(2, country="DE")
+        other = make_unit(supplier=factory, country="PL")
+        ledger.post(
+            [
+                entry(retail, DebtEntry.Kind.CHARGE, "100.00"),
+                entry(retail, DebtEntry.Kind.PAYMENT, "40.00"),
+                entry(other, DebtEntry.Kind.CHARGE, "15.50"),
+            ]
+        )
+        self.assertEqual(ledger.apply_pending(), 3)
+
+        retail.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(retail.debt_to_supplier, Decimal("60.00"))
+        self.assertEqual(other.debt_to_supplier, Decimal("15.50"))
+        self.assertFalse(DebtEntry.objects.filter(applied_at__isnull=True).exists())
+        self.assertRollupsMatchRebuild()
+
+    def test_overpayment_is_clamped_with_adjustment(self):
+        unit = make_unit(supplier=make_unit())
+        ledger.post([entry(unit, DebtEntry.Kind.CHARGE, "30.00")])
+        ledger.apply_pending()
+        ledger.post([entry(unit, DebtEntry.Kind.PAYMENT, "50.00")])
+        ledger.apply_pending()
+
+        unit.refresh_from_db()
+        self.assertEqual(unit.debt_to_supplier, Decimal("0.00"))
+        adjustment = DebtEntry.objects.get(note=ledger.OVERPAYMENT_NOTE)
+        self.assertEqual(adjustment.kind, DebtEntry.Kind.ADJUSTMENT)
+        self.assertEqual(adjustment.amount, Decimal("20.00"))
+        self.assertIsNotNone(adjustment.applied_at)
+        self.assertBalanceMatchesLedger(unit)
+        self.assertRollupsMatchRebuild()
+
+    def test_overpayment_within_one_batch_nets_first(self):
+        unit = make_unit(supplier=make_unit())
+        ledger.post(
+            [
+                entry(unit, DebtEntry.Kind.PAYMENT, "50.00"),
+                entry(unit, DebtEntry.Kind.CHARGE, "80.00"),
+            ]
+        )
+        ledger.apply_pending()
+
+        unit.refresh_from_db()
+        self.assertEqual(unit.debt_to_supplier, Decimal("30.00"))
+        self.assertFalse(
+            DebtEntry.objects.filter(note=ledger.OVERPAYMENT_NOTE).exists()
+        )
+
+    def test_pending_entries_are_applied_in_batches(self):
+        units = [make_unit(supplier=make_unit()) for _ in range(3)]
+        ledger.post(
+            [entry(units[i % 3], DebtEntry.Kind.CHARGE, "10.00") for i in range(7)]
+        )
+        with mock.patch.object(
+            ledger, "_apply_batch", wraps=ledger._apply_batch
+        ) as apply_batch:
+            self.assertEqual(ledger.apply_pending(batch_size=3), 7)
+        self.assertEqual([c.args for c in apply_batch.call_args_list], [(3,)] * 3)
+
+        self.assertEqual(
+            DebtEntry.objects.aggregate(total=Sum("amount"))["total"], Decimal("70.00")
+        )
+        for unit in units:
+            self.assertBalanceMatchesLedger(unit)
+        self.assertEqual(ledger.apply_pending(batch_size=3), 0)
+        self.assertRollupsMatchRebuild()
+
+    def test_duplicate_reference_is_not_posted_twice(self):
+        unit = make_unit(supplier=make_unit())
+        ledger.post([entry(unit, DebtEntry.Kind.CHARGE, "10.00", reference="INV-1")])
+        ledger.post([entry(unit, DebtEntry.Kind.CHARGE, "10.00", reference="INV-1")])
+        self.assertEqual(DebtEntry.objects.filter(reference="INV-1").count(), 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "SKIP LOCKED — только PostgreSQL")
+class SkipLockedTests(RollupConsistencyMixin, TransactionTestCase):
+    def test_entries_locked_by_another_worker_are_skipped(self):
+        unit = make_unit(supplier=make_unit())
+        ledger.post([entry(unit, DebtEntry.Kind.CHARGE, "10.00") for _ in range(5)])
+        locked_pk = DebtEntry.objects.order_by("pk").values_list("pk", flat=True)[1]
+        locked, release = threading.Event(), threading.Event()
+
+        def worker():
+            # Параллельный воркер держит одну проводку, пока не отпустят.
+            try:
+                with transaction.atomic():
+                    list(DebtEntry.objects.select_for_update().filter(pk=locked_pk))
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(ledger.apply_pending(batch_size=2), 4)
+            pending = DebtEntry.objects.filter(applied_at__isnull=True)
+            self.assertEqual(list(pending.values_list("pk", flat=True)), [locked_pk])
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(ledger.apply_pending(batch_size=2), 1)
+        unit.refresh_from_db()
+        self.assertEqual(unit.debt_to_supplier, Decimal("50.00"))
+        self.assertRollupsMatchRebuild()
+
+
+class DebtEntryBulkTests(RollupConsistencyMixin, APITestCase):
+    url = "/api/debt-entries/bulk/"
+
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.unit = make_unit(supplier=make_unit())
+
+    def item(self, **fields) -> dict:
+        return {"unit": self.unit.pk, "kind": "charge", "amount": "10.00", **fields}
+
+    def test_entries_are_posted_pending(self):
+        response = self.client.post(
+            self.url,
+            [self.item(reference="INV-1"), self.item(kind="payment", amount="4.00")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {"posted": 2, "duplicates": []})
+        self.assertEqual(DebtEntry.objects.filter(applied_at__isnull=True).count(), 2)
+
+        ledger.apply_pending()
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.debt_to_supplier, Decimal("6.00"))
+        self.assertRollupsMatchRebuild()
+
+    def test_already_posted_reference_is_reported_as_duplicate(self):
+        self.client.post(self.url, [self.item(reference="INV-1")], format="json")
+        response = self.client.post(
+            self.url,
+            [self.item(reference="INV-2"), self.item(reference="INV-1")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {"posted": 1, "duplicates": [1]})
+        self.assertEqual(DebtEntry.objects.filter(reference="INV-1").count(), 1)
+
+    def test_reference_repeated_in_batch_is_rejected(self):
+        response = self.client.post(
+            self.url,
+            [self.item(reference="INV-1"), self.item(reference="INV-1")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("reference", response.data[1])
+        self.assertFalse(DebtEntry.objects.exists())
+
+    def test_invalid_items_reject_whole_batch(self):
+        response = self.client.post(
+            self.url,
+            [self.item(), self.item(unit=10**9), self.item(kind="adjustment")],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("unit", response.data[1])
+        self.assertIn("kind", response.data[2])
+        self.assertFalse(DebtEntry.objects.exists())
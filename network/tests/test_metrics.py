@@ -0,0 +1,35 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from network import metrics
+
+
+class MetricsAccessTests(TestCase):
+    @override_settings(DEBUG=False, METRICS_TOKEN="")
+    def test_without_token_outside_debug_is_forbidden(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN="")
+    def test_without_token_in_debug_is_open(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN="secret")
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get(
+            "/metrics", headers={"Authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsFailSafeTests(TestCase):
+    def test_recording_error_does_not_break_request(self):
+        with mock.patch.object(
+            metrics.REQUEST_DURATION,
+            "labels",
+            side_effect=FileNotFoundError("нет каталога"),
+        ):
+            with self.assertLogs("network.metrics", level="ERROR"):
+                response = self.client.get("/api/units/")
+        self.assertEqual(response.status_code, 401)
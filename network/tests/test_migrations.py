@@ -0,0 +1,44 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [("network", "0004_debt_notification_ledger")]
+AFTER = [("network", "0005_unit_email_ci_unique")]
+
+
+class EmailUniquenessMigrationTests(TransactionTestCase):
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        if AFTER[0] not in executor.loader.applied_migrations:
+            self.skipTest("Тестовая БД создана без миграций (TEST MIGRATE=False)")
+        self.latest = executor.loader.graph.leaf_nodes("network")
+
+    def tearDown(self):
+        self.migrate(self.latest)
+
+    def test_case_insensitive_duplicates_stop_migration(self):
+        apps = self.migrate(BEFORE)
+        Unit = apps.get_model("network", "Unit")
+        fields = {
+            "country": "RU",
+            "city": "Москва",
+            "street": "Ленина",
+            "house_number": "1",
+        }
+        first = Unit.objects.create(name="a", email="Shop@example.com", **fields)
+        second = Unit.objects.create(name="b", email="shop@EXAMPLE.com", **fields)
+        Unit.objects.create(name="c", email="other@example.com", **fields)
+
+        with self.assertRaisesMessage(
+            RuntimeError, f"shop@example.com: звенья {first.pk}, {second.pk}"
+        ):
+            self.migrate(AFTER)
+
+        Unit.objects.filter(pk=second.pk).update(email="shop2@example.com")
+        self.migrate(AFTER)
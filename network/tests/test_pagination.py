@@ -0,0 +1,97 @@
+import base64
+import json
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from network.models import Unit
+
+from .factories import make_staff, make_unit
+
+DUMMY = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+
+def encode(data) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+@override_settings(CACHES={"default": DUMMY}, API_CACHE_ALIAS="default")
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        factory = make_unit(name="Завод", country="DE")
+        # Повторяющиеся name/country/level — курсор различает строки по id.
+        for country in ("DE", "PL", "DE", "RU", "PL", "DE", "RU"):
+            make_unit(factory, name="Магазин", country=country, city="Берлин")
+            make_unit(factory, name="Аптека", country=country, city="Берлин")
+
+    def walk(self, **params):
+        url, pages, rows = "/api/units/", 0, []
+        params = {"cursor": "", "page_size": 3, **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertNotIn("count", response.data)
+            rows.extend(response.data["results"])
+            url, params, pages = response.data["next"], None, pages + 1
+        return rows, pages
+
+    def assertWalkMatches(self, ordering):
+        fields = ordering.split(",")
+        tiebreak = "-id" if fields[0].startswith("-") else "id"
+        expected = list(
+            Unit.objects.order_by(*fields, tiebreak).values_list("pk", flat=True)
+        )
+
+        rows, pages = self.walk(ordering=ordering)
+        ids = [row["id"] for row in rows]
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(set(ids)), 15)
+        self.assertEqual(pages, 5)
+
+    def test_cursor_walk_has_no_gaps_or_duplicates(self):
+        for ordering in (
+            "name",
+            "-name",
+            "country,-level",
+            "-country,name",
+            "city",
+            "-created_at",
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertWalkMatches(ordering)
+
+    def test_cursor_walk_with_default_ordering(self):
+        rows, _ = self.walk()
+        self.assertEqual(len({row["id"] for row in rows}), 15)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        response = self.client.get("/api/units/", {"cursor": "", "page_size": 3})
+        cursor = response.data["next"].split("cursor=")[1]
+        response = self.client.get(
+            "/api/units/", {"cursor": cursor, "ordering": "city"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_cursor_is_not_500(self):
+        cursors = [
+            "garbage",
+            "%%%",
+            base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+            encode([1, 2]),
+            encode({"v": 5, "o": ["name", "id"]}),
+            encode({"v": ["x"], "o": "name"}),
+            encode({"v": ["x", "not-a-number"], "o": ["name", "id"]}),
+            encode({"v": [["x"], {"a": 1}], "o": ["name", "id"]}),
+            encode({"v": [None, None], "o": ["name", "id"]}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/units/", {"cursor": cursor})
+                self.assertIn(response.status_code, (400, 404))
+
+        cursor = encode({"v": ["вчера", 1], "o": ["-created_at", "-id"]})
+        response = self.client.get(
+            "/api/units/", {"cursor": cursor, "ordering": "-created_at"}
+        )
+        self.assertEqual(response.status_code, 404)
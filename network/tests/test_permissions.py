@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from network.models import Product, Unit
+
+from .factories import make_staff
+
+LISTS = ("/api/units/", "/api/products/", "/api/debt-entries/")
+
+
+class IsActiveStaffTests(APITestCase):
+    def test_anonymous_list_is_unauthorized(self):
+        for url in LISTS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_anonymous_create_is_unauthorized(self):
+        payload = {"name": "TV", "model": "X1", "released_at": "2024-01-01"}
+        self.assertEqual(self.client.post("/api/products/", payload).status_code, 401)
+        self.assertEqual(
+            self.client.post("/api/units/bulk/", [], format="json").status_code, 401
+        )
+        self.assertFalse(Product.objects.exists())
+
+    def test_non_staff_is_forbidden(self):
+        user = get_user_model().objects.create_user(
+            "user", "user@example.com", "password"
+        )
+        self.client.force_authenticate(user)
+        for url in LISTS:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.post("/api/units/", {}).status_code, 403)
+        self.assertFalse(Unit.objects.exists())
+
+    def test_inactive_staff_is_forbidden(self):
+        user = make_staff()
+        user.is_active = False
+        user.save()
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get("/api/units/").status_code, 403)
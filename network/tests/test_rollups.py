@@ -0,0 +1,113 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from network import jobs, rollups
+from network.models import DebtEntry, Unit
+
+from .factories import make_unit
+from .mixins import RollupConsistencyMixin
+
+
+class RollupTests(RollupConsistencyMixin, TestCase):
+    """После каждого изменения инкрементальные сводки равны ``rollups.rebuild()``."""
+
+    def setUp(self):
+        # ru ─ a ─ b ─ c        de ─ e
+        #        └ d
+        self.ru = make_unit(country="RU")
+        self.a = make_unit(self.ru, country="RU", debt_to_supplier=Decimal("10.00"))
+        self.b = make_unit(self.a, country="DE", debt_to_supplier=Decimal("20.00"))
+        self.c = make_unit(self.b, country="PL", debt_to_supplier=Decimal("5.00"))
+        self.d = make_unit(self.a, country="RU")
+        self.de = make_unit(country="DE")
+        self.e = make_unit(self.de, country="DE", debt_to_supplier=Decimal("7.00"))
+
+    def save(self, unit, **fields):
+        for field, value in fields.items():
+            setattr(unit, field, value)
+        unit.save()
+        self.assertRollupsMatchRebuild()
+
+    def test_create(self):
+        self.assertRollupsMatchRebuild()
+        summary = rollups.summary(self.a.pk)
+        self.assertEqual(summary["debt_total"], Decimal("35.00"))
+        self.assertEqual((summary["units_count"], summary["debtors_count"]), (4, 3))
+        self.assertEqual(
+            [(r["country"], r["debt_total"]) for r in summary["by_country"]],
+            [
+                ("DE", Decimal("20.00")),
+                ("PL", Decimal("5.00")),
+                ("RU", Decimal("10.00")),
+            ],
+        )
+
+    def test_debt_change(self):
+        self.save(self.b, debt_to_supplier=Decimal("35.00"))
+        self.save(self.c, debt_to_supplier=Decimal("0.00"))
+        self.save(self.d, debt_to_supplier=Decimal("1.00"))
+        self.assertEqual(rollups.summary()["debtors_count"], 4)
+
+    def test_country_change(self):
+        self.save(self.b, country="PL")
+        self.save(self.b, country="RU", debt_to_supplier=Decimal("3.00"))
+
+    def test_move_subtree_deeper(self):
+        self.save(self.a, supplier=self.e)
+        self.assertEqual(rollups.summary(self.de.pk)["units_count"], 6)
+
+    def test_move_subtree_shallower(self):
+        self.save(self.b, supplier=self.ru)
+        self.c.refresh_from_db()
+        self.assertEqual(self.c.level, 2)
+
+    def test_move_at_same_level_with_changes(self):
+        self.save(
+            self.b, supplier=self.e, country="RU", debt_to_supplier=Decimal("1.00")
+        )
+        self.assertEqual(rollups.summary(self.a.pk)["units_count"], 2)
+
+    def test_move_factory_child_to_root(self):
+        self.save(self.a, supplier=None, kind=Unit.Kind.FACTORY)
+        self.assertEqual(rollups.summary(self.ru.pk)["units_count"], 1)
+
+    def test_delete(self):
+        self.c.delete()
+        self.assertRollupsMatchRebuild()
+        self.d.delete()
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(rollups.summary(self.a.pk)["units_count"], 2)
+
+    def test_clear_debt(self):
+        cleared = rollups.clear_debt(Unit.objects.filter(pk__in=[self.b.pk, self.d.pk]))
+        self.assertEqual(cleared, 1)
+        self.assertRollupsMatchRebuild()
+        self.assertEqual(rollups.summary(self.a.pk)["debt_total"], Decimal("15.00"))
+        entry = DebtEntry.objects.get(unit=self.b)
+        self.assertEqual(
+            (entry.kind, entry.amount, entry.note),
+            (DebtEntry.Kind.WRITE_OFF, Decimal("20.00"), rollups.CLEAR_DEBT_NOTE),
+        )
+
+    def test_admin_clear_debt_action(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin", "a@example.com", "pw"
+        )
+        self.client.force_login(admin)
+        with mock.patch(
+            "network.admin.run_admin_job.delay", side_effect=jobs.run
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/admin/network/unit/",
+                {"action": "clear_debt", "_selected_action": [self.a.pk, self.c.pk]},
+            )
+        self.assertEqual(response.status_code, 302)
+
+        debts = dict(Unit.objects.values_list("pk", "debt_to_supplier"))
+        self.assertEqual(debts[self.a.pk], Decimal("0.00"))
+        self.assertEqual(debts[self.c.pk], Decimal("0.00"))
+        self.assertEqual(debts[self.b.pk], Decimal("20.00"))
+        self.assertRollupsMatchRebuild()
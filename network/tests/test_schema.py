@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+from drf_spectacular.generators import SchemaGenerator
+
+
+class SchemaTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema = SchemaGenerator().get_schema(request=None, public=True)
+
+    def test_jwt_security_scheme(self):
+        schemes = self.schema["components"]["securitySchemes"]
+        self.assertEqual(schemes["BearerAuth"]["scheme"], "bearer")
+        operation = self.schema["paths"]["/api/units/"]["get"]
+        self.assertIn({"BearerAuth": []}, operation["security"])
+
+    def test_operation_ids_are_unique(self):
+        ids = [
+            operation["operationId"]
+            for path in self.schema["paths"].values()
+            for operation in path.values()
+        ]
+        self.assertEqual(len(ids), len(set(ids)))
+        paths = self.schema["paths"]
+        self.assertEqual(
+            paths["/api/units/{id}/debt-summary/"]["get"]["operationId"],
+            "units_debt_summary_retrieve",
+        )
+        self.assertEqual(
+            paths["/api/units/debt-summary/"]["get"]["operationId"],
+            "network_debt_summary_retrieve",
+        )
+
+    def test_enum_names(self):
+        schemas = self.schema["components"]["schemas"]
+        enums = {name for name in schemas if name.endswith("Enum")}
+        self.assertTrue(
+            {"UnitKindEnum", "DebtEntryKindEnum", "PostableDebtEntryKindEnum"} <= enums
+        )
+        self.assertFalse([name for name in enums if any(c.isdigit() for c in name)])
+        self.assertEqual(
+            schemas["Unit"]["properties"]["kind"]["allOf"][0]["$ref"],
+            "#/components/schemas/UnitKindEnum",
+        )
@@ -0,0 +1,68 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from network.models import DebtEntry, NotificationRun, Product, Unit
+
+from .factories import make_unit
+
+
+class ResetTests(TransactionTestCase):
+    # TRUNCATE не проходит внутри транзакции теста с отложенными проверками FK.
+    def seed(self, **options):
+        call_command("seed_demo", stdout=io.StringIO(), **options)
+
+    def test_reset_keeps_service_tables(self):
+        make_unit(email="old@example.com")
+        run = NotificationRun.objects.create(run_date=date(2025, 1, 1))
+
+        self.seed(reset=True)
+
+        self.assertFalse(Unit.objects.filter(email="old@example.com").exists())
+        self.assertTrue(Unit.objects.exists())
+        self.assertTrue(Product.objects.exists())
+        self.assertTrue(NotificationRun.objects.filter(pk=run.pk).exists())
+
+    def test_reset_refuses_to_drop_ledger(self):
+        unit = make_unit()
+        DebtEntry.objects.create(
+            unit=unit, kind=DebtEntry.Kind.CHARGE, amount=Decimal("10.00")
+        )
+
+        with self.assertRaisesMessage(CommandError, "--reset-all"):
+            self.seed(reset=True)
+        self.assertTrue(Unit.objects.filter(pk=unit.pk).exists())
+
+        NotificationRun.objects.create(run_date=date(2025, 1, 1))
+        self.seed(reset_all=True)
+        self.assertFalse(DebtEntry.objects.filter(unit_id=unit.pk).exists())
+        self.assertFalse(NotificationRun.objects.exists())
+
+
+class OpeningBalanceTests(TransactionTestCase):
+    def assertLedgerMatchesBalances(self):
+        for unit in Unit.objects.prefetch_related("debt_entries"):
+            total = sum(
+                (e.signed_amount for e in unit.debt_entries.all()), Decimal("0.00")
+            )
+            self.assertEqual(total, unit.debt_to_supplier, unit.email)
+
+    def test_fixed_demo_posts_opening_entries_once(self):
+        call_command("seed_demo", stdout=io.StringIO())
+        call_command("seed_demo", stdout=io.StringIO())
+        self.assertTrue(DebtEntry.objects.exists())
+        self.assertLedgerMatchesBalances()
+
+    def test_synthetic_network_posts_opening_entries(self):
+        call_command(
+            "seed_demo",
+            factories=2,
+            fanout=2,
+            depth=2,
+            products=5,
+            stdout=io.StringIO(),
+        )
+        self.assertLedgerMatchesBalances()
@@ -0,0 +1,168 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from network.api.serializers import PrimaryKeyListField
+from network.models import EMAIL_TAKEN, Product
+
+from .factories import make_product, make_staff, make_unit
+
+DUMMY = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+
+@override_settings(CACHES={"default": DUMMY}, API_CACHE_ALIAS="default")
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.factory = make_unit()
+        self.products = [make_product(), make_product()]
+        self.add_units(3)
+
+    def add_units(self, n):
+        for _ in range(n):
+            make_unit(self.factory).products.set(self.products)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def count_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            self.get(url, **params)
+        return len(ctx)
+
+    def test_only_requested_fields_are_returned(self):
+        data = self.get("/api/units/", fields="name,country")
+        self.assertEqual(set(data["results"][0]), {"id", "name", "country"})
+
+        data = self.get(f"/api/units/{self.factory.pk}/", fields="email")
+        self.assertEqual(set(data), {"id", "email"})
+
+    def test_unknown_fields_are_ignored(self):
+        data = self.get("/api/units/", fields="name,nope,__class__", expand="nope")
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+
+        data = self.get("/api/units/", fields=",", expand="products")
+        self.assertEqual(set(data["results"][0]), {"id", "products"})
+
+    def test_expand_is_ignored_without_fields(self):
+        data = self.get("/api/units/", expand="products")
+        self.assertIn("email", data["results"][0])
+        self.assertIn("products", data["results"][0])
+
+    def test_products_are_expanded_on_request(self):
+        data = self.get("/api/units/", fields="name", expand="products")
+        products = {row["id"]: row["products"] for row in data["results"]}
+        self.assertEqual(products.pop(self.factory.pk), [])
+        expected = sorted(p.pk for p in self.products)
+        for row in products.values():
+            self.assertEqual(sorted(p["id"] for p in row), expected)
+
+    def test_queries_do_not_grow_with_page(self):
+        for params in (
+            {"fields": "name"},
+            {"fields": "name", "expand": "products"},
+            {},
+        ):
+            with self.subTest(**params):
+                before = self.count_queries("/api/units/", **params)
+                self.add_units(5)
+                self.assertEqual(self.count_queries("/api/units/", **params), before)
+
+    def test_products_are_not_read_without_expand(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.get("/api/units/", fields="name")
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("network_product", sql)
+        self.assertNotIn('"email"', sql)
+
+
+class PrimaryKeyListFieldTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.products = [make_product() for _ in range(3)]
+        self.field = PrimaryKeyListField(queryset=Product.objects.all())
+
+    def test_resolves_in_one_query_keeping_order(self):
+        pks = [p.pk for p in reversed(self.products)]
+        with self.assertNumQueries(1):
+            objs = self.field.run_validation([*pks, pks[0]])
+        self.assertEqual(objs, list(reversed(self.products)))
+
+    def test_all_missing_ids_are_reported(self):
+        with self.assertRaises(serializers.ValidationError) as ctx:
+            self.field.run_validation([self.products[0].pk, 10**9, 10**9 + 1])
+        self.assertEqual(
+            ctx.exception.detail, [f"Объекты не найдены: {10**9}, {10**9 + 1}."]
+        )
+
+    def test_non_integer_ids_are_rejected(self):
+        for value in (["x"], [0], "1,2", None):
+            with self.subTest(value=value), self.assertRaises(
+                serializers.ValidationError
+            ):
+                self.field.run_validation(value)
+
+    def test_unit_api_rejects_unknown_product_ids(self):
+        unit = make_unit(make_unit())
+        response = self.client.patch(
+            f"/api/units/{unit.pk}/",
+            {"product_ids": [self.products[0].pk, 10**9]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["product_ids"], [f"Продукты не найдены: {10**9}."]
+        )
+        self.assertFalse(unit.products.exists())
+
+        response = self.client.patch(
+            f"/api/units/{unit.pk}/",
+            {"product_ids": [p.pk for p in self.products]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(set(unit.products.all()), set(self.products))
+
+
+class UnitEmailTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(make_staff())
+        self.factory = make_unit(email="plant@example.com")
+
+    def payload(self, **fields):
+        return {
+            "name": "Магазин",
+            "kind": "retail",
+            "email": "Shop@Example.com ",
+            "country": "RU",
+            "city": "Москва",
+            "street": "Ленина",
+            "house_number": "1",
+            "supplier": self.factory.pk,
+            **fields,
+        }
+
+    def test_email_is_checked_once_per_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/units/", self.payload(), format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["email"], "shop@example.com")
+        lookups = [q for q in ctx.captured_queries if "LOWER(" in q["sql"].upper()]
+        self.assertEqual(len(lookups), 1)
+
+    def test_case_insensitive_duplicate_is_rejected(self):
+        response = self.client.post(
+            "/api/units/", self.payload(email="PLANT@example.com"), format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"email": [EMAIL_TAKEN]})
+
+    def test_own_email_can_change_case(self):
+        response = self.client.patch(
+            f"/api/units/{self.factory.pk}/", {"email": "Plant@Example.com"}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
@@ -0,0 +1,47 @@
+import json
+
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .factories import make_chain, make_staff
+
+
+class AsgiStreamingTests(TestCase):
+    """Под ASGI тело стримингового ответа — асинхронный итератор.
+
+    Синхронный Django собрал бы списком до отправки первого байта.
+    """
+
+    def setUp(self):
+        token = AccessToken.for_user(make_staff())
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.factory, self.retail, self.sp = make_chain(3)
+
+    async def stream(self, url):
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        return b"".join([part async for part in response.streaming_content])
+
+    async def test_descendants(self):
+        body = await self.stream(f"/api/units/{self.factory.pk}/descendants/")
+        self.assertEqual(
+            [r["id"] for r in json.loads(body)], [self.retail.pk, self.sp.pk]
+        )
+
+    async def test_ancestors(self):
+        body = await self.stream(f"/api/units/{self.sp.pk}/ancestors/")
+        self.assertEqual(
+            [r["id"] for r in json.loads(body)], [self.retail.pk, self.factory.pk]
+        )
+
+    async def test_export(self):
+        body = await self.stream("/api/units/export/")
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(rows), 3)
+
+    def test_wsgi_keeps_sync_iterator(self):
+        response = self.client.get(
+            f"/api/units/{self.factory.pk}/descendants/", headers=self.headers
+        )
+        self.assertFalse(response.is_async)
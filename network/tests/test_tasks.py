@@ -0,0 +1,117 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from network import tasks
+from network.models import DebtNotification, NotificationRun
+
+from .factories import make_unit
+
+RUN_DATE = "2026-01-05"
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    DEBT_NOTIFICATION_CHUNK_SIZE=2,
+)
+class DebtNotificationTests(TestCase):
+    def setUp(self):
+        factory = make_unit()
+        self.debtors = [
+            make_unit(factory, debt_to_supplier=Decimal("10.00")) for _ in range(5)
+        ]
+        make_unit(factory)
+        self.ids = [u.pk for u in self.debtors]
+
+    def dispatch(self, delay=None):
+        with mock.patch.object(
+            tasks.send_debt_notifications_chunk, "delay", side_effect=delay
+        ) as queued:
+            result = tasks.send_notification_debt.run(RUN_DATE)
+        return result, [c.args[0] for c in queued.call_args_list]
+
+    def statuses(self):
+        return dict(
+            DebtNotification.objects.filter(run_date=RUN_DATE).values_list(
+                "unit_id", "status"
+            )
+        )
+
+    def test_dispatch_queues_debtors_in_chunks_once(self):
+        chunks, queued = self.dispatch()
+        self.assertEqual(chunks, 3)
+        self.assertEqual(queued, [self.ids[0:2], self.ids[2:4], self.ids[4:]])
+        run = NotificationRun.objects.get(run_date=RUN_DATE)
+        self.assertEqual(run.cursor, self.ids[-1])
+        self.assertIsNotNone(run.dispatched_at)
+        self.assertEqual(set(self.statuses().values()), {"pending"})
+        self.assertEqual(len(self.statuses()), 5)
+
+        self.assertEqual(self.dispatch(), (0, []))
+        self.assertEqual(NotificationRun.objects.count(), 1)
+
+    def test_dispatch_resumes_after_failure(self):
+        calls = []
+
+        def fail_second(unit_ids, today):
+            calls.append(unit_ids)
+            if len(calls) == 2:
+                raise ConnectionError("broker")
+
+        with self.assertRaises(ConnectionError):
+            self.dispatch(fail_second)
+        run = NotificationRun.objects.get(run_date=RUN_DATE)
+        self.assertEqual(run.cursor, self.ids[1])
+        self.assertIsNone(run.dispatched_at)
+
+        chunks, queued = self.dispatch()
+        self.assertEqual(chunks, 2)
+        self.assertEqual(queued, [self.ids[2:4], self.ids[4:]])
+        self.assertEqual(len(self.statuses()), 5)
+
+    def test_chunk_is_sent_once(self):
+        self.dispatch()
+        self.assertEqual(tasks.send_debt_notifications_chunk.run(self.ids, RUN_DATE), 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(set(self.statuses().values()), {"sent"})
+
+        self.assertEqual(tasks.send_debt_notifications_chunk.run(self.ids, RUN_DATE), 0)
+        self.assertEqual(len(mail.outbox), 5)
+        attempts = DebtNotification.objects.values_list("attempts", flat=True)
+        self.assertEqual(set(attempts), {1})
+
+    def test_retry_sends_only_failed_messages(self):
+        self.dispatch()
+        broken = self.debtors[2]
+        send_messages = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == [broken.email]:
+                raise OSError("mailbox unavailable")
+            return send_messages(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", flaky):
+            with self.assertRaises(OSError):
+                tasks.send_debt_notifications_chunk.run(self.ids, RUN_DATE)
+        self.assertEqual(len(mail.outbox), 4)
+        failed = DebtNotification.objects.get(run_date=RUN_DATE, unit=broken)
+        self.assertEqual((failed.status, failed.attempts), ("failed", 1))
+        self.assertIn("mailbox unavailable", failed.error)
+
+        self.assertEqual(tasks.send_debt_notifications_chunk.run(self.ids, RUN_DATE), 1)
+        self.assertEqual(mail.outbox[-1].to, [broken.email])
+        failed.refresh_from_db()
+        self.assertEqual(
+            (failed.status, failed.attempts, failed.error), ("sent", 2, "")
+        )
+
+    def test_paid_debt_is_skipped(self):
+        self.dispatch()
+        paid = self.debtors[0]
+        paid.debt_to_supplier = Decimal("0.00")
+        paid.save()
+        self.assertEqual(tasks.send_debt_notifications_chunk.run(self.ids, RUN_DATE), 4)
+        self.assertEqual(self.statuses()[paid.pk], "pending")
@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from . import metrics
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus, только с ``METRICS_TOKEN``.
+
+    Без токена метрики открыты лишь при ``DEBUG``.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.exposition(), content_type=CONTENT_TYPE_LATEST)